@@ -23,7 +23,9 @@ from util import CaseReport
 from dc_pf import DCPF
 from ac_pf import NewtonPF, FastDecoupledPF, XB, BX
 
-from opf import OPF, UDOPF
+from opf import OPF, UDOPF, PersistentDCOPF, BatchDCOPF
+
+from scenario import ScenarioStore, ScenarioRunner
 
 from estimator import StateEstimator, Measurement
 from estimator import PF, PT, QF, QT, PG, QG, VM, VA
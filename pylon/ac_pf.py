@@ -31,7 +31,6 @@ from time import time
 from numpy import array, angle, pi, exp, linalg, multiply, conj, r_, Inf
 
 from scipy.sparse import hstack, vstack
-from scipy.sparse.linalg import spsolve, splu
 
 from pylon.case import PQ, PV, REFERENCE
 
@@ -265,6 +264,8 @@ class NewtonPF(_ACPF):
     def _one_iteration(self, F, Ybus, V, Vm, Va, pv, pq, pvpq):
         """ Performs one Newton iteration.
         """
+        from scipy.sparse.linalg import spsolve
+
         J = self._build_jacobian(Ybus, V, pv, pq, pvpq)
 
         # Update step.
@@ -398,6 +399,7 @@ class FastDecoupledPF(_ACPF):
         Bpp = Bpp[pq_col, pq].tocsc()
 
         # Factor B matrices.
+        from scipy.sparse.linalg import splu
         Bp_solver = splu(Bp)
         Bpp_solver = splu(Bpp)
 #        L = decomp.lu(Bp.todense())
@@ -0,0 +1,385 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines the entry point for converting, validating or solving many case
+data files across a pool of processes.
+
+For example, to convert a library of snapshots to the binary case format:
+
+    pylon-batch -a convert -T npz -d converted -o summary.json cases/
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import logging
+import optparse
+
+from multiprocessing import Pool
+
+from pylon.case import REFERENCE
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+#: Extensions of the data files processed.
+DATA_EXTENSIONS = [".m", ".raw", ".psse", ".pkl", ".pickle", ".npz"]
+
+#: Extension of the files written by each output type.
+OUTPUT_EXTENSIONS = {"matpower": ".m", "psse": ".raw", "pickle": ".pkl",
+    "npz": ".npz", "rst": ".rst", "dot": ".dot"}
+
+#: Actions applied to each case.
+ACTIONS = ["validate", "convert", "solve"]
+
+#------------------------------------------------------------------------------
+#  Data file discovery:
+#------------------------------------------------------------------------------
+
+def find_data_files(paths, recursive=True):
+    """ Returns a sorted list of the data files given, or found in the given
+    directories.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in DATA_EXTENSIONS:
+                        files.append(os.path.join(root, name))
+                if not recursive:
+                    del dirs[:]
+        else:
+            files.append(path)
+
+    return sorted(files)
+
+
+def common_dir(files):
+    """ Returns the deepest directory containing all of the given files.
+    """
+    dirs = [os.path.dirname(os.path.abspath(f)) + os.sep for f in files]
+    prefix = os.path.commonprefix(dirs)
+    return prefix[:prefix.rfind(os.sep)] or os.sep
+
+#------------------------------------------------------------------------------
+#  Case validation:
+#------------------------------------------------------------------------------
+
+def validate_case(case):
+    """ Returns a list of the problems found with the given case.
+    """
+    problems = []
+
+    if case.base_mva <= 0.0:
+        problems.append("Non-positive base MVA [%s]." % case.base_mva)
+
+    if not case.buses:
+        problems.append("No buses.")
+
+    refs = [bus for bus in case.buses if bus.type == REFERENCE]
+    if len(refs) != 1:
+        problems.append("%d reference buses." % len(refs))
+
+    buses = set([id(bus) for bus in case.buses])
+    for l in case.branches:
+        if id(l.from_bus) not in buses or id(l.to_bus) not in buses:
+            problems.append("Branch [%s] connected to missing bus." % l.name)
+        if l.online and l.r == 0.0 and l.x == 0.0:
+            problems.append("Zero impedance branch [%s]." % l.name)
+
+    for g in case.generators:
+        if id(g.bus) not in buses:
+            problems.append("Generator [%s] connected to missing bus." %
+                            g.name)
+        if g.p_min > g.p_max:
+            problems.append("Generator [%s] P limits reversed." % g.name)
+
+    return problems
+
+#------------------------------------------------------------------------------
+#  Data file processing:
+#------------------------------------------------------------------------------
+
+def process_file(path, action="validate", output_type="npz", output_dir=None,
+                 base_dir=None, solver="dcopf"):
+    """ Reads the case in the given data file and validates, converts or
+    solves it. Failures are recorded in the result, not raised.
+
+    MATPOWER, PSS/E and PSAT files are read using the fast readers and
+    pickled and binary cases as by the "pylon" command. Files of any other
+    format are failures.
+
+    @rtype: dict
+    @return: The file name, detected format, outcome and timing.
+    """
+    from pylon.io import FastMATPOWERReader, FastPSSEReader
+    from pylon.io.psat import FastPSATReader
+    from pylon.main import read_case, detect_data_file
+
+    readers = {"matpower": FastMATPOWERReader, "psse": FastPSSEReader,
+               "psat": FastPSATReader}
+
+    result = {"file": path, "action": action, "format": None,
+              "success": False, "error": None}
+    t0 = time.time()
+
+    try:
+        infile = open(path, "rb")
+        try:
+            result["format"] = format = detect_data_file(infile, path)
+            if format in readers:
+                case = readers[format]().read(infile)
+            elif format in ["pickle", "npz"]:
+                case = read_case(infile, format)
+            else:
+                raise ValueError("Unrecognised data file format.")
+        finally:
+            infile.close()
+        result["read_time"] = time.time() - t0
+
+        if case is None:
+            raise ValueError("Unable to read case data.")
+
+        result["buses"] = len(case.buses)
+        result["branches"] = len(case.branches)
+        result["generators"] = len(case.generators)
+
+        if action == "validate":
+            result["problems"] = problems = validate_case(case)
+            result["success"] = not problems
+        elif action == "convert":
+            result["output"] = convert_case(case, path, output_type,
+                                            output_dir, base_dir)
+            result["success"] = True
+        elif action == "solve":
+            result["success"] = solve_case(case, solver)
+        else:
+            raise ValueError("Invalid action [%s]." % action)
+    except Exception, e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+
+    result["time"] = time.time() - t0
+
+    return result
+
+
+def convert_case(case, path, output_type="npz", output_dir=None,
+                 base_dir=None):
+    """ Writes the case in the given format and returns the output file
+    name. Cases are written beside the data file or, if an output directory
+    is given, to the location of the data file relative to the base
+    directory within it.
+    """
+    from pylon.io import \
+        MATPOWERWriter, PSSEWriter, PickleWriter, NPZWriter, ReSTWriter, \
+        DotWriter
+
+    writers = {"matpower": MATPOWERWriter, "psse": PSSEWriter,
+        "pickle": PickleWriter, "npz": NPZWriter, "rst": ReSTWriter,
+        "dot": DotWriter}
+
+    root = os.path.splitext(os.path.basename(path))[0]
+    dirname = os.path.dirname(path)
+    if output_dir is not None:
+        dirname = os.path.normpath(os.path.join(output_dir,
+            os.path.relpath(dirname or os.curdir, base_dir or os.curdir)))
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Created by another process.
+                pass
+    output = os.path.join(dirname, root + OUTPUT_EXTENSIONS[output_type])
+
+    if output == path:
+        raise ValueError("Output would overwrite input [%s]." % path)
+
+    writers[output_type](case).write(output)
+
+    return output
+
+
+def solve_case(case, solver="dcopf"):
+    """ Solves the case using the named routine and returns True if it
+    converged.
+    """
+    from pylon import DCPF, NewtonPF, FastDecoupledPF, OPF, UDOPF
+
+    routines = {"dcpf": lambda c: DCPF(c), "acpf": lambda c: NewtonPF(c),
+        "fdpf": lambda c: FastDecoupledPF(c), "dcopf": lambda c: OPF(c, True),
+        "acopf": lambda c: OPF(c, False), "udopf": lambda c: UDOPF(c)}
+
+    result = routines[solver](case).solve()
+
+    # DC power flow returns a boolean and the others a solution dict.
+    if isinstance(result, dict):
+        return bool(result["converged"])
+    return bool(result)
+
+#------------------------------------------------------------------------------
+#  Batch processing:
+#------------------------------------------------------------------------------
+
+#: Processing options of a worker process.
+_options = {}
+
+def _init_batch(options):
+    """ Sets the processing options of a worker process.
+    """
+    global _options
+    _options = options
+
+
+def _process_file(path):
+    """ Processes the given file with the options of the worker process.
+    """
+    return process_file(path, **_options)
+
+
+def run_batch(files, processes=None, **options):
+    """ Processes each of the given files across a pool of processes and
+    returns a summary of the results. Progress is logged as each file
+    completes.
+
+    @param processes: Number of worker processes. Defaults to the number of
+        CPUs. If 1, the files are processed in this process.
+    @param options: Keyword arguments passed to L{process_file}.
+    """
+    t0 = time.time()
+    n = len(files)
+    results = []
+
+    if processes == 1:
+        completed = (process_file(path, **options) for path in files)
+        pool = None
+    else:
+        pool = Pool(processes, _init_batch, (options,))
+        completed = pool.imap_unordered(_process_file, files)
+
+    try:
+        for i, result in enumerate(completed):
+            results.append(result)
+            logger.info("[%d/%d] %s %s (%.3fs)%s" % (i + 1, n,
+                result["file"], "ok" if result["success"] else "FAILED",
+                result["time"], ": " + result["error"]
+                if result["error"] else ""))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    results.sort(key=lambda r: r["file"])
+    succeeded = len([r for r in results if r["success"]])
+
+    return {"files": n, "succeeded": succeeded, "failed": n - succeeded,
+            "time": time.time() - t0,
+            "options": dict(options, processes=processes),
+            "results": results}
+
+#------------------------------------------------------------------------------
+#  "main" function:
+#------------------------------------------------------------------------------
+
+def main():
+    """ Parses the command line and processes the data files given.
+    """
+    parser = optparse.OptionParser(usage="usage: %prog [options] "
+        "file_or_dir [file_or_dir ...]")
+
+    parser.add_option("-a", "--action", dest="action", default="validate",
+        help="The action applied to each case: %s [default: %%default]." %
+        ", ".join(ACTIONS))
+
+    parser.add_option("-T", "--output-type", dest="output_type",
+        default="npz", help="The format to which cases are converted: %s "
+        "[default: %%default]." % ", ".join(sorted(OUTPUT_EXTENSIONS)))
+
+    parser.add_option("-d", "--output-dir", dest="output_dir", metavar="DIR",
+        help="Write converted cases to DIR instead of beside each input.")
+
+    parser.add_option("-s", "--solver", dest="solver", default="dcopf",
+        help="The routine used to solve each case: dcpf, acpf, fdpf, dcopf, "
+        "acopf or udopf [default: %default].")
+
+    parser.add_option("-j", "--processes", dest="processes", type="int",
+        help="Number of worker processes [default: number of CPUs].")
+
+    parser.add_option("-n", "--no-recurse", action="store_false",
+        dest="recursive", default=True, help="Do not search directories "
+        "recursively.")
+
+    parser.add_option("-o", "--output", dest="output", metavar="FILE",
+        help="Write the JSON summary to FILE instead of standard output.")
+
+    parser.add_option("-q", "--quiet", action="store_true", dest="quiet",
+        default=False, help="Do not report progress.")
+
+    (options, args) = parser.parse_args()
+
+    if not args:
+        parser.error("no data files or directories given")
+    if options.action not in ACTIONS:
+        parser.error("invalid action: %s" % options.action)
+    if options.output_type not in OUTPUT_EXTENSIONS:
+        parser.error("invalid output type: %s" % options.output_type)
+
+    # Report progress on standard error, such that the summary may be piped.
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.basicConfig(stream=sys.stderr, format="%(message)s",
+        level=logging.WARNING)
+    logger.setLevel(logging.WARNING if options.quiet else logging.INFO)
+
+    files = find_data_files(args, options.recursive)
+
+    summary = run_batch(files, options.processes, action=options.action,
+        output_type=options.output_type, output_dir=options.output_dir,
+        base_dir=common_dir(files) if files else None, solver=options.solver)
+
+    logger.info("%d of %d files succeeded in %.2fs." % (summary["succeeded"],
+        summary["files"], summary["time"]))
+
+    if options.output:
+        fd = open(options.output, "wb")
+        try:
+            json.dump(summary, fd, indent=2, sort_keys=True)
+        finally:
+            fd.close()
+    else:
+        json.dump(summary, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF -------------------------------------------------------------------------
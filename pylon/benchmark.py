@@ -0,0 +1,201 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines benchmarks of the start-up time of the command line tool.
+
+Run "python -m pylon.benchmark -o results.json" to time importing Pylon,
+printing the help of the "pylon" command and solving a DC power flow, each in
+a new interpreter, and write the results as JSON for comparison between
+revisions.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import logging
+import optparse
+import platform
+import subprocess
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "test", "data",
+                         "case6ww.m")
+
+#: Statement running the "pylon" command with the arguments that follow.
+MAIN = "from pylon.main import main; main()"
+
+#: Arguments of the interpreter for each command timed.
+COMMANDS = {"import": ["-c", "import pylon"],
+            "help": ["-c", MAIN, "--help"],
+            "dcpf": ["-c", MAIN, "-s", "dcpf", "-o", os.devnull, DATA_FILE]}
+
+#------------------------------------------------------------------------------
+#  Benchmark results:
+#------------------------------------------------------------------------------
+
+def time_command(args, repeats=10):
+    """ Returns statistics of the time taken to run the interpreter with the
+    given arguments.
+    """
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([path] +
+        filter(None, [os.environ.get("PYTHONPATH")])))
+
+    durations = []
+    for _ in range(repeats):
+        t0 = time.time()
+        p = subprocess.Popen([sys.executable] + args, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, err = p.communicate()
+        durations.append(time.time() - t0)
+
+        if p.returncode != 0:
+            raise RuntimeError(err.strip().splitlines()[-1] if err.strip()
+                               else "Exit status %d." % p.returncode)
+
+    return statistics(durations)
+
+
+def statistics(durations):
+    """ Returns a dict of statistics of the given durations [s].
+    """
+    total = sum(durations)
+    return {"repeats": len(durations), "total": total,
+            "mean": total / len(durations), "min": min(durations),
+            "max": max(durations),
+            "per_second": len(durations) / total if total > 0.0 else None}
+
+
+def revision():
+    """ Returns the git revision of the source tree, or None.
+    """
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        p = subprocess.Popen(["git", "rev-parse", "HEAD"], cwd=path,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, _ = p.communicate()
+    except OSError:
+        return None
+    return out.strip() if p.returncode == 0 else None
+
+
+def environment(**info):
+    """ Returns a dict of the revision, time, platform and Python version of
+    a benchmark run, updated with the given information.
+    """
+    env = {"revision": revision(),
+           "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+           "platform": platform.platform(),
+           "python": platform.python_version()}
+    env.update(info)
+    return env
+
+
+def run_benchmarks(commands=None, repeats=10):
+    """ Times each of the given commands, or all commands if None, and
+    returns a dict of the results and of the environment.
+    """
+    commands = sorted(COMMANDS.keys()) if commands is None else commands
+
+    results = {}
+    for name in commands:
+        logger.info("Benchmarking command [%s]." % name)
+        try:
+            results[name] = time_command(COMMANDS[name], repeats)
+        except Exception, e:
+            logger.error("Benchmark [%s] failed: %s" % (name, e))
+            results[name] = {"error": "%s: %s" % (type(e).__name__, e)}
+
+    return environment(repeats=repeats, results=results)
+
+#------------------------------------------------------------------------------
+#  Command line:
+#------------------------------------------------------------------------------
+
+def option_parser(repeats):
+    """ Returns a parser of the options common to all benchmarks.
+
+    @param repeats: Default number of times each benchmark is timed.
+    """
+    parser = optparse.OptionParser(usage="usage: %prog [options]")
+
+    parser.add_option("-o", "--output", dest="output", metavar="FILE",
+        help="Write results to FILE instead of standard output.")
+
+    parser.add_option("-n", "--repeats", dest="repeats", type="int",
+        default=repeats, help="Number of times each benchmark is timed.")
+
+    return parser
+
+
+def write_results(results, filename=None):
+    """ Writes benchmark results as JSON to the named file or to standard
+    output.
+    """
+    if filename:
+        fd = open(filename, "wb")
+        try:
+            json.dump(results, fd, indent=2, sort_keys=True)
+        finally:
+            fd.close()
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+#------------------------------------------------------------------------------
+#  Standalone call:
+#------------------------------------------------------------------------------
+
+def main():
+    """ Parses the command line and writes the benchmark results as JSON.
+    """
+    parser = option_parser(repeats=10)
+
+    parser.add_option("-c", "--command", dest="commands", action="append",
+        metavar="NAME", help="Time the named command (%s). May be given more "
+        "than once. All commands are timed by default." %
+        ", ".join(sorted(COMMANDS.keys())))
+
+    (options, args) = parser.parse_args()
+
+    for name in options.commands or []:
+        if name not in COMMANDS:
+            parser.error("unknown command: %s" % name)
+
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+
+    write_results(run_benchmarks(options.commands, options.repeats),
+                  options.output)
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF -------------------------------------------------------------------------
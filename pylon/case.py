@@ -23,7 +23,6 @@
 #------------------------------------------------------------------------------
 
 import logging
-import copy
 
 from numpy import \
     array, angle, pi, exp, ones, r_, complex64, conj, int32
@@ -443,9 +442,11 @@ class Case(_Named, _Serializable):
         buses = self.connected_buses if buses is None else buses
         branches = self.online_branches if branches is None else branches
 
-        B_buses = copy.deepcopy(buses) # modify bus copies
-        Bp_branches = copy.deepcopy(branches) # modify branch copies
-        Bpp_branches = copy.deepcopy(branches)
+        # Only attributes of the copies are modified, so they may share buses
+        # with the original branches.
+        B_buses = [_copy(bus) for bus in buses] # modify bus copies
+        Bp_branches = [_copy(l) for l in branches] # modify branch copies
+        Bpp_branches = [_copy(l) for l in branches]
 
         for bus in B_buses:
             bus.b_shunt = 0.0
@@ -904,6 +905,51 @@ class Case(_Named, _Serializable):
             l.p_to = St[i].real
             l.q_to = St[i].imag
 
+    #--------------------------------------------------------------------------
+    #  Copy case:
+    #--------------------------------------------------------------------------
+
+    def clone(self):
+        """ Returns a copy of the case that may be modified, or sent to another
+        process, independently of the original.
+
+        Unlike copy.deepcopy, each component is copied once, without
+        recursion: numeric, string and tuple attributes are shared with the
+        original, piece-wise linear cost lists are copied and connections
+        refer to the copied buses.
+
+        @rtype: Case
+        """
+        bus_map = {}
+        buses = []
+        for bus in self.buses:
+            bus_map[id(bus)] = clone = _copy(bus)
+            buses.append(clone)
+
+        branches = []
+        for l in self.branches:
+            clone = _copy(l)
+            clone.from_bus = bus_map.get(id(l.from_bus), l.from_bus)
+            clone.to_bus = bus_map.get(id(l.to_bus), l.to_bus)
+            branches.append(clone)
+
+        generators = []
+        for g in self.generators:
+            clone = _copy(g)
+            clone.bus = bus_map.get(id(g.bus), g.bus)
+            if isinstance(g.p_cost, list):
+                clone.p_cost = list(g.p_cost)
+            if isinstance(g.q_cost, list):
+                clone.q_cost = list(g.q_cost)
+            generators.append(clone)
+
+        case = _copy(self)
+        case.buses = buses
+        case.branches = branches
+        case.generators = generators
+
+        return case
+
     #--------------------------------------------------------------------------
     #  Reset case results:
     #--------------------------------------------------------------------------
@@ -937,6 +983,21 @@ class Case(_Named, _Serializable):
         return MATPOWERReader().read(fd)
 
 
+    def save_npz(self, fd):
+        """ Serialize the case in the compact binary format.
+        """
+        from pylon.io import NPZWriter
+        NPZWriter(self).write(fd)
+
+
+    @classmethod
+    def load_npz(cls, fd):
+        """ Returns a case from the given compact binary file object.
+        """
+        from pylon.io import NPZReader
+        return NPZReader().read(fd)
+
+
     def save_psse(self, fd):
         """ Serialize the case as a PSS/E data file.
         """
@@ -960,8 +1021,8 @@ class Case(_Named, _Serializable):
     def load_psat(cls, fd):
         """ Returns a case object from the given PSAT data file.
         """
-        from pylon.io.psat import PSATReader
-        return PSATReader().read(fd)
+        from pylon.io.psat import FastPSATReader
+        return FastPSATReader().read(fd)
 
 
     def save_rst(self, fd):
@@ -991,4 +1052,15 @@ class Case(_Named, _Serializable):
         from pylon.io import DotWriter
         DotWriter(self).write(fd)
 
+#------------------------------------------------------------------------------
+#  Component copies:
+#------------------------------------------------------------------------------
+
+def _copy(obj):
+    """ Returns a shallow copy of a case or case component.
+    """
+    clone = object.__new__(obj.__class__)
+    clone.__dict__.update(obj.__dict__)
+    return clone
+
 # EOF -------------------------------------------------------------------------
@@ -28,8 +28,6 @@ import math
 
 from numpy import array, linalg, pi, r_, ix_
 
-from scipy.sparse.linalg import spsolve
-
 from pylon.case import REFERENCE, PV, PQ
 
 #------------------------------------------------------------------------------
@@ -126,6 +124,10 @@ class DCPF(object):
     def _get_v_angle(self, case, B, v_angle_guess, p_businj, iref):
         """ Calculates the voltage phase angles.
         """
+        # Imported on first use, as loading the sparse solvers dominates the
+        # start-up time of the command line tool.
+        from scipy.sparse.linalg import spsolve
+
         buses = case.connected_buses
 
         pv_idxs = [bus._i for bus in buses if bus.type == PV]
@@ -26,16 +26,21 @@ See U{http://www.esat.kuleuven.be/electa/teaching/matdyn/} for more info.
 
 import math
 import logging
+import copy
 
 from time import time
+from multiprocessing import Pool, cpu_count
 
 from numpy import \
     array, zeros, ones, exp, conj, pi, angle, abs, sin, cos, c_, r_, \
-    flatnonzero, finfo
+    finfo, eye, dot, searchsorted, add, minimum, maximum
 
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import csc_matrix
 from scipy.sparse.linalg import spsolve, splu
 
 from pylon import NewtonPF
+from pylon.io.store import ChannelStore
 
 from util import _Named, _Serializable
 
@@ -63,6 +68,11 @@ GENERAL_IEEE = "IEEE general speed-governing system"
 BUS_CHANGE = "bus change"
 BRANCH_CHANGE = "branch change"
 
+MAX_ANGLE = "max_angle"
+STABLE = "stable"
+CCT = "cct"
+
+
 #------------------------------------------------------------------------------
 #  "DynamicCase" class:
 #------------------------------------------------------------------------------
@@ -108,25 +118,102 @@ class DynamicCase(_Named, _Serializable):
         buses = self.case.connected_buses
         nb = len(buses)
 
-        Ybus, _, _ = self.case.getYbus()
+        Ybus, _, _ = self.case.getYbus(buses)
 
         # Steady-state bus voltages.
 
         # Calculate equivalent load admittance
         Sd = array([self.case.s_demand(bus) for bus in buses])
-        Yd = conj(Sd) / abs(U0)**2
+        Yd = conj(Sd / self.case.base_mva) / abs(U0)**2
 
-        xd_tr = array([g.xd_tr for g in self.dyn_generators])
+        x_tr = self.transientReactance()
 
         # Calculate equivalent generator admittance.
-        Yg = zeros(nb)
-        Yg[gbus] = 1 / (j * xd_tr)
+        Yg = zeros(nb, dtype=complex)
+        add.at(Yg, gbus, 1 / (j * x_tr))
 
         # Add equivalent load and generator admittance to Ybus matrix
-        for i in range(nb):
-            Ybus[i, i] = Ybus[i, i] + Yg[i] + Yd[i]
+        ib = range(nb)
+        Ybus = Ybus + csc_matrix((Yg + Yd, (ib, ib)), shape=(nb, nb))
+
+        return Ybus.tocsc()
+
+
+    def busAdmittance(self, bus, U0):
+        """ Returns the shunt admittance plus the equivalent load admittance
+        at the given bus.
+        """
+        base_mva = self.case.base_mva
+
+        Ysh = (bus.g_shunt + 1j * bus.b_shunt) / base_mva
+        Yd = conj(self.case.s_demand(bus) / base_mva) / abs(U0[bus._i])**2
+
+        return Ysh + Yd
+
+
+    def branchAdmittance(self, branch):
+        """ Returns the branch admittance matrix elements as a 2x2 array,
+        ordered "from" then "to" bus.
+        """
+        if not branch.online:
+            return zeros((2, 2), dtype=complex)
+
+        # Series admittance and line charging susceptance.
+        Ys = 1 / (branch.r + 1j * branch.x)
+        Bc = branch.b
+
+        # Transformer tap ratio and phase shift.
+        tap = branch.ratio if branch.ratio != 0.0 else 1.0
+        tap = tap * exp(1j * branch.phase_shift * pi / 180.0)
+
+        Ytt = Ys + 1j * Bc / 2.0
+        Yff = Ytt / (tap * conj(tap))
+        Yft = -Ys / conj(tap)
+        Ytf = -Ys / tap
+
+        return array([[Yff, Yft], [Ytf, Ytt]])
+
 
-        return Ybus
+    def applyEvents(self, events, U0):
+        """ Applies the given bus and branch change events to the case.
+
+        @rtype: dict
+        @return: The resulting changes to the augmented bus admittance
+                 matrix, keyed by (row, column).
+        """
+        delta = {}
+        for event in events:
+            before = self._eventAdmittance(event, U0)
+            event.apply()
+            after = self._eventAdmittance(event, U0)
+            for ij in after:
+                delta[ij] = delta.get(ij, 0.0) + after[ij] - before[ij]
+
+        return delta
+
+
+    def _eventAdmittance(self, event, U0):
+        """ Returns the augmented bus admittance matrix elements that depend
+        on the parameter changed by the given event.
+        """
+        if isinstance(event, BusChange):
+            i = event.bus._i
+            return {(i, i): self.busAdmittance(event.bus, U0)}
+        else:
+            f = event.branch.from_bus._i
+            t = event.branch.to_bus._i
+            Y = self.branchAdmittance(event.branch)
+            return {(f, f): Y[0, 0], (f, t): Y[0, 1],
+                    (t, f): Y[1, 0], (t, t): Y[1, 1]}
+
+
+    def transientReactance(self):
+        """ Returns the transient reactance of each generator, x' for the
+        classical model and x'd for the fourth order model, behind which the
+        generator is represented in the network.
+        """
+        return array([g.x_tr if g.model == CLASSICAL else g.xd_tr
+                      for g in self.dyn_generators])
 
 
     def generatorInit(self, U0):
@@ -134,6 +221,8 @@ class DynamicCase(_Named, _Serializable):
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param U0: Initial generator bus voltages.
+
         @rtype: tuple
         @return: Initial generator conditions.
         """
@@ -143,35 +232,35 @@ class DynamicCase(_Named, _Serializable):
         Efd0 = zeros(len(generators))
         Xgen0 = zeros((len(generators), 4))
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        typ1 = _models(generators, CLASSICAL)
+        typ2 = _models(generators, FOURTH_ORDER)
+
+        # Initial machine armature currents.
+        Sg = array([g.generator.p + j * g.generator.q for g in generators])
+        Ia0 = conj(Sg / self.case.base_mva) / conj(U0)
 
         # Generator type 1: classical model
-        x_tr = array([g.x_tr for g in generators])
+        x_tr = array([g.x_tr for g in generators])[typ1]
 
         omega0 = ones(len(typ1)) * 2 * pi * self.freq
 
-        # Initial machine armature currents.
-        Sg = array([g.p + j * g.q for g in generators])
-        Ia0 = conj(Sg[typ1]) / conj(U0) / self.base_mva
-
         # Initial Steady-state internal EMF.
-        Eq_tr0 = U0[typ1] + j * x_tr * Ia0
+        Eq_tr0 = U0[typ1] + j * x_tr * Ia0[typ1]
         delta0 = angle(Eq_tr0)
         Eq_tr0 = abs(Eq_tr0)
 
-        Xgen0[typ1, :] = c_[delta0, omega0, Eq_tr0]
+        Xgen0[typ1, :3] = c_[delta0, omega0, Eq_tr0]
 
         # Generator type 2: 4th order model
-        xd = array([g.xd for g in generators])
-        xq = array([g.xq for g in generators])
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
+        xd = array([g.xd for g in generators])[typ2]
+        xq = array([g.xq for g in generators])[typ2]
+        xd_tr = array([g.xd_tr for g in generators])[typ2]
+        xq_tr = array([g.xq_tr for g in generators])[typ2]
 
         omega0 = ones(len(typ2)) * 2 * pi * self.freq
 
         # Initial machine armature currents.
-        Ia0 = conj(Sg[typ2]) / conj(U0[typ2]) / self.base_mva
+        Ia0 = Ia0[typ2]
         phi0 = angle(Ia0)
 
         # Initial Steady-state internal EMF.
@@ -198,40 +287,42 @@ class DynamicCase(_Named, _Serializable):
         return Efd0, Xgen0
 
 
-    def exciterInit(self, Xexc, Vexc):
+    def exciterInit(self, Efd0, Vexc):
         """ Based on ExciterInit.m from MatDyn by Stijn Cole, developed at
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param Efd0: Initial field voltage of each generator.
+        @param Vexc: Initial generator bus voltage magnitudes.
+
         @rtype: tuple
         @return: Exciter initial conditions.
         """
         exciters = self.exciters
 
-        Xexc0 = zeros(Xexc.shape)
-        Pexc0 = zeros(len(exciters))
+        Xexc0 = zeros((len(exciters), 3))
+        Pexc0 = zeros((len(exciters), 12))
 
-        typ1 = [e.generator._i for e in exciters if e.model ==CONST_EXCITATION]
-        typ2 = [e.generator._i for e in exciters if e.model == IEEE_DC1A]
+        typ1 = _models(exciters, CONST_EXCITATION)
+        typ2 = _models(exciters, IEEE_DC1A)
 
         # Exciter type 1: constant excitation
-        Efd0 = Xexc[typ1, 0]
-        Xexc0[typ1, 0] = Efd0
+        Xexc0[typ1, 0] = Efd0[typ1]
 
         # Exciter type 2: IEEE DC1A
-        Efd0 = Xexc[typ2, 0]
-        Ka = array([e.ka for e in exciters])
-        Ta = array([e.ta for e in exciters])
-        Ke = array([e.ke for e in exciters])
-        Te = array([e.te for e in exciters])
-        Kf = array([e.kf for e in exciters])
-        Tf = array([e.tf for e in exciters])
-        Aex = array([e.aex for e in exciters])
-        Bex = array([e.bex for e in exciters])
-        Ur_min = array([e.ur_min for e in exciters])
-        Ur_max = array([e.ur_max for e in exciters])
-
-        U = Vexc[typ2, 0]
+        Efd0 = Efd0[typ2]
+        Ka = array([e.ka for e in exciters])[typ2]
+        Ta = array([e.ta for e in exciters])[typ2]
+        Ke = array([e.ke for e in exciters])[typ2]
+        Te = array([e.te for e in exciters])[typ2]
+        Kf = array([e.kf for e in exciters])[typ2]
+        Tf = array([e.tf for e in exciters])[typ2]
+        Aex = array([e.aex for e in exciters])[typ2]
+        Bex = array([e.bex for e in exciters])[typ2]
+        Ur_min = array([e.ur_min for e in exciters])[typ2]
+        Ur_max = array([e.ur_max for e in exciters])[typ2]
+
+        U = Vexc[typ2]
 
         Uf = zeros(len(typ2))
         Ux = Aex * exp(Bex * Efd0)
@@ -250,39 +341,41 @@ class DynamicCase(_Named, _Serializable):
         return Xexc0, Pexc0
 
 
-    def governorInit(self, Xgov, Vgov):
+    def governorInit(self, Pm0, Vgov):
         """ Based on GovernorInit.m from MatDyn by Stijn Cole, developed at
         Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/
         electa/teaching/matdyn/} for more information.
 
+        @param Pm0: Initial mechanical power of each generator.
+        @param Vgov: Initial generator speeds.
+
         @rtype: tuple
         @return: Initial governor conditions.
         """
         governors = self.governors
 
-        Xgov0 = zeros(Xgov.shape)
-        Pgov0 = zeros(len(governors))
+        Xgov0 = zeros((len(governors), 4))
+        Pgov0 = zeros((len(governors), 9))
 
-        typ1 = [g.generator._i for g in governors if g.model == CONST_POWER]
-        typ2 = [g.generator._i for g in governors if g.model == GENERAL_IEEE]
+        typ1 = _models(governors, CONST_POWER)
+        typ2 = _models(governors, GENERAL_IEEE)
 
         # Governor type 1: constant power
-        Pm0 = Xgov[typ1, 0]
-        Xgov0[typ1, 0] = Pm0
+        Xgov0[typ1, 0] = Pm0[typ1]
 
         # Governor type 2: IEEE general speed-governing system
-        Pm0 = Xgov[typ2, 0]
+        Pm0 = Pm0[typ2]
 
-        K = array([g.k for g in governors])
-        T1 = array([g.t1 for g in governors])
-        T2 = array([g.t2 for g in governors])
-        T3 = array([g.t3 for g in governors])
-        Pup = array([g.p_up for g in governors])
-        Pdown = array([g.p_down for g in governors])
-        Pmax = array([g.p_max for g in governors])
-        Pmin = array([g.p_min for g in governors])
+        K = array([g.k for g in governors])[typ2]
+        T1 = array([g.t1 for g in governors])[typ2]
+        T2 = array([g.t2 for g in governors])[typ2]
+        T3 = array([g.t3 for g in governors])[typ2]
+        Pup = array([g.p_up for g in governors])[typ2]
+        Pdown = array([g.p_down for g in governors])[typ2]
+        Pmax = array([g.p_max for g in governors])[typ2]
+        Pmin = array([g.p_min for g in governors])[typ2]
 
-        omega0 = Vgov[typ2, 0]
+        omega0 = Vgov[typ2]
 
         zz0 = Pm0
         PP0 = Pm0
@@ -319,25 +412,25 @@ class DynamicCase(_Named, _Serializable):
         Iq = zeros(ng)
         Pe = zeros(ng)
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        typ1 = _models(generators, CLASSICAL)
+        typ2 = _models(generators, FOURTH_ORDER)
 
         # Generator type 1: classical model
         delta = Xg[typ1, 0]
         Eq_tr = Xg[typ1, 2]
 
-        xd = array([g.xd for g in generators])
+        x_tr = array([g.x_tr for g in generators])[typ1]
 
         Pe[typ1] = \
-            1 / xd * abs(U[typ1]) * abs(Eq_tr) * sin(delta - angle(U[typ1]))
+            1 / x_tr * abs(U[typ1]) * abs(Eq_tr) * sin(delta - angle(U[typ1]))
 
         # Generator type 2: 4th order model
-        delta = Xg[typ1, 0]
-        Eq_tr = Xg[typ1, 2]
-        Ed_tr = Xg[typ1, 3]
+        delta = Xg[typ2, 0]
+        Eq_tr = Xg[typ2, 2]
+        Ed_tr = Xg[typ2, 3]
 
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
+        xd_tr = array([g.xd_tr for g in generators])[typ2]
+        xq_tr = array([g.xq_tr for g in generators])[typ2]
 
         theta = angle(U)
 
@@ -367,30 +460,30 @@ class DynamicCase(_Named, _Serializable):
         j = 0 + 1j
 
         ng = len(gbus)
-        Igen = zeros(ng)
+        Igen = zeros(ng, dtype=complex)
 
-        s = len(augYbus_solver)
-        Ig = zeros(s)
+        s = augYbus_solver.shape[0]
+        Ig = zeros(s, dtype=complex)
 
         # Define generator types.
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        typ1 = _models(generators, CLASSICAL)
+        typ2 = _models(generators, FOURTH_ORDER)
 
         # Generator type 1: classical model
         delta = Xgen[typ1, 0]
         Eq_tr = Xgen[typ1, 2]
 
-        xd_tr = array([g.xd_tr for g in generators])[typ1]
+        x_tr = array([g.x_tr for g in generators])[typ1]
 
         # Calculate generator currents
-        Igen[typ1] = (Eq_tr * exp(j * delta)) / (j * xd_tr)
+        Igen[typ1] = (Eq_tr * exp(j * delta)) / (j * x_tr)
 
         # Generator type 2: 4th order model
         delta = Xgen[typ2, 0]
         Eq_tr = Xgen[typ2, 2]
         Ed_tr = Xgen[typ2, 3]
 
-        xd_tr = array([g.xd_tr for g in generators])[typ2] # Pgen(type2,8)
+        xd_tr = array([g.xd_tr for g in generators])[typ2]
 
         # Calculate generator currents. (Padiyar, p.417.)
         Igen[typ2] = (Eq_tr + j * Ed_tr) * exp(j * delta) / (j * xd_tr)
@@ -398,7 +491,7 @@ class DynamicCase(_Named, _Serializable):
         # Calculations --------------------------------------------------------
 
         # Generator currents
-        Ig[gbus] = Igen
+        add.at(Ig, gbus, Igen)
 
         # Calculate network voltages: U = Y/Ig
         U = augYbus_solver.solve(Ig)
@@ -417,8 +510,8 @@ class DynamicCase(_Named, _Serializable):
 
         F = zeros(Xexc.shape)
 
-        typ1 = [e.generator._i for e in exciters if e.model ==CONST_EXCITATION]
-        typ2 = [e.generator._i for e in exciters if e.model == IEEE_DC1A]
+        typ1 = _models(exciters, CONST_EXCITATION)
+        typ2 = _models(exciters, IEEE_DC1A)
 
         # Exciter type 1: constant excitation
         F[typ1, :] = 0.0
@@ -441,18 +534,14 @@ class DynamicCase(_Named, _Serializable):
         Uref = Pexc[typ2, 10]
         Uref2 = Pexc[typ2, 11]
 
-        U = Vexc[typ2, 1]
+        U = Vexc[typ2]
 
         Ux = Aex * exp(Bex * Efd)
         dUr = 1 / Ta * (Ka * (Uref - U + Uref2 - Uf) - Ur)
         dUf = 1 / Tf * (Kf / Te * (Ur - Ux - Ke * Efd) - Uf)
 
-        if sum(flatnonzero(Ur > Ur_max)) >= 1:
-            Ur2 = Ur_max
-        elif sum(flatnonzero(Ur < Ur_max)) >= 1:
-            Ur2 = Ur_min
-        else:
-            Ur2 = Ur
+        # Regulator output limits.
+        Ur2 = minimum(maximum(Ur, Ur_min), Ur_max)
 
         dEfd = 1 / Te * (Ur2 - Ux - Ke * Efd)
         F[typ2, :] = c_[dEfd, dUf, dUr]
@@ -476,8 +565,8 @@ class DynamicCase(_Named, _Serializable):
 
         F = zeros(Xgov.shape)
 
-        typ1 = [g.generator._i for g in governors if g.model == CONST_POWER]
-        typ2 = [g.generator._i for g in governors if g.model == GENERAL_IEEE]
+        typ1 = _models(governors, CONST_POWER)
+        typ2 = _models(governors, GENERAL_IEEE)
 
         # Governor type 1: constant power
         F[typ1, 0] = 0
@@ -498,28 +587,20 @@ class DynamicCase(_Named, _Serializable):
         Pmin = Pgov[typ2, 7]
         P0 = Pgov[typ2, 8]
 
-        omega = Vgov[typ2, 0]
+        omega = Vgov[typ2]
 
         dx = K * (-1 / T1 * x + (1 - T2 / T1) * (omega - omegas))
         dP = 1 / T1 * x + T2 / T1 * (omega - omegas)
 
         y = 1 / T3 * (P0 - P - Pm)
 
-        y2 = y
-
-        if sum(flatnonzero(y > Pup)) >= 1:
-            y2 = (1 - flatnonzero(y > Pup)) * y2 + flatnonzero(y > Pup) * Pup
-        if sum(flatnonzero(y < Pdown)) >= 1:
-            y2 = (1 - flatnonzero(y<Pdown)) * y2 + flatnonzero(y<Pdown) * Pdown
+        # Ramp rate limits.
+        y2 = minimum(maximum(y, Pdown), Pup)
 
         dz = y2
 
-        dPm = y2
-
-        if sum(flatnonzero(z > Pmax)) >= 1:
-            dPm = (1 - flatnonzero(z > Pmax)) * dPm + flatnonzero(z > Pmax) * 0
-        if sum(flatnonzero(z < Pmin)) >= 1:
-            dPm = (1 - flatnonzero(z < Pmin)) * dPm + flatnonzero(z < Pmin) * 0
+        # Turbine output limits.
+        dPm = y2 * ((z <= Pmax) & (z >= Pmin))
 
         F[typ2, :] = c_[dPm, dP, dx, dz]
 
@@ -542,8 +623,8 @@ class DynamicCase(_Named, _Serializable):
 
         F = zeros(Xgen.shape)
 
-        typ1 = [g._i for g in generators if g.model == CLASSICAL]
-        typ2 = [g._i for g in generators if g.model == FOURTH_ORDER]
+        typ1 = _models(generators, CLASSICAL)
+        typ2 = _models(generators, FOURTH_ORDER)
 
         # Generator type 1: classical model
         omega = Xgen[typ1, 1]
@@ -554,25 +635,25 @@ class DynamicCase(_Named, _Serializable):
 
         Pe = Vgen[typ1, 2]
 
-        ddelta = omega = omegas
+        ddelta = omega - omegas
         domega = pi * self.freq / H * (-D * (omega - omegas) + Pm0 - Pe)
         dEq = zeros(len(typ1))
 
-        F[typ1, :] = c_[ddelta, domega, dEq]
+        F[typ1, :3] = c_[ddelta, domega, dEq]
 
         # Generator type 2: 4th order model
         omega = Xgen[typ2, 1]
         Eq_tr = Xgen[typ2, 2]
         Ed_tr = Xgen[typ2, 3]
 
-        H = array([g.h for g in generators])
-        D = array([g.d for g in generators])
-        xd = array([g.xd for g in generators])
-        xq = array([g.xq for g in generators])
-        xd_tr = array([g.xd_tr for g in generators])
-        xq_tr = array([g.xq_tr for g in generators])
-        Td0_tr = array([g.td for g in generators])
-        Tq0_tr = array([g.tq for g in generators])
+        H = array([g.h for g in generators])[typ2]
+        D = array([g.d for g in generators])[typ2]
+        xd = array([g.xd for g in generators])[typ2]
+        xq = array([g.xq for g in generators])[typ2]
+        xd_tr = array([g.xd_tr for g in generators])[typ2]
+        xq_tr = array([g.xq_tr for g in generators])[typ2]
+        Td0_tr = array([g.td for g in generators])[typ2]
+        Tq0_tr = array([g.tq for g in generators])[typ2]
 
         Id = Vgen[typ2, 0]
         Iq = Vgen[typ2, 1]
@@ -594,6 +675,13 @@ class DynamicCase(_Named, _Serializable):
 
         return F
 
+
+def _models(components, model):
+    """ Returns the indexes of the generators, exciters or governors of the
+    given model.
+    """
+    return [i for i, c in enumerate(components) if c.model == model]
+
 #------------------------------------------------------------------------------
 #  "DynamicSolver" class:
 #------------------------------------------------------------------------------
@@ -612,13 +700,19 @@ class DynamicSolver(object):
     """
 
     def __init__(self, dyn_case, method=None, tol=1e-04,
-                 minstep=1e-03, maxstep=1e02, verbose=True, plot=True):
+                 minstep=1e-03, maxstep=1e02, verbose=True, plot=False,
+                 events=None, criterion=None, recorder=None):
 
         #: Dynamic case.
         self.dyn_case = dyn_case
 
-        #: Integration method.
+        #: Integration method. Its solve method takes one step and returns
+        #: the states and inputs, the bus voltages, the error estimate, the
+        #: number of failed attempts, the time at the end of the step and the
+        #: step size of the next step.
         self.method = ModifiedEuler() if method is None else method
+        if getattr(self.method, "dyn_case", None) is None:
+            self.method.dyn_case = dyn_case
 
         #: Specify the tolerance of the error. This argument is only used for
         #: the Runge-Kutta Fehlberg and Higham and Hall methods.
@@ -632,36 +726,57 @@ class DynamicSolver(object):
         #: algorithms: Runge-Kutta Fehlberg and Higham and Hall methods.
         self.maxstep = maxstep
 
+        # Step size control settings not given to an adaptive integration
+        # method are those of the solver.
+        for name in ["tol", "minstep", "maxstep"]:
+            if getattr(self.method, name, False) is None:
+                setattr(self.method, name, getattr(self, name))
+
         #: Print progress output?
         self.verbose = verbose
 
         #: Draw plot?
         self.plot = plot
 
+        #: Bus and branch change events.
+        self.events = [] if events is None else events
 
-    def solve(self):
-        """ Runs dynamic simulation.
+        #: Instability criterion on which the simulation is terminated
+        #: early. If None, the simulation always runs until the stoptime.
+        self.criterion = criterion
+
+        #: Recorder to which the trajectory is streamed. If None, the
+        #: trajectory is kept in memory and returned in the solution.
+        self.recorder = recorder
+
+
+    def initialise(self):
+        """ Solves the initial power flow, builds and factorises the augmented
+        admittance matrix and calculates the initial state of the generators,
+        exciters and governors.
+
+        The result may be passed to L{solve} any number of times, allowing
+        many disturbance scenarios to be simulated from the same steady-state.
 
         @rtype: dict
-        @return: Solution dictionary with the following keys:
-                   - C{angles} - generator angles
-                   - C{speeds} - generator speeds
-                   - C{eq_tr} - q component of transient voltage behind
-                     reactance
-                   - C{ed_tr} - d component of transient voltage behind
-                     reactance
-                   - C{efd} - Excitation voltage
-                   - C{pm} - mechanical power
-                   - C{voltages} - bus voltages
-                   - C{stepsize} - step size integration method
-                   - C{errest} - estimation of integration error
-                   - C{failed} - failed steps
-                   - C{time} - time points
+        @return: Initial conditions with the following keys:
+                   - C{U0} - initial bus voltages
+                   - C{gbus} - generator bus indexes
+                   - C{augYbus} - augmented bus admittance matrix
+                   - C{augYbus_solver} - factorisation of C{augYbus}
+                   - C{Xgen0}, C{Pgen0}, C{Vgen0} - generator states,
+                     parameters and inputs
+                   - C{Xexc0}, C{Pexc0}, C{Vexc0} - exciter states,
+                     parameters and inputs
+                   - C{Xgov0}, C{Pgov0}, C{Vgov0} - governor states,
+                     parameters and inputs
+                 An empty dict is returned if the power flow does not converge
+                 or the system is not in steady-state.
         """
-        t0 = time()
-        buses = self.dyn_case.buses
+        dyn_case = self.dyn_case
+        buses = dyn_case.case.connected_buses
 
-        solution = NewtonPF(self.case).solve()
+        solution = NewtonPF(dyn_case.case, verbose=self.verbose).solve()
 
         if not solution["converged"]:
             logger.error("Power flow did not converge. Exiting...")
@@ -673,281 +788,592 @@ class DynamicSolver(object):
         if self.verbose:
             logger.info("Constructing augmented admittance matrix...")
 
-        gbus = [g.bus._i for g in self.dyn_generators]
-        ng = len(gbus)
+        gbus = [g.generator.bus._i for g in dyn_case.dyn_generators]
 
         Um = array([bus.v_magnitude for bus in buses])
         Ua = array([bus.v_angle * (pi / 180.0) for bus in buses])
         U0 = Um * exp(1j * Ua)
-        U00 = U0
 
-        augYbus = self.dyn_case.getAugYbus(U0, gbus)
-        augYbus_solver = splu(augYbus)
+        augYbus = dyn_case.getAugYbus(U0, gbus)
+        augYbus_solver = AugYbusSolver(augYbus)
 
         # Calculate initial machine state.
         if self.verbose:
             logger.info("Calculating initial state...")
 
-        Efd0, Xgen0 = self.dyn_case.generatorInit(U0)
+        Efd0, Xgen0 = dyn_case.generatorInit(U0[gbus])
         omega0 = Xgen0[:, 1]
 
-        Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0, U0)
-        Vgen0 = r_[Id0, Iq0, Pe0]
+        Id0, Iq0, Pe0 = dyn_case.machineCurrents(Xgen0, U0[gbus])
+        Vgen0 = c_[Id0, Iq0, Pe0]
 
         # Exciter initial conditions.
         Vexc0 = abs(U0[gbus])
-        Xexc0, Pexc0 = self.dyn_case.exciterInit(Efd0, Vexc0)
+        Xexc0, Pexc0 = dyn_case.exciterInit(Efd0, Vexc0)
 
         # Governor initial conditions.
         Pm0 = Pe0
-        Xgov0, Pgov0 = self.dyn_case.governorInit(Pm0, omega0)
+        Xgov0, Pgov0 = dyn_case.governorInit(Pm0, omega0)
         Vgov0 = omega0
 
         # Check steady-state.
-        Fexc0 = self.dyn_case.exciter(Xexc0, Pexc0, Vexc0)
-        Fgov0 = self.dyn_case.governor(Xgov0, Pgov0, Vgov0)
-        Fgen0 = self.dyn_case.generator(Xgen0, Xexc0, Xgov0, Vgen0)
+        Fexc0 = dyn_case.exciter(Xexc0, Pexc0, Vexc0)
+        Fgov0 = dyn_case.governor(Xgov0, Pgov0, Vgov0)
+        Fgen0 = dyn_case.generator(Xgen0, Xexc0, Xgov0, Vgen0)
 
         # Check Generator Steady-state
-        if sum(abs(Fgen0)) > 1e-06:
+        if abs(Fgen0).sum() > 1e-06:
             logger.error("Generator not in steady-state. Exiting...")
             return {}
         # Check Exciter Steady-state
-        if sum(abs(Fexc0)) > 1e-06:
+        if abs(Fexc0).sum() > 1e-06:
             logger.error("Exciter not in steady-state. Exiting...")
             return {}
         # Check Governor Steady-state
-        if sum(abs(Fgov0)) > 1e-06:
+        if abs(Fgov0).sum() > 1e-06:
             logger.error("Governor not in steady-state. Exiting...")
             return {}
 
         if self.verbose:
             logger.info("System in steady-state.")
 
+        # Generator parameters are held by the dynamic case.
+        Pgen0 = None
+
+        return {"U0": U0, "gbus": gbus, "augYbus": augYbus,
+                "augYbus_solver": augYbus_solver,
+                "Xgen0": Xgen0, "Pgen0": Pgen0, "Vgen0": Vgen0,
+                "Xexc0": Xexc0, "Pexc0": Pexc0, "Vexc0": Vexc0,
+                "Xgov0": Xgov0, "Pgov0": Pgov0, "Vgov0": Vgov0}
+
+
+    def solve(self, init=None, state=None, until=None):
+        """ Runs dynamic simulation.
+
+        @param init: Initial conditions as returned by L{initialise}. The
+            initial power flow and machine initialisation are performed if
+            not specified.
+        @param state: State at the end of a previous simulation, from which
+            to resume. Events that have already been applied to the case
+            must not be given again.
+        @param until: Instant (s) at which to stop the simulation. Defaults
+            to the stoptime of the dynamic case.
+
+        @rtype: dict
+        @return: Solution dictionary with the following keys:
+                   - C{angles} - generator angles
+                   - C{speeds} - generator speeds
+                   - C{eq_tr} - q component of transient voltage behind
+                     reactance
+                   - C{ed_tr} - d component of transient voltage behind
+                     reactance
+                   - C{efd} - Excitation voltage
+                   - C{pm} - mechanical power
+                   - C{voltages} - bus voltages
+                   - C{stepsize} - step size integration method
+                   - C{errest} - estimation of integration error
+                   - C{failed} - number of failed steps
+                   - C{time} - time points
+                   - C{unstable} - was the simulation terminated by the
+                     instability criterion?
+                   - C{state} - final state, from which the simulation
+                     may be resumed
+                 If a recorder is set, the trajectory is streamed to it and
+                 is not included in the solution.
+        """
+        t0 = time()
+
+        if init is None:
+            init = self.initialise()
+        if not init:
+            return {}
+
+        gbus = init["gbus"]
+        U00 = init["U0"]
+
+        if state is None:
+            state = init
+            t = -0.02 # simulate 0.02s without applying events
+            i = 0
+        else:
+            t = state["t"]
+            i = state["i"]
+
+        U0 = state["U0"]
+        augYbus_solver = state["augYbus_solver"]
+
+        Xgen0, Pgen0, Vgen0 = state["Xgen0"], state["Pgen0"], state["Vgen0"]
+        Xexc0, Pexc0, Vexc0 = state["Xexc0"], state["Pexc0"], state["Vexc0"]
+        Xgov0, Pgov0, Vgov0 = state["Xgov0"], state["Pgov0"], state["Vgov0"]
+
+        adaptive = isinstance(self.method, RungeKuttaFehlberg)
+
         # Initialization of main stability loop.
-        t = -0.02 # simulate 0.02s without applying events
-        erst = False
-        failed = False
-        eulerfailed = False
+        errest = 0.0
+        failed = 0
+        unstable = False
 
-        stoptime = self.dyn_case.stoptime
+        stoptime = self.dyn_case.stoptime if until is None else until
 
-        if (isinstance(self.method, RungeKuttaFehlberg) or
-            isinstance(self.method, RungeKuttaHighamHall)):
-            stepsize = self.minstep
+        if adaptive:
+            stepsize = self.method.minstep
         else:
             stepsize = self.dyn_case.stepsize
 
+        events = sorted(self.events, key=lambda event: event.time)
         ev = 0
-        eventhappened = False
-        i = 0
+
+        if self.criterion is not None:
+            self.criterion.reset(init["Xgen0"])
 
         # Allocate memory for variables.
         if self.verbose:
             logger.info("Allocating memory...")
 
-        chunk = 5000
-        time = zeros(chunk)
-        time[0, :] = t
-        errest = zeros(chunk)
-        errest[0, :] = erst
-        stepsizes = zeros(chunk)
-        stepsizes[0, :] = stepsize
+        if self.recorder is not None and state is init:
+            self.recorder.open()
 
-        # System variables
-        voltages = zeros(chunk)
-        voltages[0, :] = U0.H
-
-        # Generator
-        angles = zeros((chunk, ng))
-        angles[0, :] = Xgen0[:, 0] * 180.0 / pi
-        speeds = zeros((chunk, ng))
-        speeds[0, :] = Xgen0[:, 0] / 2 * pi * self.dyn_case.freq
-        Eq_tr = zeros((chunk, ng))
-        Eq_tr[0, :] = Xgen0[:, 2]
-        Ed_tr = zeros((chunk, ng))
-        Ed_tr[0, :] = Xgen0[:, 3]
-
-        # Exciter and governor
-        Efd = zeros((chunk, ng))
-        Efd[0, :] = Efd0[:, 0]
-        PM = zeros((chunk, ng))
-        PM[0, :] = Pm0[:, 0]
+        if "trajectory" in state:
+            # The trajectory of the state ends at the instant of resumption,
+            # so it is extended into new arrays, rather than overwritten, by
+            # the first time point saved.
+            trajectory = dict(state["trajectory"])
+        else:
+            trajectory = {}
+            self._save(trajectory, i, t, stepsize, errest, U0, Xgen0, Xexc0,
+                       Xgov0)
 
         # Main stability loop.
-        while t < stoptime + stepsize:
+        while t < stoptime - 10 * EPS:
+            # Step exactly to the next event and to the stop time.
+            if ev < len(events) and t < events[ev].time < t + stepsize:
+                stepsize = events[ev].time - t
+            if t + stepsize > stoptime:
+                stepsize = stoptime - t
+
             i += 1
             if i % 45 == 0 and self.verbose:
-                logger.info("%6.2f%% completed." % t / stoptime * 100)
-
-            # Numerical Method.
-            Xgen0, self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, \
-                Vgov0, U0, t, newstepsize = self.method.solve(t, Xgen0,
-                    self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0,
-                    Vgov0, augYbus_solver, gbus, stepsize)
-
-#            if self.method == MODIFIED_EULER:
-#                solver = ModifiedEuler(t, Xgen0, self.Pgen0, Vgen0, Xexc0,
-#                                       Pexc0, Vexc0, Xgov0, Pgov0, Vgov0,
-#                                       augYbus_solver, gbus, stepsize)
-#
-#                Xgen0, self.Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0,
-#                Vgov0, U0, t, newstepsize = solver.solve()
-#            elif self.method == RUNGE_KUTTA:
-#                pass
-#            elif self.method == RUNGE_KUTTA_FEHLBERG:
-#                pass
-#            elif self.method == HIGHAM_HALL:
-#                pass
-#            elif self.method == MODIFIED_EULER2:
-#                pass
-#            else:
-#                raise ValueError
-
-            if eulerfailed:
-                logger.info("No solution found. Exiting... ")
+                logger.info("%6.2f%% completed." % (t / stoptime * 100))
+
+            # Numerical Method. Adaptive methods may take a shorter step
+            # than the one given, so the time at the end of the step and the
+            # step size taken are those returned.
+            tprev = t
+            Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, \
+                Vgov0, U0, errest, stepfailed, t, newstepsize = \
+                self.method.solve(t, Xgen0, Pgen0, Vgen0, Xexc0, Pexc0,
+                    Vexc0, Xgov0, Pgov0, Vgov0, augYbus_solver, gbus,
+                    stepsize)
+            stepsize = t - tprev
+            failed += stepfailed
+
+            if not adaptive:
+                newstepsize = self.dyn_case.stepsize
+            elif newstepsize < self.method.minstep:
+                logger.info("No solution found with minimum step size. "
+                            "Exiting... ")
                 return {}
 
-            if failed:
-                t = t - stepsize
+            # Save values.
+            self._save(trajectory, i, t, stepsize, errest, U0, Xgen0, Xexc0,
+                       Xgov0)
 
-            # End exactly at stop time.
-            if t + newstepsize > stoptime:
-                newstepsize = stoptime - t
-            elif stepsize < self.minstep:
-                logger.info("No solution found with minimum step size. Exiting... ")
-                return {}
+            # Check for events.
+            if ev < len(events) and t >= events[ev].time - 10 * EPS:
+                fired = []
+                while ev < len(events) and t >= events[ev].time - 10 * EPS:
+                    fired.append(events[ev])
+                    ev += 1
 
-            # Allocate new memory chunk if matrices are full.
-            if i > time.shape[0]:
-                time = zeros(chunk)
-                errest = zeros(chunk)
-                stepsize = zeros(chunk)
-                voltages = zeros(chunk)
-                angles = zeros((chunk, ng))
-                speeds = zeros((chunk, ng))
-                Eq_tr = zeros((chunk, ng))
-                Ed_tr = zeros((chunk, ng))
-                Efd = zeros((chunk, ng))
-                PM = zeros((chunk, ng))
+                # Update the factorisation for the new topology.
+                delta = self.dyn_case.applyEvents(fired, U00)
+                augYbus_solver = augYbus_solver.update(delta)
 
-            # Save values.
-            stepsizes[i, :] = stepsize
-            errest[i, :] = erst
-            time[i, :] = t
+                U0 = self.dyn_case.solveNetwork(Xgen0, augYbus_solver, gbus)
 
-            voltages[i, :] = U0
+                Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0, U0[gbus])
+                Vgen0 = c_[Id0, Iq0, Pe0]
+                Vexc0 = abs(U0[gbus])
 
-            # Exciters
-            Efd[i, :] = Xexc0[:, 0]
-            # TODO: Set Efd to zero when using classical generator model.
+                # Decrease stepsize after event occured.
+                if adaptive:
+                    newstepsize = self.method.minstep
 
-            # Governors
-            PM[i, :] = Xgov0[:, 0]
+                # If event occurs, save values at t- and t+.
+                i += 1
+                self._save(trajectory, i, t, stepsize, errest, U0, Xgen0,
+                           Xexc0, Xgov0)
 
-            # Generators
-            angles[i, :] = Xgen0[:, 0] * 180.0 / pi
-            speeds[i, :] = Xgen0[:, 1] * (2 * pi * self.dyn_case.freq)
-            Eq_tr[i, :] = Xgen0[:, 2]
-            Ed_tr[i, :] = Xgen0[:, 3]
+            # Terminate as soon as the trajectory is found to be unstable.
+            if self.criterion is not None and self.criterion.unstable(t,
+                    Xgen0, Vgen0, Xgov0, ev == len(events)):
+                unstable = True
+                if self.verbose:
+                    logger.info("Instability detected at %.3fs." % t)
+                break
 
-            # Adapt step size if event will occur in next step.
-            if (len(self.events) > 0 and ev <= len(self.events) and
-                isinstance(self.method, RungeKuttaFehlberg) and
-                isinstance(self.method, RungeKutta)):
+            stepsize = newstepsize
 
-                if t + newstepsize >= self.events[ev].t:
-                    if self.events[ev] - t < newstepsize:
-                        newstepsize = self.events[ev].t - t
+        # End of main stability loop ------------------------------------------
 
-            # Check for events.
-            if len(self.events) > 0 and ev <= len(self.events):
-                for event in self.events:
-                    if (abs(t - self.events[ev].t) > 10 * EPS or
-                        ev > len(self.events)):
-                        break
-                    else:
-                        eventhappened = True
+        # Output --------------------------------------------------------------
 
-                    event.obj.set_attr(event.param, event.newval)
+        if self.verbose:
+            logger.info("100%% completed")
+            elapsed = time() - t0
+            logger.info("Simulation completed in %5.2f seconds." % elapsed)
 
-                    ev += 1
+        if self.recorder is not None:
+            self.recorder.close()
 
-                if eventhappened:
-                    # Refactorise.
-                    self.dyn_case.getAugYbus(U00, gbus)
-                    U0 = self.dyn_case.solveNetwork(Xgen0, self.Pgen0,
-                                                    augYbus_solver, gbus)
+        # Save only the first i elements.
+        solution = dict([(k, v[:i + 1]) for k, v in trajectory.iteritems()])
+        solution["failed"] = failed
+        solution["unstable"] = unstable
 
-                    Id0, Iq0, Pe0 = self.dyn_case.machineCurrents(Xgen0,
-                                                                  self.Pgen0,
-                                                                  U0[gbus])
-                    Vgen0 = r_[Id0, Iq0, Pe0]
-                    Vexc0 = abs(U0[gbus])
+        solution["state"] = {"t": t, "i": i, "U0": U0,
+            "augYbus_solver": augYbus_solver,
+            "Xgen0": Xgen0, "Pgen0": Pgen0, "Vgen0": Vgen0,
+            "Xexc0": Xexc0, "Pexc0": Pexc0, "Vexc0": Vexc0,
+            "Xgov0": Xgov0, "Pgov0": Pgov0, "Vgov0": Vgov0,
+            "trajectory": dict([(k, solution[k]) for k in trajectory])}
 
-                    # Decrease stepsize after event occured.
-                    if (isinstance(self.method, RungeKuttaFehlberg) or
-                        isinstance(self.method, RungeKuttaHighamHall)):
+        if self.plot and self.recorder is None:
+            self.plotSolution(solution)
 
-                        newstepsize = self.minstepsize
+        return solution
 
-                    # If event occurs, save values at t- and t+.
-                    i += 1
 
-                    # Save values
-                    stepsize[i, :] = stepsize.T
-                    errest[i, :] = erst.T
-                    time[i, :] = t
+    def plotSolution(self, solution):
+        """ Plots the generator angles and speeds and the bus voltage
+        magnitudes of a solution.
+        """
+        from pylab import figure, subplot, plot, xlabel, ylabel, show
+
+        t = solution["time"]
+
+        figure()
+        subplot(3, 1, 1)
+        plot(t, solution["angles"])
+        ylabel("Angle (deg)")
+        subplot(3, 1, 2)
+        plot(t, solution["speeds"])
+        ylabel("Speed (pu)")
+        subplot(3, 1, 3)
+        plot(t, abs(solution["voltages"]))
+        ylabel("Voltage (pu)")
+        xlabel("Time (s)")
+        show()
+
+
+    def _save(self, trajectory, i, t, stepsize, errest, U, Xgen, Xexc, Xgov):
+        """ Saves the values at time point i, allocating a new memory chunk
+        if the arrays are full, or passes them to the recorder.
+        """
+        if self.recorder is not None:
+            self.recorder.record({"time": t, "stepsize": stepsize,
+                "errest": errest, "voltages": U,
+                "efd": Xexc[:, 0], "pm": Xgov[:, 0],
+                "angles": Xgen[:, 0] * 180.0 / pi,
+                "speeds": Xgen[:, 1] / (2 * pi * self.dyn_case.freq),
+                "eq_tr": Xgen[:, 2], "ed_tr": Xgen[:, 3]})
+            return
 
-                    voltages[i, :] = U0.T
+        chunk = 5000
+        ng = Xgen.shape[0]
+
+        if not trajectory:
+            trajectory["time"] = zeros(chunk)
+            trajectory["stepsize"] = zeros(chunk)
+            trajectory["errest"] = zeros(chunk)
+            trajectory["voltages"] = zeros((chunk, len(U)), dtype=complex)
+            for key in ["angles", "speeds", "eq_tr", "ed_tr", "efd", "pm"]:
+                trajectory[key] = zeros((chunk, ng))
+        elif i >= trajectory["time"].shape[0]:
+            for key, values in trajectory.items():
+                trajectory[key] = r_[values, zeros((chunk,) + values.shape[1:],
+                                                   dtype=values.dtype)]
+
+        trajectory["time"][i] = t
+        trajectory["stepsize"][i] = stepsize
+        trajectory["errest"][i] = errest
 
-                    # Exciters.
-                    # Set Efd to zero when using classical generator model.
-#                    Efd[i, :] = Xexc0[:, 1] * (flatnonzero(genmodel > 1))
+        # System variables
+        trajectory["voltages"][i, :] = U
 
-                    # Governors.
-                    PM[i, :] = Xgov0[:, 1]
+        # Exciters
+        trajectory["efd"][i, :] = Xexc[:, 0]
+        # TODO: Set Efd to zero when using classical generator model.
 
-                    # Generators.
-                    angles[i, :] = Xgen0[:, 0] * 180.0 / pi
-                    speeds[i, :] = Xgen0[:, 1] / (2.0 * pi * self.freq)
-                    Eq_tr[i, :] = Xgen0[:, 2]
-                    Ed_tr[i, :] = Xgen0[:, 3]
+        # Governors
+        trajectory["pm"][i, :] = Xgov[:, 0]
 
-                    eventhappened = False
+        # Generators
+        trajectory["angles"][i, :] = Xgen[:, 0] * 180.0 / pi
+        trajectory["speeds"][i, :] = Xgen[:, 1] / (2 * pi * self.dyn_case.freq)
+        trajectory["eq_tr"][i, :] = Xgen[:, 2]
+        trajectory["ed_tr"][i, :] = Xgen[:, 3]
 
-            # Advance time
-            stepsize = newstepsize
-            t += stepsize
+#------------------------------------------------------------------------------
+#  "TrajectoryRecorder" class:
+#------------------------------------------------------------------------------
 
-        # End of main stability loop ------------------------------------------
+class TrajectoryRecorder(object):
+    """ Streams selected trajectory channels of a dynamic simulation to
+    a L{ChannelStore}, keeping only one chunk of samples in memory.
 
-        # Output --------------------------------------------------------------
+    The store is appended to whenever a chunk is flushed, so it may be read
+    with L{TrajectoryReader} while the simulation is still running.
+    """
 
-        if self.verbose:
-            logger.info("100%% completed")
-            elapsed = time() - t0
-            logger.info("Simulation completed in %5.2f seconds." % elapsed)
+    def __init__(self, path, channels=None, decimation=1, chunk=1000):
+        """ Constructs a new TrajectoryRecorder instance.
+        """
+        #: Directory to which the channels are written.
+        self.path = path
 
-        # Save only the first i elements.
-        angles = angles[0:i, :]
-        speeds = speeds[0:i, :]
-        Eq_tr = Eq_tr[0:i, :]
-        Ed_tr = Ed_tr[0:i, :]
+        #: Names of the recorded channels. All channels are recorded if None.
+        self.channels = channels
+
+        #: Only every n-th time point is recorded.
+        self.decimation = decimation
+
+        #: Number of samples buffered before being written to file.
+        self.chunk = chunk
+
+        #: Buffered samples for each channel.
+        self._buffer = {}
+
+        #: Number of time points offered to the recorder.
+        self._points = 0
+
+        #: Store of the written samples.
+        self._store = None
+
+
+    def open(self):
+        """ Discards the samples of any previous simulation.
+        """
+        self._buffer = {}
+        self._points = 0
+        self._store = None
+
+
+    def record(self, values):
+        """ Records the given channel values, subject to decimation.
+        """
+        self._points += 1
+        if (self._points - 1) % self.decimation:
+            return
+
+        if self._store is None:
+            self._init_channels(values)
+
+        for name in self._buffer:
+            self._buffer[name].append(values[name])
+
+        if len(self._buffer["time"]) >= self.chunk:
+            self.flush()
+
+
+    def flush(self):
+        """ Writes the buffered samples to file.
+        """
+        if not self._buffer.get("time"):
+            return
+
+        self._store.append(self._buffer)
+        self._buffer = dict([(name, []) for name in self._buffer])
+
+
+    def close(self):
+        """ Writes any buffered samples to file.
+        """
+        self.flush()
+
+
+    def _init_channels(self, values):
+        """ Creates a store of the channels, replacing the output of any
+        previous simulation.
+        """
+        channels = self.channels
+        if channels is None:
+            channels = values.keys()
+        elif "time" not in channels:
+            channels = ["time"] + list(channels)
+
+        header = {}
+        for name in channels:
+            value = array(values[name])
+            header[name] = (value.dtype, value.shape)
+            self._buffer[name] = []
+
+        self._store = ChannelStore.create(self.path, header)
+
+#------------------------------------------------------------------------------
+#  "TrajectoryReader" class:
+#------------------------------------------------------------------------------
+
+class TrajectoryReader(ChannelStore):
+    """ Reads trajectories written by L{TrajectoryRecorder}.
+
+    Channels are memory-mapped, so only the requested slice of time points
+    and machines is read from disk.
+    """
+
+    def __init__(self, path):
+        """ Constructs a new TrajectoryReader instance.
+        """
+        super(TrajectoryReader, self).__init__(path, "r")
+
+
+    @property
+    def time(self):
+        """ Recorded time points.
+        """
+        return self.channel("time")
+
+
+    def read(self, name, start=None, stop=None, index=None):
+        """ Returns the samples of the named channel between the given
+        instants.
+
+        @param start: Time (s) of the first sample. Defaults to the first.
+        @param stop: Time (s) after the last sample. Defaults to the last.
+        @param index: Machine or bus indexes to read. All are read if None.
+        """
+        t = self.time
+        i = 0 if start is None else searchsorted(t, start, "left")
+        j = self.count if stop is None else searchsorted(t, stop, "left")
+
+        values = self.channel(name)[i:j]
+        if index is not None:
+            values = values[:, index]
+
+        return array(values)
+
+#------------------------------------------------------------------------------
+#  "AugYbusSolver" class:
+#------------------------------------------------------------------------------
+
+class AugYbusSolver(object):
+    """ Solves the network equations for the augmented bus admittance matrix
+    as its topology is changed by events.
+
+    Changes are applied as low-rank Sherman-Morrison-Woodbury updates to the
+    LU factorisation of the pre-disturbance matrix, which is never
+    refactorised. The update for each topology encountered is cached, so
+    switching back to a previous topology costs nothing.
+    """
+
+    def __init__(self, augYbus, max_rank=50):
+        """ Constructs a new AugYbusSolver instance.
+        """
+        #: Pre-disturbance augmented bus admittance matrix.
+        self.augYbus = augYbus.tocsc()
+
+        #: Matrix dimensions.
+        self.shape = augYbus.shape
+
+        #: Maximum number of modified buses before the updated matrix is
+        #: refactorised in full instead.
+        self.max_rank = max_rank
+
+        #: LU factorisation of the pre-disturbance matrix.
+        self.lu = splu(self.augYbus)
+
+        #: Accumulated changes to the matrix, keyed by (row, column).
+        self.delta = {}
+
+        #: Columns of the inverse of the pre-disturbance matrix.
+        self._columns = {}
 
-        Efd = Efd[0:i, :]
-        PM = PM[0:i, :]
+        #: Updates for each topology, keyed by the accumulated changes.
+        self._topologies = {}
 
-        voltages = voltages[0:i, :]
+        #: Update for the current topology.
+        self._update = None
 
-        stepsize = stepsize[0:i, :]
-        errest = errest[0:i, :]
-        time = time[0:i, :]
 
-        if self.plot:
-            raise NotImplementedError
+    def update(self, delta):
+        """ Returns a solver for the matrix with the given changes, keyed by
+        (row, column), added. The factorisation and all cached updates are
+        shared with this solver.
+        """
+        changed = dict(self.delta)
+        for ij, dy in delta.iteritems():
+            changed[ij] = changed.get(ij, 0.0) + dy
+        changed = dict([(ij, dy) for ij, dy in changed.iteritems()
+                        if abs(dy) > 1e-10])
+
+        key = tuple(sorted([(ij, round(dy.real, 10), round(dy.imag, 10))
+                            for ij, dy in changed.iteritems()]))
+
+        if key not in self._topologies:
+            self._topologies[key] = self._factorise(changed)
+
+        solver = copy.copy(self)
+        solver.delta = changed
+        solver._update = self._topologies[key]
+
+        return solver
+
+
+    def solve(self, b):
+        """ Returns the solution of the network equations for the given
+        current injections.
+        """
+        if self._update is None:
+            return self.lu.solve(b)
+        elif not isinstance(self._update, tuple):
+            return self._update.solve(b)
+
+        idx, D, W, K = self._update
+
+        x0 = self.lu.solve(b)
+        y = lu_solve(K, dot(D, x0[idx]))
+
+        return x0 - dot(W, y)
+
+
+    def _factorise(self, changed):
+        """ Returns the update for the matrix with the given changes.
+        """
+        if not changed:
+            return None
+
+        idx = sorted(set([i for ij in changed for i in ij]))
+        k = len(idx)
+
+        if k > self.max_rank:
+            rows = [i for i, _ in changed]
+            cols = [j for _, j in changed]
+            dY = csc_matrix((changed.values(), (rows, cols)), self.shape)
+            return splu((self.augYbus + dY).tocsc())
 
-        return {}
+        pos = dict([(i, p) for p, i in enumerate(idx)])
+        D = zeros((k, k), dtype=complex)
+        for (i, j), dy in changed.iteritems():
+            D[pos[i], pos[j]] = dy
+
+        # Columns of the inverse for the modified buses.
+        W = c_[tuple([self._column(i) for i in idx])]
+
+        # Capacitance matrix of the Woodbury identity.
+        K = lu_factor(eye(k) + dot(D, W[idx, :]))
+
+        return idx, D, W, K
+
+
+    def _column(self, i):
+        """ Returns the i-th column of the inverse of the pre-disturbance
+        matrix.
+        """
+        if i not in self._columns:
+            e = zeros(self.shape[0], dtype=complex)
+            e[i] = 1.0
+            self._columns[i] = self.lu.solve(e)
+        return self._columns[i]
 
 #------------------------------------------------------------------------------
 #  "ModifiedEuler" class:
@@ -969,54 +1395,54 @@ class ModifiedEuler(object):
 
         # Exciters.
         dFexc0 = case.exciter(Xexc0, Pexc, Vexc0)
-        Xexc1 = Xexc0 + case.stepsize * dFexc0
+        Xexc1 = Xexc0 + stepsize * dFexc0
 
         # Governors.
         dFgov0 = case.governor(Xgov0, Pgov, Vgov0)
-        Xgov1 = Xgov0 + case.stepsize * dFgov0
+        Xgov1 = Xgov0 + stepsize * dFgov0
 
         # Generators.
-        dFgen0 = case.generator(Xgen0, Xexc1, Xgov1, Pgen,Vgen0)
-        Xgen1 = Xgen0 + case.stepsize * dFgen0
+        dFgen0 = case.generator(Xgen0, Xexc1, Xgov1, Vgen0)
+        Xgen1 = Xgen0 + stepsize * dFgen0
 
         # Calculate system voltages.
-        U1 = case.solveNetwork(Xgen1, Pgen, augYbus_solver,gbus)
+        U1 = case.solveNetwork(Xgen1, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, Pgen, U1[gbus])
+        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, U1[gbus])
 
         # Update variables that have changed.
         Vexc1 = abs(U1[gbus])
-        Vgen1 = r_[Id1, Iq1, Pe1]
-        Vgov1 = Xgen1[:, 2]
+        Vgen1 = c_[Id1, Iq1, Pe1]
+        Vgov1 = Xgen1[:, 1]
 
         # Second Euler step ---------------------------------------------------
 
         # Exciters.
         dFexc1 = case.exciter(Xexc1, Pexc, Vexc1)
-        Xexc2 = Xexc0 + case.stepsize / 2 * (dFexc0 + dFexc1)
+        Xexc2 = Xexc0 + stepsize / 2 * (dFexc0 + dFexc1)
 
         # Governors.
         dFgov1 = case.governor(Xgov1, Pgov, Vgov1)
-        Xgov2 = Xgov0 + case.stepsize / 2 * (dFgov0 + dFgov1)
+        Xgov2 = Xgov0 + stepsize / 2 * (dFgov0 + dFgov1)
 
         # Generators.
-        dFgen1 = case.generator(Xgen1, Xexc2, Xgov2, Pgen, Vgen1)
-        Xgen2 = Xgen0 + case.stepsize / 2 * (dFgen0 + dFgen1)
+        dFgen1 = case.generator(Xgen1, Xexc2, Xgov2, Vgen1)
+        Xgen2 = Xgen0 + stepsize / 2 * (dFgen0 + dFgen1)
 
         # Calculate system voltages.
-        U2 = case.solveNetwork(Xgen2, Pgen, augYbus_solver, gbus)
+        U2 = case.solveNetwork(Xgen2, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, Pgen, U2[gbus])
+        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, U2[gbus])
 
         # Update variables that have changed.
-        Vgen2 = r_[Id2, Iq2, Pe2]
+        Vgen2 = c_[Id2, Iq2, Pe2]
         Vexc2 = abs(U2[gbus])
-        Vgov2 = Xgen2[:, 2]
+        Vgov2 = Xgen2[:, 1]
 
         return Xgen2, Pgen, Vgen2, Xexc2, Pexc, Vexc2, \
-            Xgov2, Pgov, Vgov2, U2, t, stepsize
+            Xgov2, Pgov, Vgov2, U2, 0.0, 0, t + stepsize, stepsize
 
 #------------------------------------------------------------------------------
 #  "RungeKutta" class:
@@ -1033,7 +1459,7 @@ class RungeKutta(object):
     def __init__(self):
         #: Runge-Kutta coefficients.
         self._a = array([0.0, 0.0, 0.0, 0.0, 1.0/2.0, 0.0, 0.0, 0.0, 0.0,
-                         1.0/2.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0])
+                         1.0/2.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0]).reshape(4, 4)
         #: Runge-Kutta coefficients.
         self._b = array([1.0/6.0, 2.0/6.0, 2.0/6.0, 1.0/6.0])
         # self._c = array([0.0, 1.0/2.0, 1.0/2.0, 1.0]) # not used
@@ -1041,152 +1467,157 @@ class RungeKutta(object):
 
     def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
             Vgov0, augYbus_solver, gbus, stepsize):
+        args = (augYbus_solver, gbus, stepsize)
 
         Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ = \
-            self._k1()
+            self._k1(Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0, Xgen0, Vgen0,
+                *args)
 
         Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ = \
-            self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1,
-                Kgen1)
+            self._k2(Xexc1, Xexc0, Pexc, Vexc1, Kexc1, Xgov1, Xgov0, Pgov,
+                Vgov1, Kgov1, Xgen1, Xgen0, Vgen1, Kgen1, *args)
 
         Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ = \
-            self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2, Kgov1,
-                Xgen2, Vgen2, Kgen2, Kgen1)
+            self._k3(Xexc2, Xexc0, Pexc, Vexc2, Kexc2, Kexc1, Xgov2, Xgov0,
+                Pgov, Vgov2, Kgov2, Kgov1, Xgen2, Xgen0, Vgen2, Kgen2, Kgen1,
+                *args)
 
         Xexc4, Vexc4, _, Xgov4, Vgov4, _, Xgen4, Vgen4, _, U4 = \
-            self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3, Kgov3,
-                Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
+            self._k4(Xexc3, Xexc0, Pexc, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3,
+                Xgov0, Pgov, Vgov3, Kgov3, Kgov2, Kgov1, Xgen3, Xgen0, Vgen3,
+                Kgen3, Kgen2, Kgen1, *args)
 
-        return Xgen4, Vgen4, Xexc4, Vexc4, Xgov4, Vgov4, U4
+        return Xgen4, Pgen, Vgen4, Xexc4, Pexc, Vexc4, Xgov4, Pgov, Vgov4, \
+            U4, 0.0, 0, t + stepsize, stepsize
 
 
-    def _k1(self, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0, Xgen0, Pgen, Vgen0,
-            augYbus_solver, gbus):
+    def _k1(self, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0, Xgen0, Vgen0,
+            augYbus_solver, gbus, stepsize):
         case = self.dyn_case
         a = self._a
 
         # Exciters.
         Kexc1 = case.exciter(Xexc0, Pexc, Vexc0)
-        Xexc1 = Xexc0 + case.stepsize * a[1, 0] * Kexc1
+        Xexc1 = Xexc0 + stepsize * a[1, 0] * Kexc1
 
         # Governors
         Kgov1 = case.governor(Xgov0, Pgov, Vgov0)
-        Xgov1 = Xgov0 + case.stepsize * a[1, 0] * Kgov1
+        Xgov1 = Xgov0 + stepsize * a[1, 0] * Kgov1
 
         # Generators.
-        Kgen1 = case.generator(Xgen0, Xexc1, Xgov1, Pgen, Vgen0)
-        Xgen1 = Xgen0 + case.stepsize * a[1, 0] * Kgen1
+        Kgen1 = case.generator(Xgen0, Xexc1, Xgov1, Vgen0)
+        Xgen1 = Xgen0 + stepsize * a[1, 0] * Kgen1
 
         # Calculate system voltages.
-        U1 = case.solveNetwork(Xgen1, Pgen, augYbus_solver, gbus)
+        U1 = case.solveNetwork(Xgen1, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, Pgen, U1[gbus])
+        Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, U1[gbus])
 
         # Update variables that have changed
         Vexc1 = abs(U1[gbus])
-        Vgen1 = r_[Id1, Iq1, Pe1];
+        Vgen1 = c_[Id1, Iq1, Pe1]
         Vgov1 = Xgen1[:, 1]
 
         return Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1,U1
 
 
     def _k2(self, Xexc1, Xexc0, Pexc, Vexc1, Kexc1, Xgov1, Xgov0, Pgov, Vgov1,
-            Kgov1, Xgen1, Xgen0, Pgen, Vgen1, Kgen1, augYbus_solver, gbus):
+            Kgov1, Xgen1, Xgen0, Vgen1, Kgen1, augYbus_solver, gbus, stepsize):
         case = self.dyn_case
         a = self._a
 
         # Exciters.
         Kexc2 = case.exciter(Xexc1, Pexc, Vexc1)
-        Xexc2 = Xexc0 + case.stepsize * (a[2, 0] * Kexc1 + a[2, 1] *Kexc2)
+        Xexc2 = Xexc0 + stepsize * (a[2, 0] * Kexc1 + a[2, 1] * Kexc2)
 
         # Governors.
         Kgov2 = case.governor(Xgov1, Pgov, Vgov1)
-        Xgov2 = Xgov0 + case.stepsize * (a[2, 0] * Kgov1 + a[2, 1] *Kgov2)
+        Xgov2 = Xgov0 + stepsize * (a[2, 0] * Kgov1 + a[2, 1] * Kgov2)
 
         # Generators.
-        Kgen2 = case.generator(Xgen1, Xexc2, Xgov2, Pgen, Vgen1)
-        Xgen2 = Xgen0 + case.stepsize * (a[2, 0] * Kgen1 + a[2, 1] *Kgen2)
+        Kgen2 = case.generator(Xgen1, Xexc2, Xgov2, Vgen1)
+        Xgen2 = Xgen0 + stepsize * (a[2, 0] * Kgen1 + a[2, 1] * Kgen2)
 
         # Calculate system voltages.
-        U2 = case.solveNetwork(Xgen2, Pgen, augYbus_solver,gbus)
+        U2 = case.solveNetwork(Xgen2, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, Pgen, U2[gbus])
+        Id2, Iq2, Pe2 = case.machineCurrents(Xgen2, U2[gbus])
 
         # Update variables that have changed
         Vexc2 = abs(U2[gbus])
-        Vgen2 = r_[Id2, Iq2, Pe2]
+        Vgen2 = c_[Id2, Iq2, Pe2]
         Vgov2 = Xgen2[:, 1]
 
         return Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2,U2
 
 
     def _k3(self, Xexc2, Xexc0, Pexc, Vexc2, Kexc2, Kexc1, Xgov2, Xgov0, Pgov,
-            Vgov2, Kgov2, Kgov1, Xgen2, Xgen0, Pgen, Vgen2, Kgen2, Kgen1,
-            augYbus_solver, gbus):
+            Vgov2, Kgov2, Kgov1, Xgen2, Xgen0, Vgen2, Kgen2, Kgen1,
+            augYbus_solver, gbus, stepsize):
         case = self.dyn_case
         a = self._a
 
         # Exciters.
         Kexc3 = case.exciter(Xexc2, Pexc, Vexc2)
-        Xexc3 = Xexc0 + case.stepsize * \
+        Xexc3 = Xexc0 + stepsize * \
             (a[3, 0] * Kexc1 + a[3, 1] * Kexc2 + a[3, 2] * Kexc3)
 
         # Governors.
         Kgov3 = case.governor(Xgov2, Pgov, Vgov2)
-        Xgov3 = Xgov0 + case.stepsize * \
+        Xgov3 = Xgov0 + stepsize * \
             (a[3,0] * Kgov1 + a[3, 1] * Kgov2 + a[3, 2] * Kgov3)
 
         # Generators.
-        Kgen3 = case.generator(Xgen2, Xexc3, Xgov3, Pgen, Vgen2)
-        Xgen3 = Xgen0 + case.stepsize * \
+        Kgen3 = case.generator(Xgen2, Xexc3, Xgov3, Vgen2)
+        Xgen3 = Xgen0 + stepsize * \
             (a[3, 0] * Kgen1 + a[3, 1] * Kgen2 + a[3, 2] * Kgen3)
 
         # Calculate system voltages.
-        U3 = case.solveNetwork(Xgen3, Pgen, augYbus_solver,gbus)
+        U3 = case.solveNetwork(Xgen3, augYbus_solver, gbus)
 
         # Calculate machine currents and power
-        Id3, Iq3, Pe3 = case.machineCurrents(Xgen3, Pgen, U3[gbus])
+        Id3, Iq3, Pe3 = case.machineCurrents(Xgen3, U3[gbus])
 
         # Update variables that have changed.
         Vexc3 = abs(U3[gbus])
-        Vgen3 = r_[Id3, Iq3, Pe3]
+        Vgen3 = c_[Id3, Iq3, Pe3]
         Vgov3 = Xgen3[:, 1]
 
         return Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3,U3
 
 
     def _k4(self, Xexc3, Xexc0, Pexc, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Xgov0,
-            Pgov, Vgov3, Kgov3, Kgov2, Kgov1, Xgen3, Xgen0, Pgen, Vgen3, Kgen3,
-            Kgen2, Kgen1, augYbus_solver, gbus):
+            Pgov, Vgov3, Kgov3, Kgov2, Kgov1, Xgen3, Xgen0, Vgen3, Kgen3,
+            Kgen2, Kgen1, augYbus_solver, gbus, stepsize):
         case = self.dyn_case
         b = self._b
 
         # Exciters.
         Kexc4 = case.exciter(Xexc3, Pexc, Vexc3)
-        Xexc4 = Xexc0 + case.stepsize * \
+        Xexc4 = Xexc0 + stepsize * \
             (b[0] * Kexc1 + b[1] * Kexc2 + b[2] * Kexc3 + b[3] * Kexc4)
 
         # Governors.
         Kgov4 = case.governor(Xgov3, Pgov, Vgov3)
-        Xgov4 = Xgov0 + case.stepsize * \
+        Xgov4 = Xgov0 + stepsize * \
             (b[0] * Kgov1 + b[1] * Kgov2 + b[2] * Kgov3 + b[3] * Kgov4)
 
         # Generators.
-        Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, Pgen, Vgen3)
-        Xgen4 = Xgen0 + case.stepsize * \
+        Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, Vgen3)
+        Xgen4 = Xgen0 + stepsize * \
             (b[0] * Kgen1 + b[1] * Kgen2 + b[2] * Kgen3 + b[3] * Kgen4)
 
         # Calculate system voltages.
-        U4 = case.solveNetwork(Xgen4, Pgen, augYbus_solver,gbus)
+        U4 = case.solveNetwork(Xgen4, augYbus_solver, gbus)
 
         # Calculate machine currents and power.
-        Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, Pgen, U4[gbus])
+        Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, U4[gbus])
 
         # Update variables that have changed
         Vexc4 = abs(U4[gbus])
-        Vgen4 = r_[Id4, Iq4, Pe4]
+        Vgen4 = c_[Id4, Iq4, Pe4]
         Vgov4 = Xgen4[:, 1]
 
         return Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4,U4
@@ -1198,23 +1629,36 @@ class RungeKutta(object):
 class RungeKuttaFehlberg(RungeKutta):
     """ Runge-Kutta Fehlberg ODE solver.
 
+    The step is repeated with a shorter step size until the difference
+    between the fourth and fifth order solutions is less than the tolerance.
+    The step size of the next step is chosen from the error estimate.
+
     Based on RungeKuttaFehlberg.m from MatDyn by Stijn Cole, developed at
     Katholieke Universiteit Leuven. See U{http://www.esat.kuleuven.be/electa/
     teaching/matdyn/} for more information.
     """
 
-    def __init__(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
-            Vgov0, augYbus_solver, gbus, stepsize):
+    def __init__(self, dyn_case=None, tol=None, minstep=None, maxstep=None):
+        #: Dynamic case. Set by the dynamic solver if not specified.
+        self.dyn_case = dyn_case
+
+        #: Tolerance of the error estimate. Set by the dynamic solver if not
+        #: specified.
+        self.tol = tol
+
+        #: Minimum step size. Set by the dynamic solver if not specified.
+        self.minstep = minstep
 
-        super(self, RungeKuttaFehlberg).__init__(t, Xgen0, Pgen, Vgen0, Xexc0,
-            Pexc, Vexc0, Xgov0, Pgov, Vgov0, augYbus_solver, gbus, stepsize)
+        #: Maximum step size. Set by the dynamic solver if not specified.
+        self.maxstep = maxstep
 
         #: Runge-Kutta coefficients
         self._a = array([0.0, 0.0, 0.0, 0.0, 0.0, 1.0/4.0, 0.0, 0.0, 0.0, 0.0,
                          3.0/32.0, 9.0/32.0, 0.0, 0.0, 0.0, 1932.0/2197.0,
                          -7200.0/2197.0, 7296.0/2197.0, 0.0, 0.0, 439.0/216.0,
                          -8.0, 3680.0/513.0, -845.0/4104.0, 0.0, -8.0/27.0,
-                         2.0, -3544.0/2565.0, 1859.0/4104.0, -11.0/40.0])
+                         2.0, -3544.0/2565.0, 1859.0/4104.0,
+                         -11.0/40.0]).reshape(6, 5)
         #: Runge-Kutta coefficients.
         self._b1 = array([25.0/216.0, 0.0, 1408.0/2565.0, 2197.0/4104.0,
                           -1.0/5.0, 0.0])
@@ -1224,338 +1668,103 @@ class RungeKuttaFehlberg(RungeKutta):
         # c = array([0.0, 1.0/4.0, 3.0/8.0, 12.0/13.0, 1.0, 1.0/2.0,])#not used
 
 
-    def solve(self):
-        case = self.dyn_case
+    def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+            Vgov0, augYbus_solver, gbus, stepsize):
         b2 = self._b2
 
-        accept = False
         facmax = 4
-        failed = False
-
-        i = 0
-        while accept == False:
-            i += 1
-
-            Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ =\
-                self._k1()
+        failed = 0
 
-            Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ =\
-                self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1,
-                    Vgen1, Kgen1)
-
-            Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ =\
-                self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2,
-                    Kgov1, Xgen2, Vgen2, Kgen2, Kgen1)
-
-            Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4, _ =\
-                self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3,
-                    Kgov3, Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
-
-            Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5, _ =\
-                self._k5(Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4,
-                    Vgov4, Kgov4, Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4,
-                    Kgen3, Kgen2, Kgen1)
-
-            Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6, U6=\
-                self._k6(Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-                    Xgov5, Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5,
-                    Vgen5, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1)
+        while True:
+            Xgen, Vgen, Xexc, Vexc, Xgov, Vgov, U, Kgen, Kexc, Kgov = \
+                self._stages(Xgen0, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+                             Vgov0, augYbus_solver, gbus, stepsize)
 
             # Second, higher order solution.
-            Xexc62 = self.Xexc0 + case.stepsize * \
-                (b2[0] * Kexc1 + b2[1] * Kexc2 + b2[2] * Kexc3 + \
-                b2[3] * Kexc4 + b2[4] * Kexc5 + b2[5] * Kexc6)
-            Xgov62 = self.Xgov0 + case.stepsize * \
-                (b2[0] * Kgov1 + b2[1] * Kgov2 + b2[2] * Kgov3 + \
-                b2[3] * Kgov4 + b2[4] * Kgov5 + b2[5] * Kgov6)
-            Xgen62 = self.Xgen0 + case.stepsize * \
-                (b2[0] * Kgen1 + b2[1] * Kgen2 + b2[2] * Kgen3 + \
-                b2[3] * Kgen4 + b2[4] * Kgen5 + b2[5] * Kgen6)
+            Xgen2 = Xgen0 + stepsize * _weighted(b2, Kgen)
+            Xexc2 = Xexc0 + stepsize * _weighted(b2, Kexc)
+            Xgov2 = Xgov0 + stepsize * _weighted(b2, Kgov)
 
             # Error estimate.
-            Xexc = abs((Xexc62 - Xexc6).T)
-            Xgov = abs((Xgov62 - Xgov6).T)
-            Xgen = abs((Xgen62 - Xgen6).T)
-            errest = max( r_[max(max(Xexc)), max(max(Xgov)), max(max(Xgen))] )
+            errest = max([abs(X2 - X).max() for X2, X in
+                          [(Xgen2, Xgen), (Xexc2, Xexc), (Xgov2, Xgov)]
+                          if X.size])
 
             if errest < EPS:
                 errest = EPS
 
-            q = 0.84 * (self.tol / errest)^(1.0/4.0)
+            q = 0.84 * (self.tol / errest)**(1.0 / 4.0)
 
             if errest < self.tol:
-                accept = True
-                U0 = U6
-                Vgen0 = Vgen6;
-                Vgov0 = Vgov6
-                Vexc0 = Vexc6
-
-                Xgen0 = Xgen6
-                Xexc0 = Xexc6
-                Xgov0 = Xgov6
-
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
-
-#                t = t0
-            else:
-                failed += 1
-                facmax = 1
+                break
 
-#                t = t0
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
+            # Reject the step and repeat it with a shorter step size.
+            failed += 1
+            facmax = 1
 
-                stepsize = min(max(q, 0.1), facmax) * case.stepsize
-                return
+            stepsize = min(max(q, 0.1), facmax) * stepsize
 
-            stepsize = min(max(q, 0.1), facmax) * case.stepsize
+            if stepsize < self.minstep:
+                return Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov, \
+                    Vgov0, None, errest, failed, t, stepsize
 
-            if stepsize > self.maxstepsize:
-                stepsize = self.maxstepsize
+        newstepsize = min(max(q, 0.1), facmax) * stepsize
+        newstepsize = min(max(newstepsize, self.minstep), self.maxstep)
 
-        return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, \
-            U0, errest, failed, self.t, stepsize
+        return Xgen, Pgen, Vgen, Xexc, Pexc, Vexc, Xgov, Pgov, Vgov, U, \
+            errest, failed, t + stepsize, newstepsize
 
 
-    def _k4(self, Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3, Kgov3,
-            Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1):
-        # Overrides the standard Runge-Kutta K4 method.
+    def _stages(self, Xgen0, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov, Vgov0,
+            augYbus_solver, gbus, stepsize):
+        """ Returns the states, inputs and bus voltages of the lower order
+        solution and the derivatives of each stage.
+        """
         case = self.dyn_case
         a = self._a
+        b1 = self._b1
 
-        # Exciters.
-        Kexc4 = case.exciter(Xexc3, self.Pexc, Vexc3)
-        Xexc4 = self.Xexc0 + case.stepsize * \
-            (a[4, 0] * Kexc1 + a[4, 1] * Kexc2 + a[4, 2] * Kexc3 +
-             a[4, 3] * Kexc4)
+        Xgen, Vgen = Xgen0, Vgen0
+        Xexc, Vexc = Xexc0, Vexc0
+        Xgov, Vgov = Xgov0, Vgov0
 
-        # Governors.
-        Kgov4 = case.governor(Xgov3, self.Pgov, Vgov3)
-        Xgov4 = self.Xgov0 + case.stepsize * \
-            (a[4, 0] * Kgov1 + a[4, 1] * Kgov2 + a[4, 2] * Kgov3 +
-             a[4, 3] * Kgov4)
+        Kgen, Kexc, Kgov = [], [], []
 
-        # Generators.
-        Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, self.Pgen, Vgen3)
-        Xgen4 = self.Xgen0 + case.stepsize * \
-            (a[4, 0] * Kgen1 + a[4, 1] * Kgen2 + a[4, 2] * Kgen3 +
-             a[4, 3] * Kgen4)
+        for j in range(1, len(b1) + 1):
+            # The last stage gives the lower order solution.
+            w = b1 if j == len(b1) else a[j, :j]
 
-        # Calculate system voltages.
-        U4 = case.solveNetwork(Xgen4, self.Pgen, self.augYbus_solver,self.gbus)
+            # Exciters.
+            Kexc.append(case.exciter(Xexc, Pexc, Vexc))
+            Xexc = Xexc0 + stepsize * _weighted(w, Kexc)
 
-        # Calculate machine currents and power.
-        Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, self.Pgen, U4[self.gbus])
+            # Governors.
+            Kgov.append(case.governor(Xgov, Pgov, Vgov))
+            Xgov = Xgov0 + stepsize * _weighted(w, Kgov)
 
-        # Update variables that have changed
-        Vexc4 = abs(U4[self.gbus])
-        Vgen4 = r_[Id4, Iq4, Pe4]
-        Vgov4 = Xgen4[:, 1]
+            # Generators.
+            Kgen.append(case.generator(Xgen, Xexc, Xgov, Vgen))
+            Xgen = Xgen0 + stepsize * _weighted(w, Kgen)
 
-        return Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4,U4
+            # Calculate system voltages.
+            U = case.solveNetwork(Xgen, augYbus_solver, gbus)
 
+            # Calculate machine currents and power.
+            Id, Iq, Pe = case.machineCurrents(Xgen, U[gbus])
 
-    def _k5(self, Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4, Vgov4,Kgov4,
-            Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4, Kgen3, Kgen2, Kgen1):
-        case = self.dyn_case
-        a = self._a
-
-        # Exciters.
-        Kexc5 = case.exciter(Xexc4, self.Pexc, Vexc4)
-        Xexc5 = self.Xexc0 + case.stepsize * \
-            (a[5, 0] * Kexc1 + a[5, 1] * Kexc2 + a[5, 2] * Kexc3 + \
-            a[5, 3] * Kexc4 + a[5, 4] * Kexc5)
-
-        # Governors.
-        Kgov5 = case.governor(Xgov4, self.Pgov, Vgov4)
-        Xgov5 = self.Xgov0 + case.stepsize * \
-            (a[5, 0] * Kgov1 + a[5, 1] * Kgov2 + a[5, 2] * Kgov3 + \
-            a[5, 3] * Kgov4 + a[5, 4] * Kgov5)
-
-        # Generators.
-        Kgen5 = case.generator(Xgen4, Xexc5, Xgov5, self.Pgen, Vgen4)
-        Xgen5 = self.Xgen0 + case.stepsize * \
-            (a[5, 0] * Kgen1 + a[5, 1] * Kgen2 + a[5, 2] * Kgen3 + \
-            a[5, 3] * Kgen4 + a[5, 4] * Kgen5)
-
-        # Calculate system voltages.
-        U5 = case.solveNetwork(Xgen5, self.Pgen, self.augYbus_solver,
-                               self.gbus)
-
-        # Calculate machine currents and power.
-        Id5, Iq5, Pe5 = case.machineCurrents(Xgen5, self.Pgen,
-                                             U5[self.gbus])
-
-        # Update variables that have changed.
-        Vexc5 = abs(U5[self.gbus])
-        Vgen5 = r_[Id5, Iq5, Pe5]
-        Vgov5 = Xgen5[:, 1]
-
-        return Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5,U5
-
-
-    def _k6(self, Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1, Xgov5,
-            Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5, Vgen5, Kgen5,
-            Kgen4, Kgen3, Kgen2, Kgen1):
-        case = self.dyn_case
-        b1 = self._b1
-
-        # Exciters.
-        Kexc6 = case.exciter(Xexc5, self.Pexc, Vexc5)
-        Xexc6 = self.Xexc0 + case.stepsize * \
-            (b1[0] * Kexc1 + b1[1] * Kexc2 + b1[2] * Kexc3 + \
-            b1[3] * Kexc4 + b1[4] * Kexc5 + b1[5] * Kexc6)
-
-        # Governors.
-        Kgov6 = case.governor(Xgov5, self.Pgov, Vgov5)
-        Xgov6 = self.Xgov0 + case.stepsize * \
-            (b1[0] * Kgov1 + b1[1] * Kgov2 + b1[2] * Kgov3 + \
-            b1[3] * Kgov4 + b1[4] * Kgov5 + b1[5] * Kgov6)
-
-        # Generators.
-        Kgen6 = case.generator(Xgen5, Xexc6, Xgov6, self.Pgen, Vgen5)
-        Xgen6 = self.Xgen0 + case.stepsize * \
-            (b1[0] * Kgen1 + b1[1] * Kgen2 + b1[2] * Kgen3 + \
-            b1[3] * Kgen4 + b1[4] * Kgen5 + b1[5] * Kgen6)
-
-        # Calculate system voltages.
-        U6 = case.solveNetwork(Xgen6, self.Pgen, self.augYbus_solver,
-                               self.gbus)
-
-        # Calculate machine currents and power.
-        Id6, Iq6, Pe6 = case.machineCurrents(Xgen6, self.Pgen,
-                                             U6[self.gbus])
+            # Update variables that have changed.
+            Vexc = abs(U[gbus])
+            Vgen = c_[Id, Iq, Pe]
+            Vgov = Xgen[:, 1]
 
-        # Update variables that have changed.
-        Vexc6 = abs(U6[self.gbus])
-        Vgen6 = r_[Id6, Iq6, Pe6]
-        Vgov6 = Xgen6[:, 1]
+        return Xgen, Vgen, Xexc, Vexc, Xgov, Vgov, U, Kgen, Kexc, Kgov
 
-        return Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6,U6
 
-#            # K1 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc1 = case.exciter(self.Xexc0, self.Pexc, self.Vexc0)
-#            Xexc1 = self.Xexc0 + case.stepsize * a[1, 0] * Kexc1
-#
-#            # Governors.
-#            Kgov1 = case.governor(self.Xgov0, self.Pgov, self.Vgov0)
-#            Xgov1 = self.Xgov0 + case.stepsize * a[1, 0] * Kgov1
-#
-#            # Generators.
-#            Kgen1 = case.generator(self.Xgen0, Xexc1, Xgov1, self.Pgen,
-#                                   self.Vgen0)
-#            Xgen1 = self.Xgen0 + case.stepsize * a[1, 0] * Kgen1
-#
-#            # Calculate system voltages.
-#            U1 = case.solveNetwork(Xgen1, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id1, Iq1, Pe1 = case.machineCurrents(Xgen1, self.Pgen,
-#                                                 U1[self.gbus])
-#
-#            # Update variables that have changed.
-#            Vexc1 = abs(U1[self.gbus])
-#            Vgen1 = r_[Id1, Iq1, Pe1]
-#            Vgov1 = Xgen1[:, 1]
-#
-#            # K2 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc2 = case.exciter(Xexc1, self.Pexc, Vexc1)
-#            Xexc2 = self.Xexc0 + case.stepsize * \
-#                (a[2, 0] * Kexc1 + a[2, 1] * Kexc2)
-#
-#            # Governors.
-#            Kgov2 = case.governor(Xgov1, self.Pgov, Vgov1)
-#            Xgov2 = self.Xgov0 + case.stepsize * \
-#                (a[2, 0] * Kgov1 + a[2, 1] * Kgov2)
-#
-#            # Generators.
-#            Kgen2 = case.generator(Xgen1, Xexc2, Xgov2, self.Pgen, Vgen1)
-#            Xgen2 = self.Xgen0 + case.stepsize * \
-#                (a[2, 0] * Kgen1 + a[2, 1] * Kgen2)
-#
-#            # Calculate system voltages.
-#            U2 = case.solveNetwork(Xgen2, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id2, Iq2, Pe2  = case.machineCurrents(Xgen2, self.Pgen,
-#                                                  U2[self.gbus])
-#
-#            # Update variables that have changed
-#            Vexc2 = abs(U2[self.gbus])
-#            Vgen2 = r_[Id2, Iq2, Pe2]
-#            Vgov2 = Xgen2[:, 1]
-#
-#            # K3 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc3 = case.exciter(Xexc2, self.Pexc, Vexc2)
-#            Xexc3 = self.Xexc0 + case.stepsize * \
-#                (a[3, 0] * Kexc1 + a[3, 1] * Kexc2 + a[3, 2] * Kexc3)
-#
-#            # Governors.
-#            Kgov3 = case.governor(Xgov2, self.Pgov, Vgov2)
-#            Xgov3 = self.Xgov0 + case.stepsize * \
-#                (a[3, 0] * Kgov1 + a[3, 1] * Kgov2 + a[3, 2] * Kgov3)
-#
-#            # Generators.
-#            Kgen3 = case.generator(Xgen2, Xexc3, Xgov3, self.Pgen, Vgen2)
-#            Xgen3 = self.Xgen0 + case.stepsize * \
-#                (a[3, 0] * Kgen1 + a[3, 1] * Kgen2 + a[3, 2] * Kgen3)
-#
-#            # Calculate system voltages
-#            U3 = case.solveNetwork(Xgen3, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id3, Iq3, Pe3 = case.machineCurrents(Xgen3, self.Pgen,
-#                                                 U3[self.gbus])
-#
-#            # Update variables that have changed
-#            Vexc3 = abs(U3[self.gbus])
-#            Vgen3 = r_[Id3, Iq3, Pe3]
-#            Vgov3 = Xgen3[:, 1]
-#
-#            # K4 --------------------------------------------------------------
-#
-#            # Exciters.
-#            Kexc4 = case.exciter(Xexc3, self.Pexc, Vexc3)
-#            Xexc4 = self.Xexc0 + case.stepsize * \
-#                (a[4, 0] * Kexc1 + a[4, 1] * Kexc2 + a[4, 2] * Kexc3 +
-#                 a[4, 3] * Kexc4)
-#
-#            # Governors.
-#            Kgov4 = case.governor(Xgov3, self.Pgov, Vgov3)
-#            Xgov4 = self.Xgov0 + case.stepsize * \
-#                (a[4, 0] * Kgov1 + a[4, 1] * Kgov2 + a[4, 2] * Kgov3 +
-#                 a[4, 3] * Kgov4)
-#
-#            # Generators.
-#            Kgen4 = case.generator(Xgen3, Xexc4, Xgov4, self.Pgen, Vgen3)
-#            Xgen4 = self.Xgen0 + case.stepsize * \
-#                (a[4, 0] * Kgen1 + a[4, 1] * Kgen2 + a[4, 2] * Kgen3 +
-#                 a[4, 3] * Kgen4)
-#
-#            # Calculate system voltages.
-#            U4 = case.solveNetwork(Xgen4, self.Pgen, self.augYbus_solver,
-#                                   self.gbus)
-#
-#            # Calculate machine currents and power.
-#            Id4, Iq4, Pe4 = case.machineCurrents(Xgen4, self.Pgen,
-#                                                 U4[self.gbus])
-#
-#            # Update variables that have changed.
-#            Vexc4 = abs(U4[self.gbus])
-#            Vgen4 = r_[Id4, Iq4, Pe4]
-#            Vgov4 = Xgen4[:, 1]
+def _weighted(w, K):
+    """ Returns the sum of the stage derivatives weighted by the given
+    coefficients.
+    """
+    return sum([w[k] * K[k] for k in range(len(K))])
 
 #------------------------------------------------------------------------------
 #  "RungeKuttaHighamHall" class:
@@ -1569,11 +1778,9 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
     teaching/matdyn/} for more information.
     """
 
-    def __init__(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
-            Vgov0, augYbus_solver, gbus, stepsize):
-
-        super(self, RungeKuttaHighamHall).__init__(t, Xgen0, Pgen, Vgen0,Xexc0,
-            Pexc, Vexc0, Xgov0, Pgov, Vgov0, augYbus_solver, gbus, stepsize)
+    def __init__(self, dyn_case=None, tol=None, minstep=None, maxstep=None):
+        super(RungeKuttaHighamHall, self).__init__(dyn_case, tol, minstep,
+                                                   maxstep)
 
         #: Runge-Kutta coefficients.
         self._a = array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 2.0/9.0, 0.0, 0.0, 0.0,
@@ -1582,7 +1789,7 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
                          -27.0/100.0, 78.0/125.0, 8.0/125.0, 0.0, 0.0,
                          -11.0/20.0, 27.0/20.0, 12.0/5.0, -36.0/5.0, 5.0, 0.0,
                          1.0/12.0, 0.0, 27.0/32.0, -4.0/3.0, 125.0/96.0,
-                         5.0/48.0])
+                         5.0/48.0]).reshape(7, 6)
         #: Runge-Kutta coefficients.
         self._b1 = array([1.0/12.0, 0.0, 27.0/32.0, -4.0/3.0, 125.0/96.0,
                           5.0/48.0, 0.0])
@@ -1591,187 +1798,152 @@ class RungeKuttaHighamHall(RungeKuttaFehlberg):
                           1.0/24.0, 1.0/10.0,])
         # c = array([0.0, 2.0/9.0, 1.0/3.0, 1.0/2.0, 3.0/5.0, 1.0, 1.0,])
 
+#------------------------------------------------------------------------------
+#  "TrapezoidalRule" class:
+#------------------------------------------------------------------------------
 
-    def solve(self):
-        case = self.dyn_case
-        b2 = self._b2
-
-        accept = False
-        facmax = 4
-        failed = False
-
-        i = 0
-        while accept == False:
-            i += 1
-
-            Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1, Vgen1, Kgen1, _ =\
-                self._k1()
-
-            Xexc2, Vexc2, Kexc2, Xgov2, Vgov2, Kgov2, Xgen2, Vgen2, Kgen2, _ =\
-                self._k2(Xexc1, Vexc1, Kexc1, Xgov1, Vgov1, Kgov1, Xgen1,
-                    Vgen1, Kgen1)
-
-            Xexc3, Vexc3, Kexc3, Xgov3, Vgov3, Kgov3, Xgen3, Vgen3, Kgen3, _ =\
-                self._k3(Xexc2, Vexc2, Kexc2, Kexc1, Xgov2, Vgov2, Kgov2,
-                    Kgov1, Xgen2, Vgen2, Kgen2, Kgen1)
-
-            Xexc4, Vexc4, Kexc4, Xgov4, Vgov4, Kgov4, Xgen4, Vgen4, Kgen4, _ =\
-                self._k4(Xexc3, Vexc3, Kexc3, Kexc2, Kexc1, Xgov3, Vgov3,
-                    Kgov3, Kgov2, Kgov1, Xgen3, Vgen3, Kgen3, Kgen2, Kgen1)
-
-            Xexc5, Vexc5, Kexc5, Xgov5, Vgov5, Kgov5, Xgen5, Vgen5, Kgen5, _ =\
-                self._k5(Xexc4, Vexc4, Kexc4, Kexc3, Kexc2, Kexc1, Xgov4,
-                    Vgov4, Kgov4, Kgov3, Kgov2, Kgov1, Xgen4, Vgen4, Kgen4,
-                    Kgen3, Kgen2, Kgen1)
+class TrapezoidalRule(object):
+    """ Implicit trapezoidal rule solver.
+
+    The generator, exciter and governor equations are solved simultaneously
+    with the network at the end of each step by Newton's method. The method
+    is A-stable, so the step size is limited by accuracy rather than by the
+    fastest time constant (e.g. the exciter amplifier). The LU factorisation
+    of the Jacobian is reused across steps and is only re-evaluated when the
+    step size or the network changes or when Newton's method converges
+    slowly. The network is only solved again when perturbing the rotor angle
+    and the internal voltages, the states on which it depends.
+    """
 
-            Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6, _ =\
-                self._k6(Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-                    Xgov5, Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5,
-                    Vgen5, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1)
+    def __init__(self, dyn_case=None, tol=1e-06, maxit=10, jac_iter=3,
+                 perturbation=1e-07):
+        #: Dynamic case. Set by the dynamic solver if not specified.
+        self.dyn_case = dyn_case
 
-            Xexc7, _, Kexc7, Xgov7, _, Kgov7, Xgen7, _, Kgen7, U7 = \
-                self._k6(Xexc6, Vexc6, Kexc6, Kexc5, Kexc4, Kexc3, Kexc2,
-                    Kexc1, Xgov6, Vgov6, Kgov6, Kgov5, Kgov4, Kgov3, Kgov2,
-                    Kgov1, Xgen6, Vgen6, Kgen6, Kgen5, Kgen4, Kgen3, Kgen2,
-                    Kgen1)
+        #: Tolerance on the step residual.
+        self.tol = tol
 
-            # Second, higher order solution.
-            Xexc72 = self.Xexc0 + case.stepsize * \
-                (b2[0] * Kexc1 + b2[1] * Kexc2 + b2[2] * Kexc3 +
-                 b2[3] * Kexc4 + b2[4] * Kexc5 + b2[5] * Kexc6 + b2[6] * Kexc7)
-            Xgov72 = self.Xgov0 + case.stepsize * \
-                (b2[0] * Kgov1 + b2[1] * Kgov2 + b2[2] * Kgov3 +
-                 b2[3] * Kgov4 + b2[4] * Kgov5 + b2[5] * Kgov6 + b2[6] * Kgov7)
-            Xgen72 = self.Xgen0 + case.stepsize * \
-                (b2[0] * Kgen1 + b2[1] * Kgen2 + b2[2] * Kgen3 +
-                 b2[3] * Kgen4 + b2[4] * Kgen5 + b2[5] * Kgen6 + b2[6] * Kgen7)
-
-            # Error estimate
-            Xexc = abs((Xexc72 - Xexc7).T)
-            Xgov = abs((Xgov72 - Xgov7).T)
-            Xgen = abs((Xgen72 - Xgen7).T)
-            errest = max( r_[max(max(Xexc)), max(max(Xgov)), max(max(Xgen))] )
+        #: Maximum number of Newton iterations per step.
+        self.maxit = maxit
 
-            if errest < EPS:
-                errest = EPS
+        #: Number of Newton iterations with an old Jacobian after which it
+        #: is re-evaluated.
+        self.jac_iter = jac_iter
 
-            q = 0.84 * (self.tol / errest)^(1.0 / 4.0)
+        #: Relative perturbation for the finite difference Jacobian.
+        self.perturbation = perturbation
 
-            if errest < self.tol:
-                accept = True
-                U0 = U7
-                Vgen0 = Vgen6;
-                Vgov0 = Vgov6
-                Vexc0 = Vexc6
+        #: LU factorisation of the Jacobian.
+        self._lu = None
 
-                Xgen0 = Xgen6
-                Xexc0 = Xexc6
-                Xgov0 = Xgov6
+        #: Step size and network solver for which the Jacobian was computed.
+        self._stepsize = None
+        self._network = None
 
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
 
-#                t = t0
-            else:
-                failed += 1
-                facmax = 1
-
-#                t = t0
-                Pgen0 = self.Pgen
-                Pexc0 = self.Pexc
-                Pgov0 = self.Pgov
-
-                stepsize = min(max(q, 0.1), facmax) * case.stepsize
-                return
+    def solve(self, t, Xgen0, Pgen, Vgen0, Xexc0, Pexc, Vexc0, Xgov0, Pgov,
+            Vgov0, augYbus_solver, gbus, stepsize):
+        shapes = (Xgen0.shape, Xexc0.shape, Xgov0.shape)
+        h = stepsize
 
-            stepsize = min(max(q, 0.1), facmax) * case.stepsize
+        def f(x, U=None):
+            return self._derivatives(x, shapes, Pexc, Pgov, augYbus_solver,
+                                     gbus, U)
 
-            if stepsize > self.maxstepsize:
-                stepsize = self.maxstepsize
+        if h != self._stepsize or augYbus_solver is not self._network:
+            self._lu = None
+            self._stepsize = h
+            self._network = augYbus_solver
 
-        return Xgen0, Pgen0, Vgen0, Xexc0, Pexc0, Vexc0, Xgov0, Pgov0, Vgov0, \
-            U0, errest, failed, self.t, stepsize
+        x0 = r_[Xgen0.ravel(), Xexc0.ravel(), Xgov0.ravel()]
+        F0 = f(x0)[0]
 
+        # Explicit Euler prediction.
+        x = x0 + h * F0
 
-    def _k6(self, Xexc5, Vexc5, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1, Xgov5,
-            Vgov5, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen5, Vgen5, Kgen5,
-            Kgen4, Kgen3, Kgen2, Kgen1):
-        # Overrides the K6 method from the Runge-Kutta Fehlberg solver.
-        case = self.dyn_case
-        a = self._a
+        fresh = False
+        for i in range(self.maxit):
+            F, U, Vgen, Vexc, Vgov = f(x)
+            residual = x - x0 - h / 2.0 * (F0 + F)
 
-        # Exciters.
-        Kexc6 = case.exciter(Xexc5, self.Pexc, Vexc5)
-        Xexc6 = self.Xexc0 + case.stepsize * \
-            (a[6, 0] * Kexc1 + a[6, 1] * Kexc2 + a[6, 2] * Kexc3 + \
-            a[6, 3] * Kexc4 + a[6, 4] * Kexc5 + a[6, 5] * Kexc6)
+            if max(abs(residual)) < self.tol:
+                break
 
-        # Governors.
-        Kgov6 = case.governor(Xgov5, self.Pgov, Vgov5)
-        Xgov6 = self.Xgov0 + case.stepsize * \
-            (a[6, 0] * Kgov1 + a[6, 1] * Kgov2 + a[6, 2] * Kgov3 + \
-            a[6, 3] * Kgov4 + a[6, 4] * Kgov5 + a[6, 5] * Kgov6)
+            if self._lu is None or (i >= self.jac_iter and not fresh):
+                self._lu = lu_factor(self._jacobian(x, F, U, f, h, shapes))
+                fresh = True
 
-        # Generators.
-        Kgen6 = case.generator(Xgen5, Xexc6, Xgov6, self.Pgen, Vgen5)
-        Xgen6 = self.Xgen0 + case.stepsize * \
-            (a[6, 0] * Kgen1 + a[6, 1] * Kgen2 + a[6, 2] * Kgen3 + \
-            a[6, 3] * Kgen4 + a[6, 4] * Kgen5 + a[6, 5] * Kgen6)
+            x = x - lu_solve(self._lu, residual)
+        else:
+            logger.warning("Trapezoidal rule did not converge at %.4fs." % t)
+            F, U, Vgen, Vexc, Vgov = f(x)
 
-        # Calculate system voltages.
-        U6 = case.solveNetwork(Xgen6, self.Pgen, self.augYbus_solver,
-                               self.gbus)
+        Xgen, Xexc, Xgov = self._unpack(x, shapes)
 
-        # Calculate machine currents and power.
-        Id6, Iq6, Pe6 = case.machineCurrents(Xgen6, self.Pgen,
-                                             U6[self.gbus])
+        return Xgen, Pgen, Vgen, Xexc, Pexc, Vexc, Xgov, Pgov, Vgov, U, 0.0, \
+            0, t + stepsize, stepsize
 
-        # Update variables that have changed.
-        Vexc6 = abs(U6[self.gbus])
-        Vgen6 = r_[Id6, Iq6, Pe6]
-        Vgov6 = Xgen6[:, 1]
 
-        return Xexc6, Vexc6, Kexc6, Xgov6, Vgov6, Kgov6, Xgen6, Vgen6, Kgen6,U6
+    def _jacobian(self, x, F, U, f, h, shapes):
+        """ Returns the Jacobian of the step residual by finite differences.
+        """
+        network = self._network_states(shapes)
+
+        n = len(x)
+        J = eye(n)
+        for k in range(n):
+            dx = self.perturbation * max(1.0, abs(x[k]))
+            xk = x.copy()
+            xk[k] += dx
+            Fk = f(xk)[0] if network[k] else f(xk, U)[0]
+            J[:, k] -= h / 2.0 * (Fk - F) / dx
+        return J
+
+
+    def _network_states(self, shapes):
+        """ Returns a boolean array of the states on which the network
+        solution depends: the rotor angle and the internal voltages.
+        """
+        network = zeros(sum([shape[0] * shape[1] for shape in shapes]),
+                        dtype=bool)
+        Xgen = self._unpack(network, shapes)[0]
+        Xgen[:, [0, 2, 3]] = True
+        return network
 
 
-    def _k7(self, Xexc6, Vexc6, Kexc6, Kexc5, Kexc4, Kexc3, Kexc2, Kexc1,
-            Xgov6, Vgov6, Kgov6, Kgov5, Kgov4, Kgov3, Kgov2, Kgov1, Xgen6,
-            Vgen6, Kgen6, Kgen5, Kgen4, Kgen3, Kgen2, Kgen1):
+    def _derivatives(self, x, shapes, Pexc, Pgov, augYbus_solver, gbus,
+                     U=None):
+        """ Returns the state derivatives, having solved the network for the
+        given states, unless the bus voltages are given.
+        """
         case = self.dyn_case
-        b1 = self.b1
-
-        # Exciters.
-        Kexc7 = case.exciter(Xexc6, self.Pexc, Vexc6)
-        Xexc7 = self.Xexc0 + case.stepsize * \
-            (b1[0] * Kexc1 + b1[1] * Kexc2 + b1[2] * Kexc3 + b1[3] * Kexc4 +
-             b1[4] * Kexc5 + b1[5] * Kexc6 + b1[6] * Kexc7)
+        Xgen, Xexc, Xgov = self._unpack(x, shapes)
 
-        # Governors.
-        Kgov7 = case.governor(Xgov6, self.Pgov, Vgov6)
-        Xgov7 = self.Xgov0 + case.stepsize * \
-            (b1[0]* Kgov1 + b1[1] * Kgov2 + b1[2] * Kgov3 + b1[3] * Kgov4 +
-             b1[4] * Kgov5 + b1[5] * Kgov6 + b1[6] * Kgov7)
+        if U is None:
+            U = case.solveNetwork(Xgen, augYbus_solver, gbus)
 
-        # Generators.
-        Kgen7 = case.generator(Xgen6, Xexc7, Xgov7, self.Pgen, Vgen6)
-        Xgen7 = self.Xgen0 + case.stepsize * \
-            (b1[0] * Kgen1 + b1[1] * Kgen2 + b1[2] * Kgen3 + b1[3] * Kgen4 +
-             b1[4] * Kgen5 + b1[5] * Kgen6 + b1[6] * Kgen7)
+        Id, Iq, Pe = case.machineCurrents(Xgen, U[gbus])
+        Vgen = c_[Id, Iq, Pe]
+        Vexc = abs(U[gbus])
+        Vgov = Xgen[:, 1]
 
-        # Calculate system voltages.
-        U7 = case.solveNetwork(Xgen7, self.Pgen, self.augYbus_solver,
-                               self.gbus)
+        F = r_[case.generator(Xgen, Xexc, Xgov, Vgen).ravel(),
+               case.exciter(Xexc, Pexc, Vexc).ravel(),
+               case.governor(Xgov, Pgov, Vgov).ravel()]
 
-        # Calculate machine currents and power.
-        Id7, Iq7, Pe7 = case.machineCurrents(Xgen7, self.Pgen, U7[self.gbus])
+        return F, U, Vgen, Vexc, Vgov
 
-        # Update variables that have changed
-        Vexc7 = abs(U7[self.gbus])
-        Vgen7 = r_[Id7, Iq7, Pe7]
-        Vgov7 = Xgen7[:, 1]
 
-        return Xexc7, Vexc7, Kexc7, Xgov7, Vgov7, Kgov7, Xgen7, Vgen7, Kgen7,U7
+    def _unpack(self, x, shapes):
+        """ Returns the generator, exciter and governor states.
+        """
+        X = []
+        k = 0
+        for shape in shapes:
+            n = shape[0] * shape[1]
+            X.append(x[k:k + n].reshape(shape))
+            k += n
+        return X
 
 #------------------------------------------------------------------------------
 #  "ModifiedEuler2" class:
@@ -2103,6 +2275,28 @@ class BusChange(object):
         #: New parameter value.
         self.newval = newval
 
+        #: Parameter value prior to the change.
+        self._oldval = None
+
+        #: Has the change been applied?
+        self._applied = False
+
+
+    def apply(self):
+        """ Sets the bus parameter to the new value.
+        """
+        self._oldval = getattr(self.bus, self.param)
+        setattr(self.bus, self.param, self.newval)
+        self._applied = True
+
+
+    def revert(self):
+        """ Restores the bus parameter value held before the change.
+        """
+        if self._applied:
+            setattr(self.bus, self.param, self._oldval)
+            self._applied = False
+
 #------------------------------------------------------------------------------
 #  "BranchChange" class:
 #------------------------------------------------------------------------------
@@ -2125,4 +2319,456 @@ class BranchChange(object):
         #: New parameter value.
         self.newval = newval
 
+        #: Parameter value prior to the change.
+        self._oldval = None
+
+        #: Has the change been applied?
+        self._applied = False
+
+
+    def apply(self):
+        """ Sets the branch parameter to the new value.
+        """
+        self._oldval = getattr(self.branch, self.param)
+        setattr(self.branch, self.param, self.newval)
+        self._applied = True
+
+
+    def revert(self):
+        """ Restores the branch parameter value held before the change.
+        """
+        if self._applied:
+            setattr(self.branch, self.param, self._oldval)
+            self._applied = False
+
+#------------------------------------------------------------------------------
+#  "Scenario" class:
+#------------------------------------------------------------------------------
+
+class Scenario(_Named):
+    """ Defines a transient stability scenario as a set of bus and branch
+    change events applied to a common dynamic case.
+    """
+
+    def __init__(self, events, clearing=None, name=None):
+        """ Constructs a new Scenario instance.
+        """
+        #: Unique name.
+        self.name = name
+
+        #: Bus and branch change events that initiate the disturbance.
+        self.events = events
+
+        #: Bus and branch change events that clear the disturbance. Their
+        #: instant of change is varied in the critical clearing time search.
+        self.clearing = [] if clearing is None else clearing
+
+
+    @property
+    def fault_time(self):
+        """ Returns the instant at which the disturbance is initiated.
+        """
+        return min([event.time for event in self.events])
+
+#------------------------------------------------------------------------------
+#  "ScenarioBatch" class:
+#------------------------------------------------------------------------------
+
+class ScenarioBatch(object):
+    """ Screens a batch of transient stability scenarios.
+
+    The initial power flow, the generator, exciter and governor
+    initialisation and the factorisation of the augmented admittance matrix
+    are computed once and shared by all scenarios. Scenarios are simulated
+    on a pool of worker processes and only the requested summary metrics are
+    returned for each.
+    """
+
+    def __init__(self, solver, metrics=None, max_angle=180.0, processes=None,
+                 cct_max=1.0, cct_tol=0.005):
+        """ Constructs a new ScenarioBatch instance.
+        """
+        #: Dynamic solver used to simulate each scenario.
+        self.solver = solver
+
+        #: Summary metrics to compute for each scenario: C{MAX_ANGLE},
+        #: C{STABLE} and C{CCT}.
+        self.metrics = [MAX_ANGLE, STABLE] if metrics is None else metrics
+
+        #: Maximum rotor angle separation (degrees) of a stable trajectory.
+        self.max_angle = max_angle
+
+        #: Number of worker processes. The number of CPUs is used if None
+        #: and scenarios are simulated in this process if 1.
+        self.processes = processes
+
+        #: Upper bound on the critical clearing time (s) after the fault.
+        self.cct_max = cct_max
+
+        #: Tolerance of the critical clearing time bisection (s).
+        self.cct_tol = cct_tol
+
+
+    def solve(self, scenarios):
+        """ Simulates each of the given scenarios.
+
+        @rtype: list
+        @return: A dictionary of summary metrics for each scenario.
+        """
+        t0 = time()
+
+        init = self.solver.initialise()
+        if not init:
+            return []
+
+        if self.processes == 1:
+            results = [self.screen(scenario, init) for scenario in scenarios]
+        else:
+            # The shared initial conditions are passed to each worker once.
+            pool = Pool(self.processes, _init_batch, (self, scenarios, init))
+            try:
+                results = pool.map(_solve_scenario, range(len(scenarios)))
+            finally:
+                pool.close()
+                pool.join()
+
+        logger.info("%d scenarios screened in %.3fs." %
+                    (len(scenarios), time() - t0))
+
+        return results
+
+
+    def screen(self, scenario, init):
+        """ Returns the summary metrics for the given scenario.
+        """
+        result = {}
+
+        solution = self.simulate(scenario.events + scenario.clearing, init)
+        if not solution:
+            return {"converged": False}
+
+        separation = self.angle_separation(solution)
+        if MAX_ANGLE in self.metrics:
+            result[MAX_ANGLE] = separation
+        if STABLE in self.metrics:
+            result[STABLE] = separation <= self.max_angle
+        if CCT in self.metrics:
+            result[CCT] = self.critical_clearing_time(scenario, init)
+
+        result["converged"] = True
+
+        return result
+
+
+    def simulate(self, events, init):
+        """ Simulates the given events from the shared initial conditions and
+        restores the case afterwards.
+        """
+        solver = self.solver
+        saved = solver.events, solver.plot, solver.verbose
+        solver.events, solver.plot, solver.verbose = events, False, False
+        try:
+            return solver.solve(init)
+        finally:
+            solver.events, solver.plot, solver.verbose = saved
+            for event in reversed(sorted(events, key=lambda e: e.time)):
+                event.revert()
+
+
+    def angle_separation(self, solution):
+        """ Returns the maximum rotor angle separation (degrees) between any
+        two generators over the trajectory.
+        """
+        angles = solution["angles"]
+        if angles.shape[1] == 0:
+            return 0.0
+        return (angles.max(axis=1) - angles.min(axis=1)).max()
+
+
+    def critical_clearing_time(self, scenario, init):
+        """ Returns the critical clearing time (s) of the scenario, found by
+        bisection on the instant of the clearing events. Returns None if the
+        scenario has no clearing events.
+        """
+        if not scenario.clearing:
+            return None
+
+        search = CCTSearch(self.solver, AngleCriterion(self.max_angle),
+                           self.cct_max, self.cct_tol, processes=1)
+
+        return search.solve(scenario, init).get("cct")
+
+#------------------------------------------------------------------------------
+#  Scenario batch worker:
+#------------------------------------------------------------------------------
+
+#: Scenario batch, scenarios and initial conditions of the worker process.
+_batch = None
+
+def _init_batch(batch, scenarios, init):
+    """ Initialises a worker process with the scenario batch, scenarios and
+    shared initial conditions.
+    """
+    global _batch
+    _batch = (batch, scenarios, init)
+
+
+def _solve_scenario(i):
+    """ Returns the summary metrics for the i-th scenario of the batch of
+    the worker process.
+    """
+    batch, scenarios, init = _batch
+    return batch.screen(scenarios[i], init)
+
+#------------------------------------------------------------------------------
+#  "AngleCriterion" class:
+#------------------------------------------------------------------------------
+
+class AngleCriterion(object):
+    """ Defines an instability criterion on the maximum rotor angle
+    separation between any two generators.
+    """
+
+    def __init__(self, max_angle=180.0):
+        """ Constructs a new AngleCriterion instance.
+        """
+        #: Maximum rotor angle separation (degrees) of a stable trajectory.
+        self.max_angle = max_angle
+
+
+    def reset(self, Xgen0):
+        """ Prepares the criterion for a new trajectory.
+        """
+        pass
+
+
+    def unstable(self, t, Xgen, Vgen, Xgov, cleared):
+        """ Returns True if the rotor angle separation exceeds the limit.
+        """
+        delta = Xgen[:, 0] * 180.0 / pi
+        return len(delta) > 0 and delta.max() - delta.min() > self.max_angle
+
+#------------------------------------------------------------------------------
+#  "EnergyCriterion" class:
+#------------------------------------------------------------------------------
+
+class EnergyCriterion(object):
+    """ Defines an instability criterion based on the transient energy
+    function. The post-disturbance trajectory is deemed unstable once it
+    crosses the potential energy boundary surface (PEBS), where the
+    derivative of the potential energy along the centre-of-inertia referenced
+    rotor angles changes sign.
+    """
+
+    def __init__(self, dyn_case, tol=1e-04):
+        """ Constructs a new EnergyCriterion instance.
+        """
+        #: Dynamic case providing the generator inertia constants.
+        self.dyn_case = dyn_case
+
+        #: Tolerance on the potential energy derivative.
+        self.tol = tol
+
+        #: Centre-of-inertia referenced pre-disturbance rotor angles.
+        self._delta0 = None
+
+        #: Has the trajectory been inside the PEBS since clearing?
+        self._inside = False
+
+
+    def reset(self, Xgen0):
+        """ Prepares the criterion for a new trajectory starting from the
+        given generator state.
+        """
+        self._delta0 = self._coi_angles(Xgen0[:, 0])
+        self._inside = False
+
+
+    def unstable(self, t, Xgen, Vgen, Xgov, cleared):
+        """ Returns True if the post-disturbance trajectory has crossed the
+        potential energy boundary surface.
+        """
+        if not cleared:
+            return False
+
+        M = self._inertia()
+
+        # Accelerating power in the centre-of-inertia frame.
+        Pa = Xgov[:, 0] - Vgen[:, 2]
+        f = Pa - M / sum(M) * sum(Pa)
+
+        # Derivative of the potential energy along the rotor angles.
+        dVpe = -sum(f * (self._coi_angles(Xgen[:, 0]) - self._delta0))
+
+        if dVpe > self.tol:
+            self._inside = True
+        elif self._inside and dVpe < -self.tol:
+            return True
+
+        return False
+
+
+    def _inertia(self):
+        """ Returns the generator inertia coefficients.
+        """
+        H = array([g.h for g in self.dyn_case.dyn_generators])
+        return 2 * H / (2 * pi * self.dyn_case.freq)
+
+
+    def _coi_angles(self, delta):
+        """ Returns the rotor angles referenced to the centre of inertia.
+        """
+        M = self._inertia()
+        return delta - sum(M * delta) / sum(M)
+
+#------------------------------------------------------------------------------
+#  "CCTSearch" class:
+#------------------------------------------------------------------------------
+
+class CCTSearch(object):
+    """ Finds the critical clearing time of a scenario.
+
+    The trajectory up to and including the fault instant is simulated once
+    and each trial clearing time resumes from it. Trials are terminated as
+    soon as the instability criterion fires. With more than one process the
+    bracket is divided into as many trial points as there are processes and
+    these are simulated in parallel.
+    """
+
+    def __init__(self, solver, criterion=None, max_cct=1.0, tol=0.005,
+                 processes=None):
+        """ Constructs a new CCTSearch instance.
+        """
+        #: Dynamic solver used to simulate each trial.
+        self.solver = solver
+
+        #: Instability criterion.
+        self.criterion = AngleCriterion() if criterion is None else criterion
+
+        #: Upper bound on the critical clearing time (s).
+        self.max_cct = max_cct
+
+        #: Width of the final bracket (s).
+        self.tol = tol
+
+        #: Number of trials simulated in parallel. The number of CPUs is
+        #: used if None and the search is a bisection in this process if 1.
+        self.processes = processes
+
+
+    def solve(self, scenario, init=None):
+        """ Searches for the critical clearing time of the given scenario.
+
+        @rtype: dict
+        @return: Solution dictionary with the following keys:
+                   - C{cct} - critical clearing time (s) after the fault
+                   - C{bracket} - final bracket on the clearing instant
+                   - C{trials} - number of trial simulations
+                   - C{converged} - was the search successful?
+                   - C{elapsed} - time taken (s)
+        """
+        t0 = time()
+        solver = self.solver
+
+        if init is None:
+            init = solver.initialise()
+        if not init or not scenario.clearing:
+            return {"converged": False}
+
+        times = [event.time for event in scenario.clearing]
+        saved = solver.events, solver.plot, solver.verbose, solver.criterion
+        solver.plot, solver.verbose = False, False
+        solver.criterion = self.criterion
+        pool = None
+        try:
+            # Simulate the trajectory up to and including the fault instant.
+            solver.events = scenario.events
+            fault = solver.solve(init, until=scenario.fault_time)
+            if not fault:
+                return {"converged": False}
+
+            state = fault["state"]
+
+            if self.processes == 1:
+                k = 1
+                trials = lambda points: [self.stable(scenario, point, init,
+                    state) for point in points]
+            else:
+                # The fault state is passed to each worker once.
+                pool = Pool(self.processes, _init_cct,
+                            (self, scenario, init, state))
+                k = self.processes or cpu_count()
+                trials = lambda points: pool.map(_trial_stable, points)
+
+            lower = scenario.fault_time
+            upper = lower + self.max_cct
+            n = 1
+
+            if trials([upper])[0]:
+                lower = upper
+            else:
+                while upper - lower > self.tol:
+                    points = [lower + (upper - lower) * (j + 1) / (k + 1.0)
+                              for j in range(k)]
+                    n += k
+                    for point, stable in zip(points, trials(points)):
+                        if stable:
+                            lower = point
+                        else:
+                            upper = point
+                            break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            solver.events, solver.plot, solver.verbose, solver.criterion =saved
+            for event in reversed(scenario.events):
+                event.revert()
+            for event, t in zip(scenario.clearing, times):
+                event.time = t
+
+        return {"cct": lower - scenario.fault_time, "bracket": (lower, upper),
+                "trials": n, "converged": True, "elapsed": time() - t0}
+
+
+    def stable(self, scenario, clearing_time, init, state):
+        """ Returns True if the trajectory, resumed from the given state with
+        the disturbance cleared at the given instant, is stable.
+        """
+        pending = [e for e in scenario.events if not e._applied]
+        for event in scenario.clearing:
+            event.time = clearing_time
+
+        self.solver.events = pending + scenario.clearing
+        try:
+            solution = self.solver.solve(init, state=state)
+        finally:
+            for event in reversed(pending + scenario.clearing):
+                event.revert()
+
+        return bool(solution) and not solution["unstable"]
+
+#------------------------------------------------------------------------------
+#  Critical clearing time worker:
+#------------------------------------------------------------------------------
+
+#: Search, scenario, initial conditions and fault state of the worker
+#: process.
+_cct = None
+
+def _init_cct(search, scenario, init, state):
+    """ Initialises a worker process with the search, scenario, initial
+    conditions and fault state.
+    """
+    global _cct
+    _cct = (search, scenario, init, state)
+
+
+def _trial_stable(clearing_time):
+    """ Returns True if the scenario of the worker process is stable when
+    cleared at the given instant.
+    """
+    search, scenario, init, state = _cct
+    return search.stable(scenario, clearing_time, init, state)
+
 # EOF -------------------------------------------------------------------------
@@ -35,8 +35,6 @@ from numpy import \
 from scipy.sparse import \
     csr_matrix, vstack, hstack
 
-from scipy.sparse.linalg import spsolve
-
 from case import PV, PQ
 
 #------------------------------------------------------------------------------
@@ -109,6 +107,8 @@ class StateEstimator(object):
     def run(self):
         """ Solves a state estimation problem.
         """
+        from scipy.sparse.linalg import spsolve
+
         case = self.case
         baseMVA = case.base_mva
         buses = self.case.connected_buses
@@ -23,10 +23,16 @@
 #------------------------------------------------------------------------------
 
 from pylon.io.pickle import PickleReader, PickleWriter
+from pylon.io.npz import NPZReader, NPZWriter
+from pylon.io.store import ChannelStore
+from pylon.io.snapshot import SnapshotReader, SnapshotWriter, case_delta, \
+    apply_delta
+from pylon.io.results import CSVResultWriter, BinaryResultWriter, \
+    BinaryResultReader
 
-from matpower import MATPOWERReader, MATPOWERWriter
+from matpower import MATPOWERReader, FastMATPOWERReader, MATPOWERWriter
 
-from psse import PSSEReader
+from psse import PSSEReader, FastPSSEReader
 from psse import PSSEWriter
 #from psat import PSATReader
 
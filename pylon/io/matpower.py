@@ -21,10 +21,13 @@
 #  Imports:
 #------------------------------------------------------------------------------
 
+import re
 import time
 import logging
 from os.path import basename, splitext
 
+from numpy import fromstring, zeros
+
 #from parsing_util import \
 #    integer, boolean, real, scolon, matlab_comment, make_unique_name, \
 #    ToInteger, lbrack, rbrack, equals
@@ -267,6 +270,183 @@ class MATPOWERReader(_CaseReader):
 
         return model, c_startup, c_shutdown, cost
 
+#------------------------------------------------------------------------------
+#  "FastMATPOWERReader" class:
+#------------------------------------------------------------------------------
+
+#: MATLAB comments, to the end of the line.
+COMMENT_RE = re.compile(r"%[^\n]*")
+
+#: Assignment of a matrix to a field, e.g. "mpc.bus = [ ... ];".
+MATRIX_RE = re.compile(r"^\s*(?:mpc\.)?(\w+)\s*=\s*\[(.*?)\]", re.M | re.S)
+
+#: Assignment of the system MVA base.
+BASE_MVA_RE = re.compile(r"^\s*(?:mpc\.)?baseMVA\s*=\s*([^;\s]+)", re.M)
+
+#: Function header, giving the case name.
+FUNCTION_RE = re.compile(r"^\s*function\s+(?:\[?[\w\s,]*\]?\s*=\s*)?(\w+)",
+                         re.M)
+
+#: Separators of matrix rows.
+ROW_RE = re.compile(r"[;\n]")
+
+class FastMATPOWERReader(_CaseReader):
+    """ Defines a reader for large MATPOWER case files.
+
+    Each data matrix is parsed into a 2-D array with a single NumPy call and
+    the case components are constructed from the array rows in bulk. MATLAB
+    comments, trailing semicolons and comma separators are supported.
+    """
+
+    def read(self, file_or_filename):
+        """ Returns a Case given a MATPOWER file or file name.
+        """
+        t0 = time.time()
+
+        data = self.read_arrays(file_or_filename)
+        t1 = time.time()
+
+        case = self._build_case(data)
+        case.index_buses()
+
+        rows = sum([len(data[k]) for k in ["bus", "gen", "branch", "gencost"]
+                    if k in data])
+        logger.info("MATPOWER file parsed in %.2fs (%.1fMB/s, %d rows/s) "
+            "and case constructed in %.2fs." % (t1 - t0,
+            data["size"] / 1e6 / max(t1 - t0, 1e-9), rows / max(t1 - t0,1e-9),
+            time.time() - t1))
+
+        return case
+
+
+    def read_arrays(self, file_or_filename):
+        """ Returns a columnar view of a MATPOWER case: a dict of the case
+        name, the system MVA base and a 2-D array for each data matrix
+        ("bus", "gen", "branch", "gencost", etc.).
+        """
+        if isinstance(file_or_filename, basestring):
+            logger.info("Loading MATPOWER file [%s]." %
+                        basename(file_or_filename))
+            fd = open(file_or_filename, "rb")
+            try:
+                text = fd.read()
+            finally:
+                fd.close()
+        else:
+            file_or_filename.seek(0)
+            text = file_or_filename.read()
+
+        data = {"size": len(text)}
+
+        text = COMMENT_RE.sub("", text)
+
+        match = FUNCTION_RE.search(text)
+        data["name"] = match.group(1) if match is not None else None
+
+        match = BASE_MVA_RE.search(text)
+        data["baseMVA"] = float(match.group(1)) if match is not None else 100.0
+
+        for match in MATRIX_RE.finditer(text):
+            data[match.group(1)] = parse_matrix(match.group(2))
+
+        return data
+
+
+    def _build_case(self, data):
+        """ Returns a case constructed from the data matrices.
+        """
+        bustype_map = {1: PQ, 2: PV, 3: REFERENCE, 4: ISOLATED}
+
+        case = Case(name=data["name"], base_mva=data["baseMVA"])
+
+        bus_map = {}
+        for row in data.get("bus", zeros((0, 13))).tolist():
+            bus = Bus(type=bustype_map[int(row[1])], v_base=row[9],
+                v_magnitude=row[7], v_angle=row[8], v_max=row[11],
+                v_min=row[12], p_demand=row[2], q_demand=row[3],
+                g_shunt=row[4], b_shunt=row[5])
+            bus._i = int(row[0])
+            bus.area = int(row[6])
+            bus.zone = int(row[10])
+
+            bus_map[bus._i] = bus
+            case.buses.append(bus)
+
+        for row in data.get("gen", zeros((0, 10))).tolist():
+            g = Generator(bus_map[int(row[0])], online=row[7] > 0.0,
+                base_mva=row[6], p=row[1], p_max=row[8], p_min=row[9],
+                v_magnitude=row[5], q=row[2], q_max=row[3], q_min=row[4])
+            case.generators.append(g)
+
+        for row in data.get("branch", zeros((0, 11))).tolist():
+            l = Branch(bus_map[int(row[0])], bus_map[int(row[1])],
+                online=row[10] > 0.0, r=row[2], x=row[3], b=row[4],
+                rate_a=row[5], rate_b=row[6], rate_c=row[7], ratio=row[8],
+                phase_shift=row[9])
+            if len(row) > 12:
+                l.ang_min, l.ang_max = row[11], row[12]
+            case.branches.append(l)
+
+        ng = len(case.generators)
+        for i, row in enumerate(data.get("gencost", zeros((0, 4))).tolist()):
+            model, cost = self._gencost(row)
+            if i < ng:
+                g = case.generators[i]
+                g.pcost_model = model
+                g.c_startup = row[1]
+                g.c_shutdown = row[2]
+                g.p_cost = cost
+            elif i < 2 * ng:
+                g = case.generators[i - ng]
+                g.qcost_model = model
+                g.q_cost = cost
+            else:
+                logger.info("Superfluous cost data [%s]." % row)
+
+        return case
+
+
+    def _gencost(self, row):
+        """ Returns the cost model and cost data of a row of cost data.
+        """
+        n = int(row[3])
+        if int(row[0]) == 1:
+            d = row[4:4 + 2 * n]
+            return PW_LINEAR, zip(d[0::2], d[1::2])
+        else:
+            return POLYNOMIAL, tuple(row[4:4 + n])
+
+#------------------------------------------------------------------------------
+#  Matrix parsing:
+#------------------------------------------------------------------------------
+
+def parse_matrix(body):
+    """ Returns a 2-D array of the rows of a MATLAB matrix, given the text
+    between the brackets. Ragged rows, such as costs of differing order, are
+    padded with zeros.
+    """
+    body = body.replace(",", " ")
+    rows = [row for row in ROW_RE.split(body) if row.strip()]
+    if not rows:
+        return zeros((0, 0))
+
+    rows = [row.split() for row in rows]
+    ncols = len(rows[0])
+
+    for row in rows:
+        if len(row) != ncols:
+            break
+    else:
+        values = fromstring(body.replace(";", " "), sep=" ")
+        return values.reshape(len(rows), ncols)
+
+    rows = [[float(v) for v in row] for row in rows]
+    matrix = zeros((len(rows), max([len(row) for row in rows])))
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+
+    return matrix
+
 #------------------------------------------------------------------------------
 #  "MATPOWERReader" class:
 #------------------------------------------------------------------------------
@@ -0,0 +1,335 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a reader and a writer of cases in a compact binary format.
+
+Cases are stored in an uncompressed NumPy ".npz" archive with an array for
+each column of the bus, branch and generator tables, e.g. "bus.v_max".
+Strings are stored as fixed width string arrays, connections as bus indexes
+and cost data as a flat array of values with an array of row offsets. As
+the archive is not compressed, the columns may be memory-mapped, such that
+only those touched are read from disk.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import time
+import struct
+import logging
+import zipfile
+
+from os.path import basename
+from cStringIO import StringIO
+
+from numpy import array, asarray, memmap, savez, load, zeros, cumsum
+from numpy.lib import format as npy_format
+
+from pylon.case import Case, Bus, Branch
+from pylon.generator import Generator, PW_LINEAR
+from pylon.io.common import _CaseReader, _CaseWriter
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+#: Version of the format written.
+NPZ_VERSION = 1
+
+#: Numeric columns of each table.
+BUS_COLUMNS = ["v_base", "v_magnitude", "v_angle", "v_max", "v_min",
+    "p_demand", "q_demand", "g_shunt", "b_shunt", "area", "zone", "p_lmbda",
+    "q_lmbda", "mu_vmin", "mu_vmax"]
+
+BRANCH_COLUMNS = ["online", "r", "x", "b", "rate_a", "rate_b", "rate_c",
+    "ratio", "phase_shift", "ang_min", "ang_max", "p_from", "p_to", "q_from",
+    "q_to", "mu_s_from", "mu_s_to", "mu_angmin", "mu_angmax"]
+
+GENERATOR_COLUMNS = ["online", "base_mva", "p", "p_max", "p_min",
+    "v_magnitude", "q", "q_max", "q_min", "c_startup", "c_shutdown",
+    "mu_pmin", "mu_pmax", "mu_qmin", "mu_qmax"]
+
+#: Types of the non-float columns.
+COLUMN_TYPES = {"online": bool, "area": int, "zone": int}
+
+#: Size of a zip local file header, excluding the file name and extra field.
+ZIP_HEADER_SIZE = 30
+
+#------------------------------------------------------------------------------
+#  "NPZReader" class:
+#------------------------------------------------------------------------------
+
+class NPZReader(_CaseReader):
+    """ Defines a reader of cases in the compact binary format.
+    """
+
+    def __init__(self, mmap_mode=None):
+        """ Initialises a new NPZReader instance.
+
+        @param mmap_mode: If not None, the columns of a case file given by
+            name are memory-mapped using the given mode (see numpy.memmap).
+        """
+        #: Memory-map mode of the columns.
+        self.mmap_mode = mmap_mode
+
+
+    def read(self, file_or_filename):
+        """ Returns a case from the given file or file name.
+        """
+        t0 = time.time()
+
+        data = self.read_arrays(file_or_filename)
+
+        version = int(data["version"])
+        if version > NPZ_VERSION:
+            logger.error("Unsupported case format version [%d]." % version)
+            return None
+
+        case = self._build_case(data)
+
+        logger.info("Case read in %.3fs." % (time.time() - t0))
+
+        return case
+
+
+    def read_arrays(self, file_or_filename):
+        """ Returns a dict of the column arrays of a case.
+        """
+        if isinstance(file_or_filename, basestring):
+            logger.info("Loading case file [%s]." %
+                        basename(file_or_filename))
+            if self.mmap_mode is not None:
+                return mmap_npz(file_or_filename, self.mmap_mode)
+
+        npz = load(file_or_filename)
+        try:
+            return dict([(name, npz[name]) for name in npz.files])
+        finally:
+            npz.close()
+
+
+    def _build_case(self, data):
+        """ Returns a case constructed from the column arrays.
+        """
+        case = Case(name=str(data["name"]), base_mva=float(data["base_mva"]))
+
+        names = data["bus.name"].tolist()
+        types = data["bus.type"].tolist()
+        columns = [data["bus." + c].tolist() for c in BUS_COLUMNS]
+        for i, values in enumerate(zip(*columns)):
+            bus = Bus(names[i], types[i])
+            for attr, value in zip(BUS_COLUMNS, values):
+                setattr(bus, attr, value)
+            case.buses.append(bus)
+        buses = case.buses
+
+        names = data["branch.name"].tolist()
+        from_bus = data["branch.from_bus"].tolist()
+        to_bus = data["branch.to_bus"].tolist()
+        columns = [data["branch." + c].tolist() for c in BRANCH_COLUMNS]
+        for i, values in enumerate(zip(*columns)):
+            l = Branch(buses[from_bus[i]], buses[to_bus[i]], names[i])
+            for attr, value in zip(BRANCH_COLUMNS, values):
+                setattr(l, attr, value)
+            case.branches.append(l)
+
+        names = data["generator.name"].tolist()
+        bus = data["generator.bus"].tolist()
+        pcost_model = data["generator.pcost_model"].tolist()
+        qcost_model = data["generator.qcost_model"].tolist()
+        p_cost = _unflatten(data["generator.p_cost"],
+                            data["generator.p_cost_ptr"], pcost_model)
+        q_cost = _unflatten(data["generator.q_cost"],
+                            data["generator.q_cost_ptr"], qcost_model)
+        columns = [data["generator." + c].tolist() for c in GENERATOR_COLUMNS]
+        for i, values in enumerate(zip(*columns)):
+            g = Generator(buses[bus[i]], names[i], p_cost=p_cost[i],
+                          pcost_model=pcost_model[i])
+            for attr, value in zip(GENERATOR_COLUMNS, values):
+                setattr(g, attr, value)
+            if qcost_model[i]:
+                g.qcost_model = qcost_model[i]
+                g.q_cost = q_cost[i]
+            case.generators.append(g)
+
+        case.index_buses()
+
+        return case
+
+#------------------------------------------------------------------------------
+#  "NPZWriter" class:
+#------------------------------------------------------------------------------
+
+class NPZWriter(_CaseWriter):
+    """ Defines a writer of cases in the compact binary format.
+    """
+
+    def _write_data(self, file):
+        try:
+            file.tell()
+        except IOError:
+            # Archives are written with seeks, so output to a pipe, such as
+            # stdout, is written to a buffer first.
+            buf = StringIO()
+            savez(buf, **self.write_arrays())
+            file.write(buf.getvalue())
+        else:
+            savez(file, **self.write_arrays())
+
+
+    def write_arrays(self):
+        """ Returns a dict of the column arrays of the case.
+        """
+        case = self.case
+        buses = case.buses
+        bus_idx = dict([(id(bus), i) for i, bus in enumerate(buses)])
+        branches = case.branches
+        generators = case.generators
+
+        data = {"version": array(NPZ_VERSION),
+                "name": array(str(case.name)),
+                "base_mva": array(case.base_mva, dtype=float)}
+
+        data["bus.name"] = _strings([bus.name for bus in buses])
+        data["bus.type"] = _strings([bus.type for bus in buses])
+        for attr in BUS_COLUMNS:
+            data["bus." + attr] = _column(buses, attr)
+
+        data["branch.name"] = _strings([l.name for l in branches])
+        data["branch.from_bus"] = \
+            array([bus_idx[id(l.from_bus)] for l in branches], dtype=int)
+        data["branch.to_bus"] = \
+            array([bus_idx[id(l.to_bus)] for l in branches], dtype=int)
+        for attr in BRANCH_COLUMNS:
+            data["branch." + attr] = _column(branches, attr)
+
+        data["generator.name"] = _strings([g.name for g in generators])
+        data["generator.bus"] = \
+            array([bus_idx[id(g.bus)] for g in generators], dtype=int)
+        for attr in GENERATOR_COLUMNS:
+            data["generator." + attr] = _column(generators, attr)
+
+        data["generator.pcost_model"] = \
+            _strings([g.pcost_model for g in generators])
+        data["generator.p_cost"], data["generator.p_cost_ptr"] = \
+            _flatten([g.p_cost for g in generators])
+
+        data["generator.qcost_model"] = \
+            _strings([g.qcost_model or "" for g in generators])
+        data["generator.q_cost"], data["generator.q_cost_ptr"] = \
+            _flatten([g.q_cost if g.qcost_model else () for g in generators])
+
+        return data
+
+#------------------------------------------------------------------------------
+#  Memory-mapped archive members:
+#------------------------------------------------------------------------------
+
+def mmap_npz(filename, mode="r"):
+    """ Returns a dict of memory-maps of the arrays in an uncompressed ".npz"
+    archive. Compressed members are read into memory.
+    """
+    arrays = {}
+
+    archive = zipfile.ZipFile(filename)
+    fd = open(filename, "rb")
+    try:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") \
+                else info.filename
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = npy_format.read_array(archive.open(info))
+                continue
+
+            # Skip the local file header to the start of the member.
+            fd.seek(info.header_offset)
+            header = fd.read(ZIP_HEADER_SIZE)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            fd.seek(name_len + extra_len, 1)
+
+            version = npy_format.read_magic(fd)
+            if version == (1, 0):
+                shape, fortran, dtype = npy_format.read_array_header_1_0(fd)
+            else:
+                shape, fortran, dtype = npy_format.read_array_header_2_0(fd)
+
+            if dtype.hasobject:
+                raise ValueError("Object array [%s] can not be mapped." % name)
+
+            if not shape or 0 in shape:
+                # Scalars and empty arrays are not mapped.
+                arrays[name] = npy_format.read_array(archive.open(info))
+            else:
+                arrays[name] = memmap(filename, dtype, mode, fd.tell(), shape,
+                                      "F" if fortran else "C")
+    finally:
+        fd.close()
+        archive.close()
+
+    return arrays
+
+#------------------------------------------------------------------------------
+#  Column conversion:
+#------------------------------------------------------------------------------
+
+def _strings(values):
+    """ Returns a fixed width string array of the values.
+    """
+    return array([str(v) for v in values], dtype=str)
+
+
+def _column(objects, attr):
+    """ Returns an array of the named attribute of each object.
+    """
+    return array([getattr(obj, attr) for obj in objects],
+                 dtype=COLUMN_TYPES.get(attr, float))
+
+
+def _flatten(costs):
+    """ Returns a flat array of the cost data of each generator and an array
+    of the offset of the data of each generator.
+    """
+    values = [asarray(cost, dtype=float).ravel() for cost in costs]
+    ptr = zeros(len(values) + 1, dtype=int)
+    ptr[1:] = cumsum([len(v) for v in values])
+    flat = zeros(ptr[-1])
+    for i, v in enumerate(values):
+        flat[ptr[i]:ptr[i + 1]] = v
+    return flat, ptr
+
+
+def _unflatten(flat, ptr, models):
+    """ Returns the cost data of each generator.
+    """
+    flat, ptr = flat.tolist(), ptr.tolist()
+    costs = []
+    for i, model in enumerate(models):
+        values = flat[ptr[i]:ptr[i + 1]]
+        if model == PW_LINEAR:
+            costs.append(zip(values[0::2], values[1::2]))
+        else:
+            costs.append(tuple(values))
+    return costs
+
+# EOF -------------------------------------------------------------------------
@@ -21,6 +21,7 @@
 #  Imports:
 #------------------------------------------------------------------------------
 
+import re
 import time
 import logging
 from os.path import basename, splitext
@@ -28,9 +29,10 @@ from os.path import basename, splitext
 from parsing_util import integer, boolean, real, scolon, matlab_comment
 from pyparsing import Optional, Literal, ZeroOrMore
 
-from pylon import Case, Bus, Branch, Generator
+from pylon import Case, Bus, Branch, Generator, REFERENCE, POLYNOMIAL
 
 from pylon.io.common import _CaseReader
+from pylon.io.matpower import COMMENT_RE, parse_matrix
 
 #------------------------------------------------------------------------------
 #  Logging:
@@ -38,6 +40,13 @@ from pylon.io.common import _CaseReader
 
 logger = logging.getLogger(__name__)
 
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+#: Assignment of a data matrix, e.g. "Bus.con = [ ... ];".
+CON_RE = re.compile(r"^\s*(\w+)\.con\s*=\s*\[(.*?)\]", re.M | re.S)
+
 #------------------------------------------------------------------------------
 #  "PSATReader" class:
 #------------------------------------------------------------------------------
@@ -47,6 +56,13 @@ class PSATReader(_CaseReader):
     returning a Case object.
     """
 
+    def __init__(self):
+        """ Initialises a new PSATReader instance.
+        """
+        #: Grammar of a case file, built on the first read. The parse actions
+        #: add components to the case being read.
+        self._grammar = None
+
     #--------------------------------------------------------------------------
     #  "_CaseReader" interface:
     #--------------------------------------------------------------------------
@@ -73,6 +89,22 @@ class PSATReader(_CaseReader):
 
         self.case.name = name
 
+        if self._grammar is None:
+            self._grammar = self._get_case_construct()
+        self._grammar.parseFile(file_or_filename)
+
+        elapsed = time.time() - t0
+        logger.info("PSAT case file parsed in %.3fs." % elapsed)
+
+        return self.case
+
+    #--------------------------------------------------------------------------
+    #  "PSATReader" interface:
+    #--------------------------------------------------------------------------
+
+    def _get_case_construct(self):
+        """ Returns a construct for a case file.
+        """
         bus_array = self._get_bus_array_construct()
         line_array = self._get_line_array_construct()
         # TODO: Lines.con - Alternative line data format
@@ -93,16 +125,8 @@ class PSATReader(_CaseReader):
             ZeroOrMore(matlab_comment) + demand_array + \
             ZeroOrMore(matlab_comment) + supply_array
 
-        case.parseFile(file_or_filename)
-
-        elapsed = time.time() - t0
-        logger.info("PSAT case file parsed in %.3fs." % elapsed)
-
-        return self.case
+        return case
 
-    #--------------------------------------------------------------------------
-    #  "PSATReader" interface:
-    #--------------------------------------------------------------------------
 
     def _get_bus_array_construct(self):
         """ Returns a construct for an array of bus data.
@@ -520,4 +544,155 @@ class PSATReader(_CaseReader):
 #        if tokens.has_key("status"):
 #            g.online = tokens["status"]
 
+#------------------------------------------------------------------------------
+#  "FastPSATReader" class:
+#------------------------------------------------------------------------------
+
+class FastPSATReader(_CaseReader):
+    """ Defines a reader for large PSAT data files.
+
+    Each "<Component>.con" block is found with a regular expression and
+    parsed into a 2-D array with a single NumPy call, from which the case is
+    constructed as by L{PSATReader}. Files that can not be parsed this way are
+    read using L{PSATReader}.
+    """
+
+    def __init__(self):
+        """ Initialises a new FastPSATReader instance.
+        """
+        #: Reader of files that can not be parsed in bulk.
+        self._fallback = None
+
+
+    def read(self, file_or_filename):
+        """ Returns a case given a PSAT data file or file name.
+        """
+        t0 = time.time()
+
+        try:
+            data = self.read_arrays(file_or_filename)
+        except ValueError, e:
+            logger.warning("Falling back to the PSAT grammar: %s" % e)
+            if self._fallback is None:
+                self._fallback = PSATReader()
+            if not isinstance(file_or_filename, basestring):
+                file_or_filename.seek(0)
+            return self._fallback.read(file_or_filename)
+
+        if isinstance(file_or_filename, basestring):
+            name, _ = splitext(basename(file_or_filename))
+        else:
+            name, _ = splitext(file_or_filename.name)
+
+        case = self._build_case(data)
+        case.name = name
+
+        logger.info("PSAT case file parsed in %.3fs." % (time.time() - t0))
+
+        return case
+
+
+    def read_arrays(self, file_or_filename):
+        """ Returns a dict of a 2-D array for each data matrix of a PSAT case,
+        keyed by component name ("Bus", "Line", "SW", "PV", "PQ", etc.).
+        """
+        if isinstance(file_or_filename, basestring):
+            logger.info("Loading PSAT file [%s]." % basename(file_or_filename))
+            fd = open(file_or_filename, "rb")
+            try:
+                text = fd.read()
+            finally:
+                fd.close()
+        else:
+            file_or_filename.seek(0)
+            text = file_or_filename.read()
+
+        text = COMMENT_RE.sub("", text)
+
+        data = {}
+        for match in CON_RE.finditer(text):
+            data[match.group(1)] = parse_matrix(match.group(2).replace("...",
+                                                                       " "))
+
+        return data
+
+
+    def _build_case(self, data):
+        """ Returns a case constructed from the data matrices.
+        """
+        case = Case()
+
+        bus_map = {}
+        for row in _rows(data, "Bus"):
+            bus = Bus()
+            bus.name = int(row[0])
+            if len(row) > 3:
+                bus.v_magnitude = row[2]
+                bus.v_angle = row[3]
+            bus_map[bus.name] = bus
+        case.buses = [bus_map[i] for i in sorted(bus_map)]
+
+        for row in _rows(data, "Line", 16):
+            l = Branch(bus_map[int(row[0])], bus_map[int(row[1])])
+            l.r = row[7]
+            l.x = row[8]
+            l.b = row[9]
+            l.rate_a = row[14]
+            l.rate_b = row[13]
+            l.rate_c = row[12]
+            l.ratio = row[10] if row[10] != 0.0 else 1.0
+            l.phase_shift = row[11]
+            case.branches.append(l)
+
+        for row in _rows(data, "SW", 7):
+            bus = bus_map[int(row[0])]
+            g = Generator(bus)
+            g.q_max = row[5]
+            g.q_min = row[6]
+            case.generators.append(g)
+            bus.type = REFERENCE
+
+        for row in _rows(data, "PV", 7):
+            g = Generator(bus_map[int(row[0])])
+            g.p = row[3]
+            g.q_max = row[5]
+            g.q_min = row[6]
+            case.generators.append(g)
+
+        for row in _rows(data, "PQ", 5):
+            bus = bus_map[int(row[0])]
+            bus.p_demand = row[3]
+            bus.q_demand = row[4]
+
+        generators = {}
+        for g in case.generators:
+            generators.setdefault(id(g.bus), []).append(g)
+
+        for row in _rows(data, "Supply", 9):
+            bus = bus_map[int(row[0])]
+            at_bus = generators.get(id(bus), [])
+            if not at_bus:
+                logger.error("No generator at bus [%s] for matching supply" %
+                             bus)
+                continue
+            elif len(at_bus) > 1:
+                logger.warning("More than one generator at bus [%s] for "
+                    "supply. Using the first one [%s]." % (bus, at_bus[0]))
+            g = at_bus[0]
+            g.pcost_model = POLYNOMIAL
+            g.poly_coeffs = (row[6], row[7], row[8])
+
+        return case
+
+#------------------------------------------------------------------------------
+#  Data matrix rows:
+#------------------------------------------------------------------------------
+
+def _rows(data, name, n=0):
+    """ Returns the rows of the named data matrix as lists of at least n
+    values, with missing optional columns as zeros.
+    """
+    rows = data[name].tolist() if name in data else []
+    return [row + [0.0] * (n - len(row)) for row in rows]
+
 # EOF -------------------------------------------------------------------------
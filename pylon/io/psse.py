@@ -22,9 +22,15 @@
 #------------------------------------------------------------------------------
 
 import os
+import re
+import csv
 import time
 import logging
 
+from itertools import izip_longest
+
+from numpy import array, zeros, bincount, where, sqrt, maximum, minimum
+
 from pylon import Case, Bus, Branch, Generator, PQ, PV, REFERENCE, ISOLATED
 from pylon.util import feq
 from pylon.io.common import _CaseReader, _CaseWriter
@@ -368,6 +374,471 @@ class PSSEReader(_CaseReader):
 
         return case
 
+#------------------------------------------------------------------------------
+#  "FastPSSEReader" class:
+#------------------------------------------------------------------------------
+
+#: Sections of version 30 and 31 Raw files, in order.
+SECTIONS_30 = ["bus", "load", "generator", "branch", "transformer", "area",
+    "two-terminal dc", "vsc dc", "switched shunt", "impedance correction",
+    "multi-terminal dc", "multi-section line", "zone", "interarea transfer",
+    "owner", "facts"]
+
+#: Sections of version 32 and 33 Raw files, in order.
+SECTIONS_32 = ["bus", "load", "fixed shunt", "generator", "branch",
+    "transformer", "area", "two-terminal dc", "vsc dc",
+    "impedance correction", "multi-terminal dc", "multi-section line", "zone",
+    "interarea transfer", "owner", "facts", "switched shunt", "gne",
+    "induction machine"]
+
+#: Sections from which the case is constructed.
+PARSED_SECTIONS = ["bus", "load", "fixed shunt", "generator", "branch",
+    "transformer", "switched shunt"]
+
+#: Data fields, including quoted strings, of a blank separated record.
+TOKEN_RE = re.compile(r"'[^']*'|[^\s,']+")
+
+#: Record data preceding a comment.
+RECORD_RE = re.compile(r"^((?:[^'/]|'[^']*')*)")
+
+class FastPSSEReader(PSSEReader):
+    """ Defines a streaming reader for large PSS/E(TM) version 30 to 33 Raw
+    files.
+
+    The file is read a section at a time. The records of each section are
+    tokenised in bulk, the columns required are converted to arrays and the
+    components of the section are added to the case before the next section
+    is read, so only one section is held in memory. Bus demands and shunts
+    are summed as their sections are read and set once the file is read.
+    Records of sections that are not modelled are counted, but not retained.
+    """
+
+    def _parse_file(self, file):
+        """ Parses the given file.
+        """
+        t0 = time.time()
+        file.seek(0)
+
+        header = _tokenise([RECORD_RE.match(file.next()).group(1)])[0]
+        base_mva = float(header[1])
+        if len(header) > 2 and header[2].strip():
+            version = int(float(header[2]))
+        else:
+            version = 30
+        name = "%s %s" % (file.next().strip(), file.next().strip())
+
+        names = SECTIONS_30 if version < 32 else SECTIONS_32
+
+        case = Case(name=name, base_mva=base_mva)
+
+        nrecords, injections = 0, None
+        for section, lines in self._sections(file, names):
+            rows = _tokenise(lines)
+            nrecords += len(rows)
+
+            if section == "bus":
+                injections = self._build_buses(case, rows, version)
+            elif section == "generator":
+                self._build_generators(case, rows)
+            elif section == "branch":
+                self._build_branches(case, rows)
+            elif section == "transformer":
+                self._build_transformers(case, rows)
+            else:
+                self._add_injections(section, rows, version, injections)
+
+        if injections is not None:
+            for attr, values in injections.iteritems():
+                for bus, value in zip(case.buses, values.tolist()):
+                    setattr(bus, attr, value)
+
+        elapsed = time.time() - t0
+        logger.info("PSS/E version %d case of %d records read in %.2fs "
+            "(%d rows/s)." % (version, nrecords, elapsed,
+                              nrecords / max(elapsed, 1e-9)))
+
+        return case
+
+
+    def _sections(self, file, names):
+        """ Yields the name of each parsed section and the data of its
+        records. The records of other sections are discarded.
+        """
+        i, lines, count = 0, [], 0
+        name = names[0]
+        parsed = name in PARSED_SECTIONS
+        for line in file:
+            # Only records with a comment, or a slash in a string, are
+            # matched against the record expression.
+            if "/" in line:
+                data = RECORD_RE.match(line).group(1).strip()
+            else:
+                data = line.strip()
+
+            if data == "0" or data == "Q":
+                if parsed:
+                    yield name, lines
+                elif count:
+                    logger.warning("Ignoring %d lines of %s data." %
+                                   (count, name))
+                if data == "Q":
+                    break
+                i, lines, count = i + 1, [], 0
+                name = names[i] if i < len(names) else "section %d" % (i + 1)
+                parsed = name in PARSED_SECTIONS
+            elif parsed:
+                lines.append(data)
+            else:
+                count += 1
+
+
+    def _build_buses(self, case, rows, version):
+        """ Adds buses to the case and returns arrays of their demands and
+        shunts, to which those of later sections are added.
+        """
+        bustype_map = {1: PQ, 2: PV, 3: REFERENCE, 4: ISOLATED}
+
+        table = _transpose(rows)
+        nb = len(rows)
+
+        # I, 'NAME', BASKV, IDE, GL, BL, AREA, ZONE, VM, VA, OWNER (v30/31)
+        # I, 'NAME', BASKV, IDE, AREA, ZONE, OWNER, VM, VA (v32/33)
+        if version < 32:
+            gl, bl = _column(table, 4), _column(table, 5)
+            area, zone, vm, va = 6, 7, 8, 9
+        else:
+            gl, bl = zeros(nb), zeros(nb)
+            area, zone, vm, va = 4, 5, 7, 8
+
+        ids = _column(table, 0, dtype=int)
+        self.bus_map = dict(zip(ids.tolist(), range(nb)))
+
+        # Sorted bus numbers and their indexes, for vectorised look up.
+        self._bus_order = ids.argsort()
+        self._bus_ids = ids[self._bus_order]
+
+        columns = zip(ids.tolist(), _text(table, 1),
+            _column(table, 2).tolist(), _column(table, 3, 1, int).tolist(),
+            _column(table, vm, 1.0).tolist(), _column(table, va).tolist(),
+            _column(table, area, 1, int).tolist(),
+            _column(table, zone, 1, int).tolist())
+
+        for i, name, kv, ide, v, a, ar, zn in columns:
+            bus = Bus(name, bustype_map[ide], kv, v, a)
+            bus._i = i
+            bus.area = ar
+            bus.zone = zn
+            case.buses.append(bus)
+
+        return {"p_demand": zeros(nb), "q_demand": zeros(nb), "g_shunt": gl,
+                "b_shunt": bl}
+
+
+    def _add_injections(self, section, rows, version, injections):
+        """ Adds the demands or shunts of the records of a load or shunt
+        section to the given arrays.
+        """
+        table = _transpose(rows)
+        idx = self._bus_index(table)
+        nb = len(injections["p_demand"])
+
+        if section == "load":
+            # I, ID, STATUS, AREA, ZONE, PL, QL, IP, IQ, YP, YQ, OWNER
+            on = _column(table, 2, 1.0)
+            injections["p_demand"] += bincount(idx, _column(table, 5) * on, nb)
+            injections["q_demand"] += bincount(idx, _column(table, 6) * on, nb)
+
+        elif section == "fixed shunt":
+            # I, ID, STATUS, GL, BL
+            on = _column(table, 2, 1.0)
+            injections["g_shunt"] += bincount(idx, _column(table, 3) * on, nb)
+            injections["b_shunt"] += bincount(idx, _column(table, 4) * on, nb)
+
+        elif section == "switched shunt":
+            # I, MODSW, VSWHI, VSWLO, SWREM, RMPCT, 'RMIDNT', BINIT, ...
+            # I, MODSW, ADJM, STAT, VSWHI, VSWLO, SWREM, RMPCT, 'RMIDNT',
+            # BINIT, ... (v33)
+            if version < 33:
+                binit = _column(table, 7)
+            else:
+                binit = _column(table, 9) * _column(table, 3, 1.0)
+            injections["b_shunt"] += bincount(idx, binit, nb)
+
+
+    def _build_generators(self, case, rows):
+        """ Adds generators to the case.
+        """
+        # I,ID,PG,QG,QT,QB,VS,IREG,MBASE,ZR,ZX,RT,XT,GTAP,STAT,RMPCT,PT,PB,...
+        buses = case.buses
+        table = _transpose(rows)
+
+        columns = zip(self._bus_index(table).tolist(),
+            (_column(table, 14, 1.0) > 0.0).tolist(),
+            *[_column(table, i, default).tolist() for i, default in
+              [(8, case.base_mva), (2, 0.0), (16, 9999.0), (17, -9999.0),
+               (6, 1.0), (3, 0.0), (4, 9999.0), (5, -9999.0)]])
+
+        for i, on, mbase, p, p_max, p_min, v, q, q_max, q_min in columns:
+            g = Generator(buses[i], online=on, base_mva=mbase, p=p,
+                p_max=p_max, p_min=p_min, v_magnitude=v, q=q, q_max=q_max,
+                q_min=q_min)
+            case.generators.append(g)
+
+
+    def _build_branches(self, case, rows):
+        """ Adds non-transformer branches to the case.
+        """
+        # I,J,CKT,R,X,B,RATEA,RATEB,RATEC,GI,BI,GJ,BJ,ST,...
+        buses = case.buses
+        table = _transpose(rows)
+
+        columns = zip(self._bus_index(table).tolist(),
+            self._bus_index(table, 1).tolist(),
+            (_column(table, 13, 1.0) > 0.0).tolist(),
+            *[_column(table, i).tolist() for i in range(3, 9)])
+
+        for i, j, on, r, x, b, rate_a, rate_b, rate_c in columns:
+            l = Branch(buses[i], buses[j], online=on, r=r, x=x, b=b,
+                       rate_a=rate_a, rate_b=rate_b, rate_c=rate_c)
+            case.branches.append(l)
+
+
+    def _build_transformers(self, case, rows):
+        """ Adds two-winding transformers and, for each three-winding
+        transformer, a star bus and three branches to the case.
+        """
+        # Group the lines of each record. Three-winding transformers, with
+        # a non-zero third bus, have five lines and two-winding have four.
+        records = []
+        k = 0
+        while k < len(rows):
+            n = 5 if int(rows[k][2]) != 0 else 4
+            records.append(rows[k:k + n])
+            k += n
+
+        two = [r for r in records if len(r) == 4]
+        three = [r for r in records if len(r) == 5]
+
+        two = self._two_winding(case, two)
+        three = self._three_winding(case, three)
+
+        # Create the branches in the order of the records.
+        for record in records:
+            if len(record) == 4:
+                case.branches.append(two.next())
+            else:
+                for l in three.next():
+                    case.branches.append(l)
+
+
+    def _two_winding(self, case, records):
+        """ Returns an iterator of the branches of two-winding transformers.
+        """
+        buses = case.buses
+        line1, line2, line3, line4 = _lines(records, 4)
+
+        # I,J,K,CKT,CW,CZ,CM,MAG1,MAG2,NMETR,'NAME',STAT,...
+        i, j = self._bus_index(line1), self._bus_index(line1, 1)
+        cw, cz = _column(line1, 4, 1, int), _column(line1, 5, 1, int)
+
+        # R1-2,X1-2,SBASE1-2
+        r, x = self._impedance(case, cz, _column(line2, 0), _column(line2, 1),
+                               _column(line2, 2, case.base_mva))
+
+        # WINDV1,NOMV1,ANG1,RATA1,RATB1,RATC1,...
+        # WINDV2,NOMV2
+        ratio = self._ratio(case, cw, i, _column(line3, 0, 1.0),
+                            _column(line3, 1)) / \
+            self._ratio(case, cw, j, _column(line4, 0, 1.0),
+                        _column(line4, 1))
+
+        columns = zip(i.tolist(), j.tolist(), _text(line1, 10),
+            (_column(line1, 11, 1.0) > 0.0).tolist(), r.tolist(), x.tolist(),
+            _column(line1, 8).tolist(), ratio.tolist(),
+            _column(line3, 2).tolist(), _column(line3, 3).tolist(),
+            _column(line3, 4).tolist(), _column(line3, 5).tolist())
+
+        for fbus, tbus, name, on, r, x, b, t, shift, ra, rb, rc in columns:
+            l = Branch(buses[fbus], buses[tbus], name or None, on, r, x, b,
+                       ratio=t, phase_shift=shift)
+            _set_rates(l, ra, rb, rc)
+            yield l
+
+
+    def _three_winding(self, case, records):
+        """ Returns an iterator of a star bus and the branches of each
+        three-winding transformer.
+        """
+        buses = case.buses
+        line1, line2, line3, line4, line5 = _lines(records, 5)
+
+        # I,J,K,CKT,CW,CZ,CM,MAG1,MAG2,NMETR,'NAME',STAT,...
+        idx = [self._bus_index(line1, w) for w in range(3)]
+        cw, cz = _column(line1, 4, 1, int), _column(line1, 5, 1, int)
+        stat = _column(line1, 11, 1, int)
+
+        # R1-2,X1-2,SBASE1-2,R2-3,X2-3,SBASE2-3,R3-1,X3-1,SBASE3-1,VMSTAR,ANSTAR
+        r12, x12 = self._impedance(case, cz, _column(line2, 0),
+            _column(line2, 1), _column(line2, 2, case.base_mva))
+        r23, x23 = self._impedance(case, cz, _column(line2, 3),
+            _column(line2, 4), _column(line2, 5, case.base_mva))
+        r31, x31 = self._impedance(case, cz, _column(line2, 6),
+            _column(line2, 7), _column(line2, 8, case.base_mva))
+
+        # Star equivalent impedances.
+        r = [0.5 * (r12 + r31 - r23), 0.5 * (r12 + r23 - r31),
+             0.5 * (r23 + r31 - r12)]
+        x = [0.5 * (x12 + x31 - x23), 0.5 * (x12 + x23 - x31),
+             0.5 * (x23 + x31 - x12)]
+        for xw in x:
+            small = abs(xw) < 1e-5
+            if small.any():
+                logger.warning("Zero reactance of %d transformer windings." %
+                               small.sum())
+                xw[small] = self.xtol
+
+        # WINDVn,NOMVn,ANGn,RATAn,RATBn,RATCn,...
+        windings = [line3, line4, line5]
+        ratio = [self._ratio(case, cw, idx[w], _column(windings[w], 0, 1.0),
+                             _column(windings[w], 1)) for w in range(3)]
+
+        # STAT of 2, 3 and 4 denotes only winding 2, 3 or 1 out of service.
+        online = [(stat != 0) & (stat != 4), (stat != 0) & (stat != 2),
+                  (stat != 0) & (stat != 3)]
+
+        b = _column(line1, 8).tolist()
+        vmstar = _column(line2, 9, 1.0).tolist()
+        anstar = _column(line2, 10).tolist()
+        names = _text(line1, 10)
+
+        columns = [zip(idx[w].tolist(), online[w].tolist(), r[w].tolist(),
+                       x[w].tolist(), ratio[w].tolist(),
+                       *[_column(windings[w], c).tolist() for c in range(2, 6)])
+                   for w in range(3)]
+
+        star_id = max(self.bus_map.keys() + [0])
+        for k in range(len(records)):
+            star_id += 1
+            star = Bus(v_magnitude=vmstar[k], v_angle=anstar[k])
+            star.name = "n" + (names[k] or star.name)
+            star._i = star_id
+            case.buses.append(star)
+
+            branches = []
+            for w in range(3):
+                i, on, rw, xw, t, shift, ra, rb, rc = columns[w][k]
+                l = Branch(buses[i], star, names[k] or None, on, rw, xw,
+                           ratio=t, phase_shift=shift)
+                _set_rates(l, ra, rb, rc)
+                branches.append(l)
+            branches[0].b = b[k]
+
+            yield branches
+
+
+    def _impedance(self, case, cz, r, x, sbase):
+        """ Returns winding resistances and reactances in p.u. on the system
+        base, given the impedance codes of each transformer.
+        """
+        # Load loss (W) and impedance magnitude (p.u. on the winding base).
+        loss = cz == 3
+        r = where(loss, r / (sbase * 1e6), r)
+        x = where(loss, sqrt(maximum(x**2 - r**2, 0.0)), x)
+
+        # Winding base.
+        scale = where(cz == 1, 1.0, case.base_mva / sbase)
+        return r * scale, x * scale
+
+
+    def _ratio(self, case, cw, idx, windv, nomv):
+        """ Returns winding voltages in p.u. of bus base voltage, given the
+        winding codes of each transformer.
+        """
+        kv = array([case.buses[i].v_base for i in idx.tolist()])
+        kv[kv == 0.0] = 1.0
+
+        # Voltage (kV) or ratio of nominal winding voltage.
+        windv = where(cw == 2, windv / kv, windv)
+        nomv = where(nomv == 0.0, kv, nomv)
+        return where(cw == 3, windv * nomv / kv, windv)
+
+
+    def _bus_index(self, table, column=0):
+        """ Returns an array of the index of the bus in the given column of
+        each record.
+
+        @raise KeyError: If a bus is not in the case.
+        """
+        ids = abs(_column(table, column, dtype=int))
+        k = minimum(self._bus_ids.searchsorted(ids), len(self._bus_ids) - 1)
+        missing = self._bus_ids[k] != ids
+        if missing.any():
+            raise KeyError(ids[missing][0])
+        return self._bus_order[k]
+
+#------------------------------------------------------------------------------
+#  Raw file record tokenising:
+#------------------------------------------------------------------------------
+
+def _tokenise(lines):
+    """ Returns the fields of each record. Fields are separated by commas or,
+    in records without commas, by blanks.
+    """
+    lines = [line if "," in line else ",".join(TOKEN_RE.findall(line))
+             for line in lines]
+    return list(csv.reader(lines, quotechar="'", skipinitialspace=True))
+
+
+def _transpose(rows):
+    """ Returns a table of the fields of the given records, with a tuple for
+    each field. Missing fields are blank.
+    """
+    return list(izip_longest(*rows, fillvalue=""))
+
+
+def _column(table, i, default=0.0, dtype=float):
+    """ Returns an array of the values in the given field of each record.
+    Missing and blank fields take the default value.
+    """
+    if i >= len(table):
+        column = zeros(len(table[0]) if table else 0)
+        column.fill(default)
+    else:
+        try:
+            column = array(table[i], dtype=float)
+        except ValueError:
+            column = array([v if v.strip() else default for v in table[i]],
+                           dtype=float)
+    if dtype is int:
+        return column.astype(int)
+    return column
+
+
+def _text(table, i):
+    """ Returns the stripped text of the given field of each record.
+    """
+    if i >= len(table):
+        return [""] * (len(table[0]) if table else 0)
+    return [v.strip() for v in table[i]]
+
+
+def _lines(records, n):
+    """ Returns a table of the fields of each of the n lines of the given
+    multi-line records.
+    """
+    return [_transpose([record[k] for record in records]) for k in range(n)]
+
+
+def _set_rates(l, rate_a, rate_b, rate_c):
+    """ Sets the non-zero ratings of a branch.
+    """
+    if rate_a > 0.0:
+        l.rate_a = rate_a
+    if rate_b > 0.0:
+        l.rate_b = rate_b
+    if rate_c > 0.0:
+        l.rate_c = rate_c
+
 #------------------------------------------------------------------------------
 #  "PSSEWriter" class:
 #------------------------------------------------------------------------------
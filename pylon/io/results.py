@@ -0,0 +1,197 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines writers of the results of solved cases, as CSV or in a binary
+columnar format, for exporting the results of many scenarios.
+
+Results are written to a directory with a file for each of the bus, branch
+and generator tables. Each row holds the scenario number, the index of the
+component and its result attributes. In append mode, the rows of further
+scenarios are added to existing files.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import logging
+
+from numpy import zeros, arange
+
+from pylon.io.store import ChannelStore, HEADER_FILE
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+BUS_RESULT_ATTRS = ["v_magnitude", "v_angle", "p_lmbda", "q_lmbda",
+    "mu_vmin", "mu_vmax"]
+
+BRANCH_RESULT_ATTRS = ["online", "p_from", "p_to", "q_from", "q_to",
+    "mu_s_from", "mu_s_to", "mu_angmin", "mu_angmax"]
+
+GENERATOR_RESULT_ATTRS = ["online", "p", "q", "mu_pmin", "mu_pmax",
+    "mu_qmin", "mu_qmax"]
+
+#: Name, case attribute and result attributes of each table.
+RESULT_TABLES = [("bus", "buses", BUS_RESULT_ATTRS),
+    ("branch", "branches", BRANCH_RESULT_ATTRS),
+    ("generator", "generators", GENERATOR_RESULT_ATTRS)]
+
+#------------------------------------------------------------------------------
+#  "_ResultWriter" class:
+#------------------------------------------------------------------------------
+
+class _ResultWriter(object):
+    """ Defines a base class for writers of case results.
+    """
+
+    def __init__(self, case):
+        """ Initialises a new _ResultWriter instance.
+        """
+        #: Case of which the results are written.
+        self.case = case
+
+
+    def write(self, path, scenario=0, append=False):
+        """ Writes the results of the case to the given directory.
+
+        @param scenario: Number identifying the results in each row.
+        @param append: Add to the results in existing files?
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        for name, columns, data in self.result_arrays(scenario):
+            self.write_table(path, name, columns, data, append)
+
+
+    def result_arrays(self, scenario=0):
+        """ Yields the name, column names and a 2-D array of the rows of each
+        result table.
+        """
+        for name, components, attrs in RESULT_TABLES:
+            components = getattr(self.case, components)
+            n = len(components)
+
+            data = zeros((n, len(attrs) + 2))
+            data[:, 0] = scenario
+            data[:, 1] = arange(n)
+            for j, attr in enumerate(attrs):
+                data[:, j + 2] = [getattr(c, attr) for c in components]
+
+            yield name, ["scenario", "index"] + attrs, data
+
+
+    def write_table(self, path, name, columns, data, append):
+        """ Writes a result table to file.
+        """
+        raise NotImplementedError
+
+#------------------------------------------------------------------------------
+#  "CSVResultWriter" class:
+#------------------------------------------------------------------------------
+
+class CSVResultWriter(_ResultWriter):
+    """ Writes case results as CSV, a file for each table.
+
+    All rows of a table are formatted with a single format operation, rather
+    than field by field.
+    """
+
+    def __init__(self, case, precision=10):
+        """ Initialises a new CSVResultWriter instance.
+
+        @param precision: Number of significant digits written.
+        """
+        super(CSVResultWriter, self).__init__(case)
+
+        #: Number of significant digits written.
+        self.precision = precision
+
+
+    def write_table(self, path, name, columns, data, append):
+        filename = os.path.join(path, name + ".csv")
+        header = not (append and os.path.isfile(filename))
+
+        fd = open(filename, "ab" if append else "wb")
+        try:
+            if header:
+                fd.write(",".join(columns) + "\n")
+            if len(data):
+                fmt = ",".join(["%%.%dg" % self.precision] *
+                               data.shape[1]) + "\n"
+                fd.write((fmt * data.shape[0]) % tuple(data.ravel()))
+        finally:
+            fd.close()
+
+#------------------------------------------------------------------------------
+#  "BinaryResultWriter" class:
+#------------------------------------------------------------------------------
+
+class BinaryResultWriter(_ResultWriter):
+    """ Writes case results in a binary columnar format: a L{ChannelStore}
+    with a channel for each table and a row of the table for each scenario.
+    Results are read using L{BinaryResultReader}.
+    """
+
+    def write(self, path, scenario=0, append=False):
+        """ Writes the results of the case to the given directory.
+        """
+        tables = list(self.result_arrays(scenario))
+
+        if append and os.path.isfile(os.path.join(path, HEADER_FILE)):
+            store = ChannelStore(path, "r+")
+        else:
+            store = ChannelStore.create(path,
+                dict([(name, (data.dtype, data.shape))
+                      for name, _, data in tables]),
+                meta={"columns": dict([(name, columns)
+                                       for name, columns, _ in tables])})
+
+        store.append(dict([(name, data[None, :, :])
+                           for name, _, data in tables]))
+
+#------------------------------------------------------------------------------
+#  "BinaryResultReader" class:
+#------------------------------------------------------------------------------
+
+class BinaryResultReader(object):
+    """ Reads case results written by L{BinaryResultWriter}.
+    """
+
+    def read(self, path):
+        """ Returns a dict of the results of each table, as a dict of an array
+        of each column.
+        """
+        store = ChannelStore(path)
+
+        results = {}
+        for name, columns in store.meta["columns"].iteritems():
+            data = store.channel(name).reshape(-1, len(columns))
+            results[name] = dict([(c, data[:, j].copy())
+                                  for j, c in enumerate(columns)])
+
+        return results
+
+# EOF -------------------------------------------------------------------------
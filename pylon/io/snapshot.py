@@ -0,0 +1,325 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines the difference between cases of the same structure and archives
+of case snapshots stored as a base case and a delta for each snapshot.
+
+Deltas are computed between the column arrays of the binary case format
+(see L{pylon.io.npz}). For each column that differs, a delta holds the
+indexes of the changed rows and their new values, or the whole column if
+that is smaller. Snapshot archives are ".npz" archives with the columns of
+the first case prefixed "0/" and the delta from each snapshot to the next
+prefixed by the number of the snapshot, e.g. "12/bus.p_demand.index".
+The time of each snapshot is stored with it.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import time
+import logging
+import zipfile
+
+from cStringIO import StringIO
+
+from numpy import asarray, isnan, flatnonzero
+from numpy.lib import format as npy_format
+
+from pylon.io.npz import NPZReader, NPZWriter
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+#: Columns giving the number of each component.
+SIZE_COLUMNS = ["bus.name", "branch.name", "generator.name"]
+
+#: Columns of bus indexes that must be equal for cases to have the same
+#: structure.
+CONNECTION_COLUMNS = ["branch.from_bus", "branch.to_bus", "generator.bus"]
+
+#: Archive member of the time of each snapshot.
+TIME_MEMBER = "snapshot_time"
+
+#------------------------------------------------------------------------------
+#  Case differences:
+#------------------------------------------------------------------------------
+
+def case_delta(old, new):
+    """ Returns the delta from one case to another of the same structure.
+    """
+    return diff_arrays(NPZWriter(old).write_arrays(),
+                       NPZWriter(new).write_arrays())
+
+
+def apply_delta(case, delta):
+    """ Returns a new case, given a case and the delta from it.
+    """
+    reader = NPZReader()
+    return reader._build_case(patch_arrays(NPZWriter(case).write_arrays(),
+                                           delta))
+
+
+def diff_arrays(old, new):
+    """ Returns the delta between two dicts of the column arrays of cases
+    with the same structure.
+
+    @rtype: dict
+    @return: The indexes of the changed rows and their new values of each
+        column that differs, or None and the new column, if smaller.
+    @raise ValueError: If the cases differ in structure.
+    """
+    for name in SIZE_COLUMNS + CONNECTION_COLUMNS:
+        if old[name].shape != new[name].shape or (name in CONNECTION_COLUMNS
+                and (old[name] != new[name]).any()):
+            raise ValueError("Cases differ in structure [%s]." % name)
+
+    delta = {}
+    for name, b in new.iteritems():
+        a = old.get(name)
+        if a is None or a.shape != b.shape:
+            delta[name] = (None, b)
+            continue
+
+        changed = a != b
+        if a.dtype.kind == "f" and b.dtype.kind == "f":
+            changed &= ~(isnan(a) & isnan(b))
+        if not changed.any():
+            continue
+
+        # Scalars and columns of a new type, such as longer strings, are
+        # replaced.
+        if b.ndim == 0 or a.dtype != b.dtype:
+            delta[name] = (None, b)
+            continue
+
+        index = flatnonzero(changed)
+        values = b[index]
+        if index.nbytes + values.nbytes < b.nbytes:
+            delta[name] = (index, values)
+        else:
+            delta[name] = (None, b)
+
+    return delta
+
+
+def patch_arrays(data, delta):
+    """ Returns a dict of the column arrays of a case, given the column arrays
+    of the previous case and the delta from it. Unchanged columns are shared.
+    """
+    data = dict(data)
+    for name, (index, values) in delta.iteritems():
+        if index is None:
+            data[name] = values
+        else:
+            column = data[name].copy()
+            column[index] = values
+            data[name] = column
+
+    return data
+
+#------------------------------------------------------------------------------
+#  "SnapshotWriter" class:
+#------------------------------------------------------------------------------
+
+class SnapshotWriter(object):
+    """ Writes a sequence of case snapshots to an archive, as a base case and
+    the delta from each snapshot to the next.
+
+    Snapshots are appended to the archive as they are added, so the archive
+    of a running sequence may be read at any time.
+    """
+
+    def __init__(self, filename, mode="w", compressed=False):
+        """ Initialises a new SnapshotWriter instance.
+
+        @param mode: "w" to create a new archive or "a" to append to an
+            existing archive.
+        @param compressed: Compress the columns of the archive?
+        """
+        #: Name of the archive file.
+        self.filename = filename
+
+        #: Compression of the archive members.
+        self.compress_type = zipfile.ZIP_DEFLATED if compressed \
+            else zipfile.ZIP_STORED
+
+        #: Column arrays of the last snapshot written.
+        self._last = None
+
+        #: Number of snapshots in the archive.
+        self.snapshots = 0
+
+        if mode == "a":
+            reader = SnapshotReader(filename)
+            self.snapshots = len(reader)
+            if self.snapshots:
+                self._last = reader.read_arrays(self.snapshots - 1)
+        else:
+            zipfile.ZipFile(filename, "w").close()
+
+
+    def write(self, case, timestamp=None):
+        """ Adds a case snapshot to the archive.
+
+        @param timestamp: Time of the snapshot in seconds since the epoch.
+            Defaults to the current time.
+        """
+        t0 = time.time()
+        data = NPZWriter(case).write_arrays()
+
+        if self._last is None:
+            members = data
+        else:
+            members = {}
+            for name, (index, values) in \
+                    diff_arrays(self._last, data).iteritems():
+                if index is None:
+                    members[name] = values
+                else:
+                    members[name + ".index"] = index
+                    members[name + ".value"] = values
+        members[TIME_MEMBER] = t0 if timestamp is None else timestamp
+
+        archive = zipfile.ZipFile(self.filename, "a")
+        try:
+            for name, value in members.iteritems():
+                fd = StringIO()
+                npy_format.write_array(fd, asarray(value))
+                archive.writestr(zipfile.ZipInfo("%d/%s.npy" %
+                    (self.snapshots, name), time.localtime()[:6]),
+                    fd.getvalue(), self.compress_type)
+        finally:
+            archive.close()
+
+        self._last = data
+        self.snapshots += 1
+
+        logger.info("Snapshot %d written (%d columns) in %.3fs." %
+            (self.snapshots - 1, len(members) - 1, time.time() - t0))
+
+#------------------------------------------------------------------------------
+#  "SnapshotReader" class:
+#------------------------------------------------------------------------------
+
+class SnapshotReader(object):
+    """ Reads case snapshots from an archive written by L{SnapshotWriter}.
+
+    Members are read from the archive only as each snapshot is reached.
+    """
+
+    def __init__(self, filename):
+        """ Initialises a new SnapshotReader instance.
+        """
+        #: Name of the archive file.
+        self.filename = filename
+
+        #: Names of the archive members of each snapshot.
+        self._members = {}
+
+        archive = zipfile.ZipFile(filename)
+        try:
+            for name in archive.namelist():
+                k, column = name.split("/", 1)
+                self._members.setdefault(int(k), []).append(column[:-4])
+
+            #: Time of each snapshot in seconds since the epoch.
+            self.times = [float(npy_format.read_array(archive.open(
+                "%d/%s.npy" % (n, TIME_MEMBER)))) for n in range(len(self))]
+        finally:
+            archive.close()
+
+
+    def __len__(self):
+        return len(self._members)
+
+
+    def __iter__(self):
+        return self.iter_cases()
+
+
+    def read(self, k):
+        """ Returns the case of the given snapshot.
+        """
+        return NPZReader()._build_case(self.read_arrays(k))
+
+
+    def read_arrays(self, k):
+        """ Returns a dict of the column arrays of the given snapshot.
+        """
+        if not 0 <= k < len(self):
+            raise IndexError("Snapshot [%d] not in archive." % k)
+
+        snapshots = self.iter_arrays()
+        try:
+            for i, data in enumerate(snapshots):
+                if i == k:
+                    return data
+        finally:
+            snapshots.close()
+
+
+    def iter_cases(self):
+        """ Yields the case of each snapshot in turn.
+        """
+        reader = NPZReader()
+        for data in self.iter_arrays():
+            yield reader._build_case(data)
+
+
+    def iter_arrays(self):
+        """ Yields a dict of the column arrays of each snapshot in turn.
+        """
+        archive = zipfile.ZipFile(self.filename)
+        try:
+            data = None
+            for k in range(len(self)):
+                members = dict([(name, npy_format.read_array(
+                    archive.open("%d/%s.npy" % (k, name))))
+                    for name in self._members[k] if name != TIME_MEMBER])
+
+                if data is None:
+                    data = members
+                else:
+                    data = patch_arrays(data, _delta(members))
+
+                yield data
+        finally:
+            archive.close()
+
+#------------------------------------------------------------------------------
+#  Archive members:
+#------------------------------------------------------------------------------
+
+def _delta(members):
+    """ Returns a delta given the archive members of a snapshot.
+    """
+    delta = {}
+    for name, value in members.iteritems():
+        if name.endswith(".index"):
+            delta[name[:-6]] = (value, members[name[:-6] + ".value"])
+        elif not name.endswith(".value"):
+            delta[name] = (None, value)
+    return delta
+
+# EOF -------------------------------------------------------------------------
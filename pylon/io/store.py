@@ -0,0 +1,246 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a columnar store of arrays in raw files, such as the time series
+of a scenario, the trajectories of a dynamic simulation or the results of
+many cases.
+
+A store is a directory with a raw file, "<channel>.dat", for each channel and
+a pickled header, "header.pkl", of the number of rows and of the dtype and
+row shape of each channel.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import logging
+import cPickle as pickle
+
+from numpy import array, asarray, empty, memmap, zeros, dtype as numpy_dtype
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+HEADER_FILE = "header.pkl"
+
+#------------------------------------------------------------------------------
+#  "ChannelStore" class:
+#------------------------------------------------------------------------------
+
+class ChannelStore(object):
+    """ Stores arrays in memory-mapped raw files, one per channel, with a row
+    for each period or sample.
+
+    Rows may be read and written a chunk at a time without holding all rows
+    in memory. The header is rewritten whenever rows are appended, so a store
+    may be read while it is still being written.
+    """
+
+    def __init__(self, path, mode="r"):
+        """ Opens an existing store.
+
+        @param mode: "r" to read or "r+" to read and write.
+        """
+        #: Directory containing the channel files.
+        self.path = path
+
+        #: Memory-map mode of the channels.
+        self.mode = mode
+
+        fd = open(os.path.join(path, HEADER_FILE), "rb")
+        try:
+            header = pickle.load(fd)
+        finally:
+            fd.close()
+
+        #: Number of rows.
+        self.count = header["count"]
+
+        #: Dtype and row shape of each channel.
+        self._header = header["channels"]
+
+        #: Description of the stored data, such as column names.
+        self.meta = header.get("meta", {})
+
+
+    @classmethod
+    def create(cls, path, channels, count=0, meta=None):
+        """ Returns a new store of zeros with the given number of rows,
+        replacing any channels in the directory.
+
+        @param channels: Dict of the dtype and row shape of each channel.
+        @param meta: Description of the stored data.
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        header = {}
+        for name, (dtype, shape) in channels.iteritems():
+            header[name] = (numpy_dtype(dtype).str, tuple(shape))
+
+        store = cls.__new__(cls)
+        store.path = path
+        store.mode = "r+"
+        store.count = count
+        store._header = header
+        store.meta = meta or {}
+
+        for name in header:
+            fd = open(store._filename(name), "wb")
+            try:
+                fd.truncate(count * store._rowsize(name))
+            finally:
+                fd.close()
+
+        store.flush()
+
+        return store
+
+
+    @property
+    def channels(self):
+        """ Names of the stored channels.
+        """
+        return sorted(self._header.keys())
+
+
+    def channel(self, name):
+        """ Returns a memory-map of all rows of the named channel.
+        """
+        dtype, shape = self._header[name]
+        if self.count == 0:
+            return zeros((0,) + tuple(shape), dtype)
+        return memmap(self._filename(name), dtype=dtype, mode=self.mode,
+                      shape=(self.count,) + tuple(shape))
+
+
+    def chunks(self, size, names=None):
+        """ Yields the first row of each chunk of rows and a dict of the
+        values of each channel in the chunk.
+        """
+        maps = dict([(name, self.channel(name))
+                     for name in (names or self.channels)])
+
+        for start in range(0, self.count, size):
+            yield start, dict([(name, array(m[start:start + size]))
+                               for name, m in maps.iteritems()])
+
+
+    def write(self, start, values):
+        """ Writes rows to each channel from the given row, given a dict of
+        the values.
+        """
+        for name, value in values.iteritems():
+            m = self.channel(name)
+            m[start:start + len(value)] = value
+            m.flush()
+
+
+    def append(self, values):
+        """ Appends rows to every channel, given a dict of the values.
+
+        @raise ValueError: If the channels are given a different number of
+            rows or rows of the wrong shape.
+        """
+        if set(values.keys()) != set(self._header.keys()):
+            raise ValueError("Rows must be appended to every channel.")
+
+        n = None
+        for name, value in values.iteritems():
+            dtype, shape = self._header[name]
+            value = asarray(value, dtype=dtype)
+            if value.shape[1:] != shape:
+                raise ValueError("Row shape %s of channel [%s] is not %s." %
+                                 (value.shape[1:], name, shape))
+            if n is None:
+                n = len(value)
+            elif len(value) != n:
+                raise ValueError("Channels appended unequal numbers of rows.")
+
+            fd = open(self._filename(name), "ab")
+            try:
+                value.tofile(fd)
+            finally:
+                fd.close()
+
+        self.count += n or 0
+        self.flush()
+
+
+    def resize(self, name, shape, fill=0, size=1024):
+        """ Changes the row shape of the named channel, keeping the values
+        that fit in the new shape and filling the rest. Rows are copied a
+        chunk at a time.
+        """
+        dtype, old = self._header[name]
+        shape = tuple(shape)
+        if len(shape) != len(old):
+            raise ValueError("Rows of channel [%s] must have %d dimensions." %
+                             (name, len(old)))
+
+        index = (slice(None),) + tuple([slice(0, min(m, n))
+                                        for m, n in zip(old, shape)])
+
+        filename = self._filename(name)
+        fd = open(filename + ".tmp", "wb")
+        try:
+            for _, values in self.chunks(size, [name]):
+                rows = empty((len(values[name]),) + shape, dtype)
+                rows.fill(fill)
+                rows[index] = values[name][index]
+                rows.tofile(fd)
+        finally:
+            fd.close()
+        os.rename(filename + ".tmp", filename)
+
+        self._header[name] = (dtype, shape)
+        self.flush()
+
+
+    def flush(self):
+        """ Writes the header to file.
+        """
+        fd = open(os.path.join(self.path, HEADER_FILE), "wb")
+        try:
+            pickle.dump({"count": self.count, "channels": self._header,
+                         "meta": self.meta}, fd)
+        finally:
+            fd.close()
+
+
+    def _rowsize(self, name):
+        """ Returns the number of bytes in a row of the named channel.
+        """
+        dtype, shape = self._header[name]
+        size = numpy_dtype(dtype).itemsize
+        for n in shape:
+            size *= n
+        return size
+
+
+    def _filename(self, name):
+        return os.path.join(self.path, name + ".dat")
+
+# EOF -------------------------------------------------------------------------
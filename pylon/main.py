@@ -26,12 +26,6 @@ import sys
 import logging
 import optparse
 
-from pylon.io import \
-    MATPOWERReader, PSSEReader, MATPOWERWriter, ReSTWriter, \
-    PickleReader, PickleWriter
-
-from pylon import DCPF, NewtonPF, FastDecoupledPF, OPF, UDOPF
-
 #------------------------------------------------------------------------------
 #  Logging:
 #------------------------------------------------------------------------------
@@ -49,9 +43,11 @@ def read_case(input, format=None):
     """ Returns a case object from the given input file object. The data
     format may be optionally specified.
     """
+    from pylon.io import MATPOWERReader, PSSEReader, PickleReader, NPZReader
+
     # Map of data file types to readers.
     format_map = {"matpower": MATPOWERReader,
-        "psse": PSSEReader, "pickle": PickleReader}
+        "psse": PSSEReader, "pickle": PickleReader, "npz": NPZReader}
 
     # Read case data.
     if format_map.has_key(format):
@@ -103,6 +99,10 @@ def detect_data_file(input, file_name=""):
         type = "pickle"
         logger.info("Recognised pickled case.")
 
+    elif ext == ".npz":
+        type = "npz"
+        logger.info("Recognised binary case.")
+
     else:
         type = None
 
@@ -139,7 +139,8 @@ def main():
     parser.add_option("-t", "--input-type", dest="type", metavar="TYPE",
         default="any", help="The argument following the -t is used to "
         "indicate the format type of the input data file. The types which are "
-        "currently supported include: matpower, psse [default: %default]"
+        "currently supported include: matpower, psse, pickle, npz "
+        "[default: %default]"
         " If not specified Pylon will try to determine the type according to "
         "the file name extension and the file header.")
 
@@ -158,7 +159,7 @@ def main():
     parser.add_option("-T", "--output-type", dest="output_type",
         metavar="OUTPUT_TYPE", default="rst", help="Indicates the output "
         "format type.  The type swhich are currently supported include: rst, "
-        "matpower, csv, excel and none [default: %default].")
+        "matpower, csv, excel, pickle, npz and none [default: %default].")
 
     (options, args) = parser.parse_args()
 
@@ -209,6 +210,10 @@ def main():
     case = read_case(infile, type)
 
     if case is not None:
+        # Routines and writers are imported once the options are known, such
+        # that only those used are loaded.
+        from pylon import DCPF, NewtonPF, FastDecoupledPF, OPF, UDOPF
+
         # Routine (and algorithm) selection.
         if options.solver == "dcpf":
             solver = DCPF(case)
@@ -235,8 +240,10 @@ def main():
 
         # Output writer selection.
         if options.output_type == "matpower":
+            from pylon.io import MATPOWERWriter
             writer = MATPOWERWriter(case)
         elif options.output_type == "rst":
+            from pylon.io import ReSTWriter
             writer = ReSTWriter(case)
         elif options.output_type == "csv":
             from pylon.io.excel import CSVWriter
@@ -245,7 +252,11 @@ def main():
             from pylon.io.excel import ExcelWriter
             writer = ExcelWriter(case)
         elif options.output_type == "pickle":
+            from pylon.io import PickleWriter
             writer = PickleWriter(case)
+        elif options.output_type == "npz":
+            from pylon.io import NPZWriter
+            writer = NPZWriter(case)
         else:
             logger.critical("Invalid output type [%s]." % options.output_type)
             sys.exit(1)
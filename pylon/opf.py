@@ -29,16 +29,17 @@ import logging
 import random
 
 from time import time
+from collections import OrderedDict
 
 from numpy import \
-    array, pi, diff, Inf, ones, r_, float64, zeros, arctan2, sin, cos
+    array, pi, diff, Inf, ones, r_, zeros, arctan2, sin, cos
 
-from scipy.sparse import lil_matrix, csr_matrix, hstack
+from scipy.sparse import lil_matrix, csr_matrix, coo_matrix, hstack, vstack
 
 from util import _Named, fair_max
 from case import REFERENCE
 from generator import PW_LINEAR
-from solver import DCOPFSolver, PIPSSolver
+from solver import DCOPFSolver, BatchDCOPFSolver, PIPSSolver
 
 #------------------------------------------------------------------------------
 #  Logging:
@@ -699,6 +700,224 @@ class UDOPF(OPF):
 
         return solution
 
+#------------------------------------------------------------------------------
+#  "PersistentDCOPF" class:
+#------------------------------------------------------------------------------
+
+class PersistentDCOPF(OPF):
+    """ Defines a DC optimal power flow that is solved repeatedly for the same
+    case, as when clearing a market over many periods.
+
+    The susceptance matrices and the network constraints are built once for
+    each topology (connected buses, online branches and generators) and are
+    kept for the most recent topologies, so that they are reused whenever a
+    topology recurs. Each solve then only updates the demand, the generator
+    limits and the cost constraints. A solve may be warm started from the
+    previous solution for the same topology, but this is off by default: the
+    interior point method is only given the previous primal point, not its
+    multipliers, and takes no fewer iterations from it.
+    """
+
+    def __init__(self, case, ignore_ang_lim=True, opt=None, warm=False,
+                 topologies=16):
+        """ Initialises a new PersistentDCOPF instance.
+        """
+        super(PersistentDCOPF, self).__init__(case, True, ignore_ang_lim, opt)
+
+        #: Warm start each solve from the previous solution?
+        self.warm = warm
+
+        #: Maximum number of topologies for which the network constraints are
+        #: kept. Topologies recur often when outages are rare.
+        self.topologies = topologies
+
+        #: Topology of the current model.
+        self._topology = None
+
+        #: Phase shift injections, network constraints and previous solution
+        #: for each recent topology, least recently used first.
+        self._networks = OrderedDict()
+
+
+    def _get_x(self):
+        """ Returns the previous solution for the current topology.
+        """
+        if self._topology not in self._networks:
+            return None
+        return self._networks[self._topology][1]
+
+
+    def _set_x(self, x):
+        """ Sets the previous solution for the current topology.
+        """
+        if self._topology in self._networks:
+            self._networks[self._topology][1] = x
+
+    _x = property(_get_x, _set_x)
+
+
+    def solve(self, solver_klass=None):
+        """ Solves the DC optimal power flow and returns a results dictionary.
+        """
+        if solver_klass is not None:
+            return super(PersistentDCOPF, self).solve(solver_klass)
+
+        t0 = time()
+
+        om = self._construct_opf_model(self.case)
+
+        x0 = self._x if self.warm else None
+        result = DCOPFSolver(om, opt=self.opt, x0=x0).solve()
+
+        if result["converged"]:
+            self._x = result["x"]
+
+        result["elapsed"] = time() - t0
+
+        if self.opt.get("verbose", False):
+            logger.info("OPF completed in %.3fs." % result["elapsed"])
+
+        return result
+
+
+    def _construct_opf_model(self, case):
+        """ Returns an OPF model, reusing the network constraints if the
+        topology is unchanged.
+        """
+        # Zero the case result attributes.
+        self.case.reset()
+
+        base_mva = case.base_mva
+
+        # Check for one reference bus.
+        _, refs = self._ref_check(case)
+
+        # Remove isolated components.
+        bs, ln, gn = self._remove_isolated(case)
+
+        # Update bus indexes.
+        self.case.index_buses(bs)
+
+        # Convert single-block piecewise-linear costs into linear polynomial.
+        gn = self._pwl1_to_poly(gn)
+
+        # Set-up initial problem variables.
+        Va = self._get_voltage_angle_var(refs, bs)
+        Pg = self._get_pgen_var(gn, base_mva)
+
+        topology = (tuple(bs), tuple(ln), tuple(gn), tuple(refs))
+
+        # Mark the topology as most recently used.
+        network = self._networks.pop(topology, None)
+
+        if network is None:
+            B, Bf, Pbusinj, Pfinj = self.case.makeBdc(bs, ln)
+
+            Pmis = self._power_mismatch_dc(bs, gn, B, Pbusinj, base_mva)
+            Pf, Pt = self._branch_flow_dc(ln, Bf, Pfinj, base_mva)
+            ang = self._voltage_angle_diff_limit(bs, ln)
+
+            network = [(Bf, Pbusinj, Pfinj, Pmis, Pf, Pt, ang), None]
+
+            while len(self._networks) >= max(self.topologies, 1):
+                self._networks.popitem(last=False)
+        else:
+            Bf, Pbusinj, Pfinj, Pmis, Pf, Pt, ang = network[0]
+
+            # Only the demand changes the power mismatch constraint.
+            Pd = array([bus.p_demand for bus in bs])
+            Gs = array([bus.g_shunt for bus in bs])
+            Pmis.l = Pmis.u = -(Pd - Gs) / base_mva - Pbusinj
+
+        self._networks[topology] = network
+        self._topology = topology
+
+        vars = [Va, Pg]
+        constraints = [Pmis, Pf, Pt, ang]
+
+        # Piece-wise linear generator cost constraints.
+        y, ycon = self._pwl_gen_costs(gn, base_mva)
+
+        if ycon is not None:
+            vars.append(y)
+            constraints.append(ycon)
+
+        # Add variables and constraints to the OPF model object.
+        opf = OPFModel(case)
+        opf.add_vars(vars)
+        opf.add_constraints(constraints)
+
+        opf._Bf = Bf
+        opf._Pfinj = Pfinj
+
+        return opf
+
+#------------------------------------------------------------------------------
+#  "BatchDCOPF" class:
+#------------------------------------------------------------------------------
+
+class BatchDCOPF(object):
+    """ Defines DC optimal power flows for a number of independent cases, as
+    when clearing many copies of a market at once, that are solved together
+    as a single block-diagonal quadratic program.
+
+    Each case keeps a PersistentDCOPF, so the network constraints are reused
+    while its topology persists. Each problem may be warm started from its
+    previous solution (See PersistentDCOPF).
+    """
+
+    def __init__(self, cases, ignore_ang_lim=True, opt=None, warm=False):
+        """ Initialises a new BatchDCOPF instance.
+        """
+        #: Solver options (See pips.py for futher details).
+        self.opt = {} if opt is None else opt
+
+        #: Persistent DC OPF of each case.
+        self.opfs = [PersistentDCOPF(case, ignore_ang_lim, self.opt, warm)
+                     for case in cases]
+
+
+    @property
+    def cases(self):
+        """ The cases that are solved.
+        """
+        return [opf.case for opf in self.opfs]
+
+
+    def solve(self, cases=None):
+        """ Solves the DC optimal power flow of the given cases, or of all
+        cases if None, and returns a list of results dictionaries.
+        """
+        t0 = time()
+
+        if cases is None:
+            opfs = self.opfs
+        else:
+            ids = set([id(case) for case in cases])
+            opfs = [opf for opf in self.opfs if id(opf.case) in ids]
+        if not opfs:
+            return []
+
+        solvers = []
+        for opf in opfs:
+            om = opf._construct_opf_model(opf.case)
+            x0 = opf._x if opf.warm else None
+            solvers.append(DCOPFSolver(om, opt=self.opt, x0=x0))
+
+        results = BatchDCOPFSolver(solvers, opt=self.opt).solve()
+
+        elapsed = time() - t0
+        for opf, result in zip(opfs, results):
+            if result["converged"]:
+                opf._x = result["x"]
+            result["elapsed"] = elapsed
+
+        if self.opt.get("verbose", False):
+            logger.info("Batch of %d OPFs completed in %.3fs." %
+                        (len(results), elapsed))
+
+        return results
+
 #------------------------------------------------------------------------------
 #  "OPFModel" class:
 #------------------------------------------------------------------------------
@@ -785,37 +1004,43 @@ class OPFModel(object):
         if self.lin_N == 0:
             return None, array([]), array([])
 
-        A = lil_matrix((self.lin_N, self.var_N), dtype=float64)
         l = -Inf * ones(self.lin_N)
         u = -l
 
+        blocks = []
         for lin in self.lin_constraints:
             if lin.N:                   # non-zero number of rows to add
-                Ak = lin.A              # A for kth linear constrain set
-                i1 = lin.i1             # starting row index
-                iN = lin.iN             # ending row index
-                vsl = lin.vs            # var set list
-                kN = -1                 # initialize last col of Ak used
-                Ai = lil_matrix((lin.N, self.var_N), dtype=float64)
-                for v in vsl:
-                    var = self.get_var(v)
-                    j1 = var.i1         # starting column in A
-                    jN = var.iN         # ending column in A
-                    k1 = kN + 1         # starting column in Ak
-                    kN = kN + var.N     # ending column in Ak
-
-                    if j1 == jN:
-                        # FIXME: Single column slicing broken in lil.
-                        for i in range(Ai.shape[0]):
-                            Ai[i, j1] = Ak[i, k1]
-                    else:
-                        Ai[:, j1:jN + 1] = Ak[:, k1:kN + 1]
-
-                A[i1:iN + 1, :] = Ai
-                l[i1:iN + 1] = lin.l
-                u[i1:iN + 1] = lin.u
-
-        return A.tocsr(), l, u
+                blocks.append(self._expand(lin))
+                l[lin.i1:lin.iN + 1] = lin.l
+                u[lin.i1:lin.iN + 1] = lin.u
+
+        A = vstack(blocks, "csr")
+
+        return A, l, u
+
+
+    def _expand(self, lin):
+        """ Returns the coefficient matrix of the given linear constraint set
+        with columns for all variables of the model. The result is cached on
+        the constraint set, so constraints that are reused between models
+        with the same variable layout are only expanded once.
+        """
+        layout = [(v, self.get_var(v).i1, self.get_var(v).N) for v in lin.vs]
+        key = (tuple(layout), self.var_N)
+
+        if getattr(lin, "_expanded", (None, None))[0] == key:
+            return lin._expanded[1]
+
+        # Map the columns of the constraint matrix to model variables.
+        columns = r_[tuple([range(j1, j1 + N) for _, j1, N in layout])]
+
+        Ak = coo_matrix(lin.A)
+        Ai = coo_matrix((Ak.data, (Ak.row, columns[Ak.col])),
+                        (lin.N, self.var_N)).tocsr()
+
+        lin._expanded = (key, Ai)
+
+        return Ai
 
 
     def add_constraint(self, con):
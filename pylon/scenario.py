@@ -0,0 +1,234 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a columnar store of time series, such as the demand at each bus
+and the availability of each generator, and a runner that solves a case for
+each period of a scenario.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import time
+import logging
+
+from numpy import array, asarray, zeros, ones
+
+from pylon.io.store import ChannelStore
+from pylon.dc_pf import DCPF
+from pylon.ac_pf import NewtonPF, FastDecoupledPF
+from pylon.opf import OPF, PersistentDCOPF
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+#: Routines with which a scenario may be run.
+ROUTINES = ["dcpf", "acpf", "fdpf", "dcopf", "acopf"]
+
+#: Attributes of each component recorded for every period of a run.
+BUS_RESULTS = ["v_magnitude", "v_angle", "p_lmbda", "q_lmbda"]
+GENERATOR_RESULTS = ["p", "q"]
+BRANCH_RESULTS = ["p_from", "p_to", "q_from", "q_to"]
+
+#------------------------------------------------------------------------------
+#  "ScenarioStore" class:
+#------------------------------------------------------------------------------
+
+class ScenarioStore(ChannelStore):
+    """ Stores time series in memory-mapped arrays, one per channel, with a
+    row for each period.
+
+    The channels of a scenario are the active and reactive demand at each
+    bus, "p_demand" and "q_demand" (MW and MVAr), and the fraction of the
+    capacity of each generator that is available, "availability", where zero
+    denotes an outage.
+    """
+
+    @classmethod
+    def create(cls, path, periods, channels):
+        """ Returns a new store of zeros for the given number of periods.
+
+        @param channels: Dict of the row width of each channel.
+        """
+        return super(ScenarioStore, cls).create(path,
+            dict([(name, (float, (width,)))
+                  for name, width in channels.iteritems()]), periods)
+
+
+    @classmethod
+    def fromProfile(cls, path, case, profile):
+        """ Returns a new scenario in which the demand at each bus is the
+        demand of the case scaled by each value of the given load profile, and
+        all generators are available.
+        """
+        store = cls.create(path, len(profile), {"p_demand": len(case.buses),
+            "q_demand": len(case.buses),
+            "availability": len(case.generators)})
+
+        Pd = array([b.p_demand for b in case.buses])
+        Qd = array([b.q_demand for b in case.buses])
+        profile = asarray(profile, dtype=float)[:, None]
+
+        store.write(0, {"p_demand": profile * Pd, "q_demand": profile * Qd,
+            "availability": ones((len(profile), len(case.generators)))})
+
+        return store
+
+
+    @property
+    def periods(self):
+        """ Number of periods.
+        """
+        return self.count
+
+#------------------------------------------------------------------------------
+#  "ScenarioRunner" class:
+#------------------------------------------------------------------------------
+
+class ScenarioRunner(object):
+    """ Solves a case for each period of a scenario.
+
+    The scenario is read, and the results are written, a chunk of periods at
+    a time, so memory use does not depend on the length of the horizon. Power
+    flows and AC OPFs of each period start from the bus voltages and generator
+    set-points left in the case by the previous period. DC OPFs reuse the
+    network constraints of a persistent model.
+    """
+
+    def __init__(self, case, scenario, routine="dcpf", chunk=96, opt=None):
+        """ Initialises a new ScenarioRunner instance.
+
+        @param scenario: Store of the demand at each bus and the availability
+            of each generator in each period.
+        @param routine: One of "dcpf", "acpf", "fdpf", "dcopf" or "acopf".
+        @param opt: Solver options passed to OPF routines.
+        """
+        assert routine in ROUTINES
+
+        #: Case solved for each period.
+        self.case = case
+
+        #: Demand and availability in each period.
+        self.scenario = scenario
+
+        #: Routine with which each period is solved.
+        self.routine = routine
+
+        #: Number of periods read and written at once.
+        self.chunk = chunk
+
+        #: Solver options of OPF routines.
+        self.opt = opt
+
+        #: Persistent DC OPF model.
+        self._opf = None
+
+
+    def run(self, path):
+        """ Solves each period of the scenario and returns a store of the
+        results in the given directory.
+        """
+        t0 = time.time()
+        case = self.case
+        buses, generators, branches = \
+            case.buses, case.generators, case.branches
+
+        channels = {"converged": 1, "f": 1}
+        channels.update([(a, len(buses)) for a in BUS_RESULTS])
+        channels.update([(a, len(generators)) for a in GENERATOR_RESULTS])
+        channels.update([(a, len(branches)) for a in BRANCH_RESULTS])
+        results = ScenarioStore.create(path, self.scenario.periods, channels)
+
+        # Availability scales the capacity of the case and takes generators
+        # out of service. The demand and generators of the case are restored
+        # once the scenario is run.
+        demand = [(b.p_demand, b.q_demand) for b in buses]
+        status = [(g.online, g.p_max) for g in generators]
+
+        nconverged = 0
+        try:
+            for start, values in self.scenario.chunks(self.chunk):
+                n = len(values.values()[0])
+                out = dict([(name, zeros((n, width[0]))) for name, (_, width)
+                            in results._header.iteritems()])
+
+                for k in range(n):
+                    if "p_demand" in values:
+                        for bus, pd in zip(buses, values["p_demand"][k]):
+                            bus.p_demand = pd
+                    if "q_demand" in values:
+                        for bus, qd in zip(buses, values["q_demand"][k]):
+                            bus.q_demand = qd
+                    if "availability" in values:
+                        for g, a, (online, pmax) in zip(generators,
+                                values["availability"][k], status):
+                            g.online = online and a > 0.0
+                            g.p_max = a * pmax
+
+                    converged, f = self._solve()
+                    nconverged += converged
+
+                    out["converged"][k] = converged
+                    out["f"][k] = f
+                    for attrs, components in [(BUS_RESULTS, buses),
+                            (GENERATOR_RESULTS, generators),
+                            (BRANCH_RESULTS, branches)]:
+                        for a in attrs:
+                            out[a][k] = [getattr(c, a) for c in components]
+
+                results.write(start, out)
+        finally:
+            for bus, (pd, qd) in zip(buses, demand):
+                bus.p_demand, bus.q_demand = pd, qd
+            for g, (online, pmax) in zip(generators, status):
+                g.online, g.p_max = online, pmax
+
+        logger.info("%d of %d periods converged in %.3fs." % (nconverged,
+            self.scenario.periods, time.time() - t0))
+
+        return results
+
+
+    def _solve(self):
+        """ Solves the case using the routine and returns True if it
+        converged, and the objective function value of OPF routines.
+        """
+        case = self.case
+
+        if self.routine == "dcpf":
+            return bool(DCPF(case).solve()), 0.0
+        elif self.routine == "acpf":
+            result = NewtonPF(case).solve()
+        elif self.routine == "fdpf":
+            result = FastDecoupledPF(case).solve()
+        elif self.routine == "dcopf":
+            if self._opf is None:
+                self._opf = PersistentDCOPF(case, opt=self.opt)
+            result = self._opf.solve()
+        else:
+            result = OPF(case, False, opt=self.opt).solve()
+
+        return bool(result["converged"]), result.get("f", 0.0)
+
+# EOF -------------------------------------------------------------------------
@@ -29,15 +29,15 @@ information.
 import logging
 
 from numpy import \
-    array, pi, polyder, polyval, exp, conj, Inf, ones, r_, zeros, asarray
+    array, pi, polyder, polyval, exp, conj, Inf, ones, r_, zeros, asarray, \
+    minimum, maximum, dot
 
-from scipy.sparse import lil_matrix, csr_matrix, hstack, vstack
+from scipy.sparse import lil_matrix, csr_matrix, hstack, vstack, block_diag
 
 from case import REFERENCE
 from generator import POLYNOMIAL, PW_LINEAR
 
 #from pdipm import pdipm, pdipm_qp
-from pips import pips, qps_pips
 
 #------------------------------------------------------------------------------
 #  Constants:
@@ -200,11 +200,16 @@ class DCOPFSolver(_Solver):
     Cornell. See U{http://www.pserc.cornell.edu/matpower/} for more info.
     """
 
-    def __init__(self, om, opt=None):
+    def __init__(self, om, opt=None, x0=None):
         """ Initialises a new DCOPFSolver instance.
         """
         super(DCOPFSolver, self).__init__(om)
 
+        #: Initial point (e.g. the solution of a previous period) from which
+        #: to warm start the solver. An interior point is selected if None or
+        #: if the number of variables differs.
+        self.x0 = x0
+
         # TODO: Implement user-defined costs.
         self.N = None
         self.H = None
@@ -218,6 +223,21 @@ class DCOPFSolver(_Solver):
     def solve(self):
         """ Solves DC optimal power flow and returns a results dict.
         """
+        qp = self._qp()
+
+        # Call the quadratic/linear solver.
+        s = self._run_opf(qp["HH"], qp["CC"], qp["AA"], qp["ll"], qp["uu"],
+                          qp["xmin"], qp["xmax"], qp["x0"], self.opt)
+
+        self._set_solution(s, qp)
+
+        return s
+
+
+    def _qp(self):
+        """ Returns a dict of the quadratic program data and of the model
+            components needed to update the case with its solution.
+        """
         base_mva = self.om.case.base_mva
         Bf = self.om._Bf
         Pfinj = self.om._Pfinj
@@ -243,18 +263,25 @@ class DCOPFSolver(_Solver):
         _, xmin, xmax = self._var_bounds()
 
         # Select an interior initial point for interior point solver.
-        x0 = self._initial_interior_point(bs, gn, xmin, xmax, ny)
+        if self.x0 is not None and len(self.x0) == len(xmin):
+            x0 = minimum(maximum(self.x0, xmin), xmax)
+        else:
+            x0 = self._initial_interior_point(bs, gn, xmin, xmax, ny)
 
-        # Call the quadratic/linear solver.
-        s = self._run_opf(HH, CC, AA, ll, uu, xmin, xmax, x0, self.opt)
+        return {"HH": HH, "CC": CC, "C0": C0, "AA": AA, "ll": ll, "uu": uu,
+                "xmin": xmin, "xmax": xmax, "x0": x0, "bs": bs, "ln": ln,
+                "gn": gn, "base_mva": base_mva, "Bf": Bf, "Pfinj": Pfinj}
 
+
+    def _set_solution(self, s, qp):
+        """ Completes the solution dict and sets the case result attributes.
+        """
         # Compute the objective function value.
-        Va, Pg = self._update_solution_data(s, HH, CC, C0)
+        Va, Pg = self._update_solution_data(s, qp["HH"], qp["CC"], qp["C0"])
 
         # Set case result attributes.
-        self._update_case(bs, ln, gn, base_mva, Bf, Pfinj, Va, Pg, s["lmbda"])
-
-        return s
+        self._update_case(qp["bs"], qp["ln"], qp["gn"], qp["base_mva"],
+                          qp["Bf"], qp["Pfinj"], Va, Pg, s["lmbda"])
 
 
     def _pwl_costs(self, ny, nxyz, ipwl):
@@ -357,6 +384,9 @@ class DCOPFSolver(_Solver):
     def _run_opf(self, HH, CC, AA, ll, uu, xmin, xmax, x0, opt):
         """ Solves the either quadratic or linear program.
         """
+        # PIPS loads the sparse solvers, so is imported on first use.
+        from pips import qps_pips
+
         N = self._nieq
 
         if HH.nnz > 0:
@@ -418,6 +448,73 @@ class DCOPFSolver(_Solver):
             generator.mu_pmin = lower[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
             generator.mu_pmax = upper[Pg_v.i1:Pg_v.iN + 1][k] / base_mva
 
+#------------------------------------------------------------------------------
+#  "BatchDCOPFSolver" class:
+#------------------------------------------------------------------------------
+
+class BatchDCOPFSolver(object):
+    """ Solves a batch of independent DC optimal power flow problems as a
+    single block-diagonal quadratic program.
+
+    If the combined problem does not converge, each problem is solved
+    separately, so that one infeasible problem does not fail the batch.
+    """
+
+    def __init__(self, solvers, opt=None):
+        """ Initialises a new BatchDCOPFSolver instance.
+
+        @param solvers: List of DCOPFSolver instances.
+        """
+        #: DC OPF solvers of each problem.
+        self.solvers = solvers
+
+        #: Solver options for the combined problem (See pips.py).
+        self.opt = {} if opt is None else opt
+
+
+    def solve(self):
+        """ Solves all of the problems and returns a list of results dicts.
+        """
+        from pips import qps_pips
+
+        qps = [solver._qp() for solver in self.solvers]
+
+        HH = block_diag([qp["HH"] for qp in qps], "csr")
+        AA = block_diag([qp["AA"] for qp in qps], "csr")
+        CC, ll, uu, xmin, xmax, x0 = [r_[tuple([qp[k] for qp in qps])]
+            for k in ["CC", "ll", "uu", "xmin", "xmax", "x0"]]
+
+        s = qps_pips(HH if HH.nnz > 0 else None, CC, AA, ll, uu, xmin, xmax,
+                     x0, self.opt)
+
+        if not s["converged"]:
+            logger.warning("Non-convergent batch DC OPF, solving each of the "
+                           "%d problems separately." % len(qps))
+            return [solver.solve() for solver in self.solvers]
+
+        results = []
+        ix = iA = 0
+        for solver, qp in zip(self.solvers, qps):
+            nx, nA = len(qp["xmin"]), len(qp["ll"])
+            x = s["x"][ix:ix + nx]
+
+            lmbda = {"mu_l": s["lmbda"]["mu_l"][iA:iA + nA],
+                     "mu_u": s["lmbda"]["mu_u"][iA:iA + nA],
+                     "lower": s["lmbda"]["lower"][ix:ix + nx],
+                     "upper": s["lmbda"]["upper"][ix:ix + nx]}
+
+            f = 0.5 * dot(x, qp["HH"] * x) + dot(qp["CC"], x)
+
+            result = {"x": x, "f": f, "converged": s["converged"],
+                      "lmbda": lmbda, "output": s["output"]}
+            solver._set_solution(result, qp)
+            results.append(result)
+
+            ix += nx
+            iA += nA
+
+        return results
+
 #------------------------------------------------------------------------------
 #  "PIPSSolver" class:
 #------------------------------------------------------------------------------
@@ -507,6 +604,8 @@ class PIPSSolver(_Solver):
     def _solve(self, x0, A, l, u, xmin, xmax):
         """ Solves using Python Interior Point Solver (PIPS).
         """
+        from pips import pips
+
         s = pips(self._costfcn, x0, A, l, u, xmin, xmax,
                  self._consfcn, self._hessfcn, self.opt)
         return s
@@ -0,0 +1,159 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for processing many case data files.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from os.path import join, dirname
+
+from pylon import Case, Bus, REFERENCE
+from pylon.batch import \
+    find_data_files, common_dir, validate_case, convert_case, process_file, \
+    run_batch
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "BatchTest" class:
+#------------------------------------------------------------------------------
+
+class BatchTest(unittest.TestCase):
+    """ Defines a test case for processing many case data files.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.dir = tempfile.mkdtemp()
+        self.input = join(self.dir, "cases")
+
+        self.files = []
+        for name, path in [("case6ww.m", "case6ww.m"),
+                ("case6ww-3.2.m", join("area", "case6ww-3.2.m")),
+                (join("case6ww", "case6ww.pkl"), join("area", "zone",
+                                                      "case6ww.pkl"))]:
+            path = join(self.input, path)
+            if not os.path.isdir(dirname(path)):
+                os.makedirs(dirname(path))
+            shutil.copy(join(DATA_DIR, name), path)
+            self.files.append(path)
+
+        # Files of other types are not data files.
+        open(join(self.input, "area", "notes.txt"), "wb").close()
+
+        self.case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+
+
+    def tearDown(self):
+        """ The test runner will execute this method after each test.
+        """
+        shutil.rmtree(self.dir)
+
+
+    def testFindDataFiles(self):
+        """ Test finding the data files in directories.
+        """
+        self.assertEqual(find_data_files([self.input]), sorted(self.files))
+        self.assertEqual(find_data_files([self.input], recursive=False),
+                         [self.files[0]])
+
+        # Files given are always included.
+        notes = join(self.input, "area", "notes.txt")
+        self.assertEqual(find_data_files([notes, self.files[0]]),
+                         sorted([notes, self.files[0]]))
+
+        self.assertEqual(common_dir(self.files), self.input)
+
+
+    def testValidateCase(self):
+        """ Test the problems found with a case.
+        """
+        self.assertEqual(validate_case(self.case), [])
+
+        self.case.buses[1].type = REFERENCE
+        self.case.branches[0].r = self.case.branches[0].x = 0.0
+        self.case.branches[1].to_bus = Bus()
+        g = self.case.generators[0]
+        g.p_min, g.p_max = g.p_max, g.p_min
+
+        problems = validate_case(self.case)
+        self.assertEqual(len(problems), 4)
+        self.assertTrue("2 reference buses." in problems)
+
+
+    def testConvertCase(self):
+        """ Test that converted cases mirror the input directories within the
+        output directory.
+        """
+        output = join(self.dir, "converted")
+        for path in self.files:
+            result = convert_case(self.case, path, "npz", output, self.input)
+            expected = os.path.splitext(path.replace(self.input, output))[0]
+            self.assertEqual(result, expected + ".npz")
+            self.assertTrue(os.path.isfile(result))
+
+        # Without an output directory, cases are written beside the input.
+        self.assertEqual(convert_case(self.case, self.files[0], "pickle"),
+                         join(self.input, "case6ww.pkl"))
+
+        self.assertRaises(ValueError, convert_case, self.case, self.files[0],
+                          "matpower")
+
+
+    def testFormatError(self):
+        """ Test that a file of an unrecognised format is a format error.
+        """
+        result = process_file(join(DATA_DIR, "bench30.m"))
+        self.assertFalse(result["success"])
+        self.assertEqual(result["format"], "unrecognised")
+        self.assertEqual(result["error"],
+                         "ValueError: Unrecognised data file format.")
+        self.assertFalse("problems" in result)
+
+
+    def testRunBatch(self):
+        """ Test that a pool of processes gives the results of processing the
+        files in this process.
+        """
+        output = join(self.dir, "converted")
+        results = []
+        for processes in [1, 2]:
+            summary = run_batch(self.files, processes, action="convert",
+                output_type="npz", output_dir=output, base_dir=self.input)
+            self.assertEqual(summary["succeeded"], 3)
+            results.append([(r["file"], r["output"])
+                            for r in summary["results"]])
+
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
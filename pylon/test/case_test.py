@@ -215,6 +215,33 @@ class CaseTest(unittest.TestCase):
         self.assertEqual(case.buses.index(case.generators[2].bus), 12)
         self.assertEqual(case.buses.index(case.generators[5].bus), 26)
 
+
+    def test_clone(self):
+        """ Test copying a case for independent modification.
+        """
+        case = PickleReader().read(PWL_FILE)
+        clone = case.clone()
+
+        self.assertEqual(len(clone.buses), len(case.buses))
+        self.assertEqual(len(clone.branches), len(case.branches))
+        self.assertEqual(len(clone.generators), len(case.generators))
+
+        for l in clone.branches:
+            self.assertTrue(l.from_bus in clone.buses)
+            self.assertTrue(l.to_bus in clone.buses)
+        for g in clone.generators:
+            self.assertTrue(g.bus in clone.buses)
+            self.assertFalse(g.bus in case.buses)
+
+        p_demand = case.buses[3].p_demand
+        clone.buses[3].p_demand += 10.0
+        clone.branches[0].online = False
+        clone.generators[0].p_cost[1] = (50.0, 1000.0)
+
+        self.assertEqual(case.buses[3].p_demand, p_demand)
+        self.assertTrue(case.branches[0].online)
+        self.assertNotEqual(case.generators[0].p_cost[1], (50.0, 1000.0))
+
     #--------------------------------------------------------------------------
     #  Serialisation tests.
     #--------------------------------------------------------------------------
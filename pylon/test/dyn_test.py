@@ -0,0 +1,539 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines test cases for dynamic simulation.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import math
+import shutil
+import tempfile
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array, zeros, arange, dot, exp, eye, r_, isfinite
+from scipy.linalg import expm
+from scipy.sparse.linalg import splu
+
+from pylon import Case, Bus, Branch, Generator, REFERENCE, PV
+from pylon.dyn import \
+    DynamicCase, DynamicGenerator, Exciter, Governor, DynamicSolver, \
+    TrajectoryRecorder, TrajectoryReader, AugYbusSolver, ModifiedEuler, \
+    RungeKutta, RungeKuttaFehlberg, RungeKuttaHighamHall, \
+    TrapezoidalRule, BusChange, BranchChange, Scenario, ScenarioBatch, \
+    CCTSearch, AngleCriterion, EnergyCriterion, MAX_ANGLE, STABLE
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+#------------------------------------------------------------------------------
+#  "dynamicCase" function:
+#------------------------------------------------------------------------------
+
+def dynamicCase(case, h=2.0, x_tr=0.25, stoptime=1.0, stepsize=0.01):
+    """ Returns a dynamic case with a classical model, constant excitation
+    and constant power for each generator of the given case.
+    """
+    dyn_case = DynamicCase(case, stoptime=stoptime, stepsize=stepsize)
+    for g in case.generators:
+        exciter, governor = Exciter(g), Governor(g)
+        dyn_case.exciters.append(exciter)
+        dyn_case.governors.append(governor)
+        dyn_case.dyn_generators.append(DynamicGenerator(g, exciter, governor,
+                                                        h=h, d=0.0, x_tr=x_tr))
+    return dyn_case
+
+#------------------------------------------------------------------------------
+#  "machineInfiniteBus" function:
+#------------------------------------------------------------------------------
+
+def machineInfiniteBus(p=80.0, x=0.5, h=3.0, x_tr=0.3):
+    """ Returns a dynamic case of a single machine connected to an infinite
+    bus, represented by a machine of very large inertia.
+    """
+    inf = Bus("inf", type=REFERENCE)
+    mid = Bus("mid")
+    bus = Bus("gen", type=PV)
+    generators = [Generator(inf, p=0.0, q_max=999.0, q_min=-999.0),
+                  Generator(bus, p=p, q_max=999.0, q_min=-999.0)]
+    branches = [Branch(bus, mid, x=x / 2), Branch(mid, inf, x=x / 2)]
+    case = Case(buses=[inf, bus, mid], branches=branches,
+                generators=generators)
+
+    dyn_case = dynamicCase(case, stoptime=1.0, stepsize=0.002)
+    dyn_case.dyn_generators[0].h = 1e06
+    dyn_case.dyn_generators[0].x_tr = 1e-04
+    dyn_case.dyn_generators[1].h = h
+    dyn_case.dyn_generators[1].x_tr = x_tr
+
+    return dyn_case
+
+#------------------------------------------------------------------------------
+#  "LinearCase" class:
+#------------------------------------------------------------------------------
+
+class LinearCase(object):
+    """ Defines a dynamic case of linear generator, exciter and governor
+    equations, independent of the network, with an analytic solution.
+    """
+
+    def __init__(self, A, ta=1.0, tg=1.0):
+        #: Generator states are row vectors, dX/dt = X A.
+        self.A = A
+
+        #: Exciter and governor time constants, dX/dt = -X / T.
+        self.ta = ta
+        self.tg = tg
+
+        #: Number of network solutions.
+        self.solves = 0
+
+
+    def solveNetwork(self, Xgen, augYbus_solver, gbus):
+        self.solves += 1
+        return zeros(len(gbus), dtype=complex)
+
+
+    def machineCurrents(self, Xgen, U):
+        n = Xgen.shape[0]
+        return zeros(n), zeros(n), zeros(n)
+
+
+    def generator(self, Xgen, Xexc, Xgov, Vgen):
+        return dot(Xgen, self.A)
+
+
+    def exciter(self, Xexc, Pexc, Vexc):
+        return -Xexc / self.ta
+
+
+    def governor(self, Xgov, Pgov, Vgov):
+        return -Xgov / self.tg
+
+
+    def states(self):
+        """ Returns initial generator, exciter and governor states.
+        """
+        Xgen = array([[0.5, 1.0, 1.1, 0.0], [-0.2, 1.0, 0.9, 0.3]])
+        Xexc = array([[1.0, 0.5, 0.0], [2.0, 0.0, 1.0]])
+        Xgov = array([[0.8, 0.8, 0.0, 0.1], [0.6, 0.6, 0.2, 0.0]])
+        return Xgen, Xexc, Xgov
+
+
+    def exact(self, t):
+        """ Returns the states at the given time.
+        """
+        Xgen, Xexc, Xgov = self.states()
+        return dot(Xgen, expm(self.A * t)), Xexc * exp(-t / self.ta), \
+            Xgov * exp(-t / self.tg)
+
+
+    def integrate(self, method, stoptime, stepsize):
+        """ Returns the states at the stop time using the given method,
+        starting with the given step size.
+        """
+        method.dyn_case = self
+        Xgen, Xexc, Xgov = self.states()
+        Vgen, Vexc, Vgov = zeros((2, 3)), zeros(2), zeros(2)
+        gbus = [0, 1]
+
+        #: Number of steps taken.
+        self.steps = 0
+
+        t = 0.0
+        while t < stoptime - 1e-12:
+            stepsize = min(stepsize, stoptime - t)
+            Xgen, _, Vgen, Xexc, _, Vexc, Xgov, _, Vgov, _, _, _, t, \
+                stepsize = method.solve(t, Xgen, None, Vgen, Xexc, None,
+                    Vexc, Xgov, None, Vgov, None, gbus, stepsize)
+            self.steps += 1
+
+        return Xgen, Xexc, Xgov
+
+#------------------------------------------------------------------------------
+#  "DynamicSolverTest" class:
+#------------------------------------------------------------------------------
+
+class DynamicSolverTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        self.solver = DynamicSolver(dynamicCase(self.case), verbose=False)
+
+
+    def testSteadyState(self):
+        """ Test that an undisturbed case remains in steady-state.
+        """
+        solution = self.solver.solve()
+
+        self.assertAlmostEqual(solution["time"][0], -0.02, 12)
+        self.assertAlmostEqual(solution["time"][-1], 1.0, 12)
+        self.assertEqual(len(solution["time"]), 103)
+        self.assertTrue(abs(solution["angles"] -
+                            solution["angles"][0]).max() < 1e-5)
+        self.assertTrue(abs(solution["speeds"] - 1.0).max() < 1e-9)
+
+        # The resumable state shares the trajectory of the solution.
+        trajectory = solution["state"]["trajectory"]
+        self.assertTrue(trajectory["angles"].base is
+                        solution["angles"].base)
+
+
+    def testTrajectoryRecorder(self):
+        """ Test streaming a decimated trajectory to file.
+        """
+        bus = self.case.buses[2]
+        self.solver.events = [BusChange(bus, 0.1, "b_shunt", -1e6),
+                              BusChange(bus, 0.15, "b_shunt", 0.0)]
+        solution = self.solver.solve()
+
+        path = tempfile.mkdtemp()
+        try:
+            self.solver.recorder = TrajectoryRecorder(path,
+                ["angles", "voltages"], decimation=2, chunk=10)
+            self.assertEqual(self.solver.solve()["unstable"], False)
+
+            reader = TrajectoryReader(path)
+            self.assertEqual(reader.channels, ["angles", "time", "voltages"])
+            self.assertEqual(reader.count, (len(solution["time"]) + 1) / 2)
+            self.assertTrue((reader.time == solution["time"][::2]).all())
+            self.assertTrue(abs(reader.channel("voltages") -
+                                solution["voltages"][::2]).max() < 1e-10)
+
+            angles = reader.read("angles", 0.2, 0.5, [0, 2])
+            t = solution["time"][::2]
+            expected = solution["angles"][::2][(t >= 0.2) & (t < 0.5)]
+            self.assertEqual(angles.shape, (15, 2))
+            self.assertTrue(abs(angles - expected[:, [0, 2]]).max() < 1e-8)
+
+            # Recording again replaces the previous trajectory.
+            self.solver.dyn_case.stoptime = 0.5
+            self.solver.solve()
+            self.assertTrue(TrajectoryReader(path).time[-1] <= 0.5)
+        finally:
+            shutil.rmtree(path)
+
+
+    def testScenarioBatch(self):
+        """ Test screening scenarios serially and on a pool of processes.
+        """
+        bus = self.case.buses[2]
+        scenarios = [Scenario([BusChange(bus, 0.1, "b_shunt", -1e6)],
+                              [BusChange(bus, 0.1 + tc, "b_shunt", 0.0)])
+                     for tc in [0.05, 0.3, 0.6]]
+
+        batch = ScenarioBatch(self.solver, [MAX_ANGLE, STABLE], processes=1)
+        serial = batch.solve(scenarios)
+
+        batch.processes = 2
+        pooled = batch.solve(scenarios)
+
+        self.assertEqual([r[STABLE] for r in serial], [True, True, False])
+        self.assertTrue(serial[0][MAX_ANGLE] < serial[1][MAX_ANGLE] < 180.0)
+        for r1, r2 in zip(serial, pooled):
+            self.assertTrue(r2["converged"])
+            self.assertEqual(r1[STABLE], r2[STABLE])
+            self.assertAlmostEqual(r1[MAX_ANGLE], r2[MAX_ANGLE], 6)
+
+        # The events are reverted after each scenario.
+        self.assertEqual(bus.b_shunt, 0.0)
+
+#------------------------------------------------------------------------------
+#  "AugYbusSolverTest" class:
+#------------------------------------------------------------------------------
+
+class AugYbusSolverTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        self.dyn_case = dynamicCase(self.case)
+        self.init = DynamicSolver(self.dyn_case, verbose=False).initialise()
+
+        # Current injections at every bus.
+        self.b = arange(1, len(self.case.buses) + 1) * (1.0 - 0.5j)
+
+
+    def testUpdate(self):
+        """ Test solving with branch and bus changes against a factorisation
+        of the modified matrix, using low-rank updates and refactorisation.
+        """
+        U0, gbus = self.init["U0"], self.init["gbus"]
+        events = [BranchChange(self.case.branches[3], 0.0, "online", False),
+                  BusChange(self.case.buses[4], 0.0, "b_shunt", 50.0)]
+
+        for max_rank in [50, 1]:
+            solver = AugYbusSolver(self.init["augYbus"], max_rank)
+            updated = solver
+            for event in events:
+                delta = self.dyn_case.applyEvents([event], U0)
+                updated = updated.update(delta)
+
+                lu = splu(self.dyn_case.getAugYbus(U0, gbus))
+                self.assertTrue(abs(updated.solve(self.b) -
+                                    lu.solve(self.b)).max() < 1e-10)
+
+            # The original solver is unchanged.
+            self.assertTrue(solver._update is None)
+
+            # Reverting the changes restores the pre-disturbance solver.
+            delta = {}
+            for event in reversed(events):
+                before = self.dyn_case._eventAdmittance(event, U0)
+                event.revert()
+                after = self.dyn_case._eventAdmittance(event, U0)
+                for ij in after:
+                    delta[ij] = delta.get(ij, 0.0) + after[ij] - before[ij]
+            reverted = updated.update(delta)
+
+            self.assertTrue(reverted._update is None)
+            self.assertEqual(reverted.delta, {})
+            self.assertTrue(abs(reverted.solve(self.b) -
+                                solver.solve(self.b)).max() < 1e-12)
+
+            # The update of a topology encountered before is reused.
+            self.assertTrue(updated.update({})._update is updated._update)
+
+#------------------------------------------------------------------------------
+#  "TrapezoidalRuleTest" class:
+#------------------------------------------------------------------------------
+
+class TrapezoidalRuleTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        # Lightly damped swing of the rotor angle and speed with decaying
+        # internal voltages.
+        A = zeros((4, 4))
+        A[0, 1], A[1, 0], A[1, 1] = -5.0, 5.0, -0.2
+        A[2, 2], A[3, 3] = -0.5, -2.0
+        self.case = LinearCase(A, ta=0.5, tg=2.0)
+
+
+    def error(self, method, stoptime, stepsize):
+        """ Returns the maximum error of the states at the stop time.
+        """
+        X = self.case.integrate(method, stoptime, stepsize)
+        return max([abs(x - y).max()
+                    for x, y in zip(X, self.case.exact(stoptime))])
+
+
+    def testAccuracy(self):
+        """ Test against the analytic solution of a linear system.
+        """
+        e1 = self.error(TrapezoidalRule(tol=1e-12), 2.0, 0.02)
+        e2 = self.error(TrapezoidalRule(tol=1e-12), 2.0, 0.01)
+
+        self.assertTrue(e1 < 1e-2, e1)
+
+        # Second order convergence.
+        self.assertAlmostEqual(e1 / e2, 4.0, 1)
+
+
+    def testStiff(self):
+        """ Test a step size much longer than the fastest time constant.
+        """
+        self.case.ta = 1e-03
+        stepsize = 0.05
+
+        Xgen, Xexc, Xgov = self.case.integrate(ModifiedEuler(), 1.0, stepsize)
+        self.assertFalse(isfinite(Xexc).all() and abs(Xexc).max() < 1e6)
+
+        # The trapezoidal rule is stable, decaying by (1 - 25) / (1 + 25)
+        # each step.
+        Xgen, Xexc, Xgov = self.case.integrate(TrapezoidalRule(tol=1e-12),
+                                               1.0, stepsize)
+        self.assertTrue(abs(Xexc).max() < 2.0 * (24.0 / 26.0)**20 + 1e-6)
+        self.assertTrue(abs(Xgen - self.case.exact(1.0)[0]).max() < 0.05)
+
+
+    def testJacobian(self):
+        """ Test that the network is only solved when perturbing the states
+        on which it depends.
+        """
+        method = TrapezoidalRule()
+        method.dyn_case = self.case
+        Xgen, Xexc, Xgov = self.case.states()
+        shapes = (Xgen.shape, Xexc.shape, Xgov.shape)
+        x = r_[Xgen.ravel(), Xexc.ravel(), Xgov.ravel()]
+        h = 0.01
+
+        f = lambda x, U=None: method._derivatives(x, shapes, None, None,
+                                                  None, [0, 1], U)
+        F, U = f(x)[:2]
+
+        self.case.solves = 0
+        J = method._jacobian(x, F, U, f, h, shapes)
+        self.assertEqual(self.case.solves, 6)
+
+        Jgen = zeros((8, 8))
+        for k in range(2):
+            Jgen[4 * k:4 * k + 4, 4 * k:4 * k + 4] = self.case.A.T
+        self.assertTrue(abs(J[:8, :8] - (eye(8) - h / 2.0 * Jgen)).max() <
+                        1e-6)
+
+#------------------------------------------------------------------------------
+#  "RungeKuttaFehlbergTest" class:
+#------------------------------------------------------------------------------
+
+class RungeKuttaFehlbergTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        A = zeros((4, 4))
+        A[0, 1], A[1, 0], A[1, 1] = -5.0, 5.0, -0.2
+        A[2, 2], A[3, 3] = -0.5, -2.0
+        self.case = LinearCase(A, ta=0.5, tg=2.0)
+
+
+    def error(self, method):
+        """ Returns the maximum error of the states after 2s.
+        """
+        X = self.case.integrate(method, 2.0, 1e-03)
+        return max([abs(x - y).max()
+                    for x, y in zip(X, self.case.exact(2.0))])
+
+
+    def testAccuracy(self):
+        """ Test the adaptive methods against the analytic solution of a
+        linear system.
+        """
+        for klass in [RungeKuttaFehlberg, RungeKuttaHighamHall]:
+            e = self.error(klass(tol=1e-08, minstep=1e-06, maxstep=1.0))
+            self.assertTrue(e < 1e-05, (klass, e))
+
+            # Far fewer steps than at the initial step size.
+            self.assertTrue(self.case.steps < 400, (klass, self.case.steps))
+
+
+    def testRejection(self):
+        """ Test that a step with too large an error is repeated with a
+        shorter step size.
+        """
+        method = RungeKuttaFehlberg(self.case, tol=1e-08, minstep=1e-06,
+                                    maxstep=1.0)
+        Xgen, Xexc, Xgov = self.case.states()
+        Vgen, Vexc, Vgov = zeros((2, 3)), zeros(2), zeros(2)
+
+        result = method.solve(0.0, Xgen, None, Vgen, Xexc, None, Vexc, Xgov,
+                              None, Vgov, None, [0, 1], 0.5)
+        errest, failed, t, stepsize = result[-4:]
+
+        self.assertTrue(failed > 0)
+        self.assertTrue(errest < 1e-08)
+        self.assertTrue(0.0 < t < 0.5)
+        self.assertTrue(stepsize <= t)
+
+
+    def testDynamicSolver(self):
+        """ Test simulating a fault with the adaptive methods.
+        """
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        bus = case.buses[2]
+        events = [BusChange(bus, 0.1, "b_shunt", -1e6),
+                  BusChange(bus, 0.15, "b_shunt", 0.0)]
+
+        solver = DynamicSolver(dynamicCase(case), RungeKutta(),
+                               verbose=False, events=events)
+        dyn_case = solver.dyn_case
+        dyn_case.stepsize = 0.001
+        reference = solver.solve()
+
+        for klass in [RungeKuttaFehlberg, RungeKuttaHighamHall]:
+            solver = DynamicSolver(dyn_case, klass(), tol=1e-06,
+                                   verbose=False, events=events)
+            solution = solver.solve()
+
+            self.assertAlmostEqual(solution["time"][-1], 1.0, 12)
+            self.assertTrue(len(solution["time"]) < 500)
+            self.assertTrue((solution["errest"][1:] > 0.0).all())
+            self.assertTrue((solution["errest"] < 1e-06).all())
+            self.assertTrue(abs(solution["angles"][-1] -
+                                reference["angles"][-1]).max() < 0.1)
+
+#------------------------------------------------------------------------------
+#  "CCTSearchTest" class:
+#------------------------------------------------------------------------------
+
+class CCTSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.dyn_case = machineInfiniteBus()
+        self.solver = DynamicSolver(self.dyn_case, verbose=False)
+        self.init = self.solver.initialise()
+
+        bus = self.dyn_case.case.buses[1]
+        self.scenario = Scenario([BusChange(bus, 0.0, "b_shunt", -1e06)],
+                                 [BusChange(bus, 0.1, "b_shunt", 0.0)])
+
+        # Critical clearing time of a fault at the machine terminals by the
+        # equal area criterion.
+        Xgen0 = self.init["Xgen0"]
+        Pm = 0.8
+        d0 = Xgen0[1, 0] - Xgen0[0, 0]
+        dc = math.acos((math.pi - 2 * d0) * math.sin(d0) - math.cos(d0))
+        self.cct = math.sqrt(4 * 3.0 * (dc - d0) / (2 * math.pi * 50.0 * Pm))
+
+
+    def testAngleCriterion(self):
+        """ Test that the bisection brackets the critical clearing time.
+        """
+        search = CCTSearch(self.solver, AngleCriterion(), max_cct=0.4,
+                           tol=0.004, processes=1)
+        solution = search.solve(self.scenario, self.init)
+
+        lower, upper = solution["bracket"]
+        self.assertTrue(solution["converged"])
+        self.assertTrue(lower <= self.cct <= upper, (lower, self.cct, upper))
+        self.assertTrue(upper - lower <= 0.004)
+        self.assertEqual(solution["cct"], lower)
+
+        # The case and the clearing instant are restored.
+        self.assertEqual(self.dyn_case.case.buses[1].b_shunt, 0.0)
+        self.assertEqual(self.scenario.clearing[0].time, 0.1)
+
+
+    def testEnergyCriterion(self):
+        """ Test the search on a pool of processes using the transient energy
+        criterion.
+        """
+        search = CCTSearch(self.solver, EnergyCriterion(self.dyn_case),
+                           max_cct=0.4, tol=0.004, processes=2)
+        solution = search.solve(self.scenario, self.init)
+
+        lower, upper = solution["bracket"]
+        self.assertTrue(lower <= self.cct <= upper, (lower, self.cct, upper))
+        self.assertTrue(upper - lower <= 0.004)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -25,10 +25,11 @@ import unittest
 
 from os.path import join, dirname
 
+from numpy import array
 from scipy.io.mmio import mmread
 
 from pylon import Case, OPF
-from pylon.opf import DCOPFSolver, PIPSSolver
+from pylon.opf import DCOPFSolver, PIPSSolver, PersistentDCOPF, BatchDCOPF
 from pylon.util import mfeq2, mfeq1
 
 #------------------------------------------------------------------------------
@@ -525,6 +526,182 @@ class DCOPFSolverCase30PWLTest(DCOPFSolverTest):
 
         self.case_name = "case30pwl"
 
+#------------------------------------------------------------------------------
+#  "PersistentDCOPFTest" class:
+#------------------------------------------------------------------------------
+
+class PersistentDCOPFTest(unittest.TestCase):
+    """ Defines a test case comparing the persistent DC OPF with a new DC OPF
+    of each case.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        filename = join(DATA_DIR, "case24_ieee_rts", "case24_ieee_rts.pkl")
+        self.case = Case.load(filename)
+        self.other = Case.load(filename)
+        self.p_demand = [b.p_demand for b in self.case.buses]
+
+
+    def setPeriod(self, load, outage=None):
+        """ Scales the demand and takes a branch out of service in both cases.
+        """
+        for case in [self.case, self.other]:
+            for bus, pd in zip(case.buses, self.p_demand):
+                bus.p_demand = load * pd
+            for i, branch in enumerate(case.branches):
+                branch.online = i != outage
+
+
+    def assertSolutionsEqual(self, result, other):
+        """ Asserts that the solutions of the two cases are equal.
+        """
+        self.assertTrue(result["converged"] and other["converged"])
+        self.assertAlmostEqual(result["f"] / other["f"], 1.0, 10)
+
+        for attr, components, diff in [("p", "generators", 1e-7),
+                ("v_angle", "buses", 1e-8), ("p_lmbda", "buses", 1e-8),
+                ("p_from", "branches", 1e-7)]:
+            x = array([getattr(c, attr) for c in getattr(self.case,
+                                                         components)])
+            y = array([getattr(c, attr) for c in getattr(self.other,
+                                                         components)])
+            self.assertTrue(abs(x - y).max() < diff, attr)
+
+
+    def testSolve(self):
+        """ Test solving for changes in demand and a branch outage.
+        """
+        opf = PersistentDCOPF(self.case)
+        for load, outage in [(1.0, None), (0.9, None), (1.05, None),
+                             (0.9, 7), (0.8, 7), (0.95, None)]:
+            self.setPeriod(load, outage)
+            if load != 1.0:
+                self.assertTrue(opf._x is not None)
+
+            result = opf.solve()
+            self.assertSolutionsEqual(result, OPF(self.other, True).solve())
+
+        # Both topologies were kept.
+        self.assertEqual(len(opf._networks), 2)
+
+
+    def testTopologies(self):
+        """ Test that the network constraints of recent topologies are reused
+        and those of the least recently used topology are dropped.
+        """
+        opf = PersistentDCOPF(self.case, topologies=2)
+
+        networks = {}
+        for load, outage in [(1.0, None), (0.9, 7), (0.95, None)]:
+            self.setPeriod(load, outage)
+            self.assertSolutionsEqual(opf.solve(),
+                                      OPF(self.other, True).solve())
+            networks.setdefault(outage, opf._networks[opf._topology][0])
+
+        # The base topology was reused.
+        self.assertTrue(opf._networks[opf._topology][0] is networks[None])
+        base, outage7 = opf._topology, opf._networks.keys()[0]
+        self.assertEqual(opf._networks.keys(), [outage7, base])
+
+        # A new topology drops the least recently used.
+        self.setPeriod(1.0, 8)
+        self.assertSolutionsEqual(opf.solve(), OPF(self.other, True).solve())
+        self.assertEqual(opf._networks.keys(), [base, opf._topology])
+
+        # A dropped topology is built again.
+        self.setPeriod(0.8, 7)
+        self.assertSolutionsEqual(opf.solve(), OPF(self.other, True).solve())
+        self.assertEqual(opf._topology, outage7)
+        self.assertFalse(opf._networks[outage7][0] is networks[7])
+        self.assertEqual(len(opf._networks), 2)
+
+
+    def testWarmStart(self):
+        """ Test that a warm started solver finds the solution of a new one.
+        """
+        om = OPF(self.case)._construct_opf_model(self.case)
+        x = DCOPFSolver(om).solve()["x"]
+
+        self.setPeriod(0.9)
+        om = OPF(self.case)._construct_opf_model(self.case)
+        warm = DCOPFSolver(om, x0=x).solve()
+        cold = DCOPFSolver(om).solve()
+
+        self.assertTrue(warm["converged"])
+        self.assertAlmostEqual(warm["f"] / cold["f"], 1.0, 10)
+        self.assertTrue(abs(warm["x"] - cold["x"]).max() < 1e-8)
+
+        # A previous solution of another size is ignored.
+        self.assertEqual(DCOPFSolver(om, x0=x[:-1])._qp()["x0"].tolist(),
+                         DCOPFSolver(om)._qp()["x0"].tolist())
+
+#------------------------------------------------------------------------------
+#  "BatchDCOPFTest" class:
+#------------------------------------------------------------------------------
+
+class BatchDCOPFTest(unittest.TestCase):
+    """ Defines a test case comparing a batch of DC OPFs with a new DC OPF of
+    each case.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        filename = join(DATA_DIR, "case24_ieee_rts", "case24_ieee_rts.pkl")
+        self.cases = [Case.load(filename) for _ in range(3)]
+        self.others = [Case.load(filename) for _ in range(3)]
+
+        for k, (load, outage) in enumerate([(1.0, None), (0.9, None),
+                                            (1.05, 7)]):
+            for case in [self.cases[k], self.others[k]]:
+                for bus in case.buses:
+                    bus.p_demand *= load
+                if outage is not None:
+                    case.branches[outage].online = False
+
+
+    def assertSolutionsEqual(self, results, cases, others):
+        """ Asserts that the batch results are the solutions of new OPFs.
+        """
+        self.assertEqual(len(results), len(cases))
+        for result, case, other in zip(results, cases, others):
+            expected = OPF(other, True).solve()
+            self.assertTrue(result["converged"] and expected["converged"])
+            self.assertAlmostEqual(result["f"] / expected["f"], 1.0, 10)
+
+            # Dispatch in per-unit.
+            p = array([g.p for g in case.generators]) / case.base_mva
+            q = array([g.p for g in other.generators]) / other.base_mva
+            self.assertTrue(abs(p - q).max() < 1e-8)
+            self.assertTrue(abs(result["x"] - expected["x"]).max() < 1e-8)
+
+
+    def testSolve(self):
+        """ Test solving all cases together.
+        """
+        batch = BatchDCOPF(self.cases)
+        self.assertSolutionsEqual(batch.solve(), self.cases, self.others)
+
+
+    def testSubset(self):
+        """ Test solving some of the cases after a change in demand.
+        """
+        batch = BatchDCOPF(self.cases)
+        batch.solve()
+
+        for case in [self.cases[0], self.others[0],
+                     self.cases[2], self.others[2]]:
+            for bus in case.buses:
+                bus.p_demand *= 0.95
+
+        subset = [self.cases[2], self.cases[0]]
+        results = batch.solve(subset)
+        # Results are in the order of the batch.
+        self.assertSolutionsEqual(results, [self.cases[0], self.cases[2]],
+                                  [self.others[0], self.others[2]])
+
 #------------------------------------------------------------------------------
 #  "PIPSSolverTest" class:
 #------------------------------------------------------------------------------
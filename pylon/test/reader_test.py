@@ -22,13 +22,25 @@
 #------------------------------------------------------------------------------
 
 import os.path
+import shutil
+import tempfile
 
 from time import time
+from threading import Thread
+from cStringIO import StringIO
 
 from unittest import TestCase, main
 
+from numpy import loadtxt
+
+from pylon import NewtonPF
 from pylon.io import \
-    MATPOWERReader, PSSEReader, PickleReader
+    MATPOWERReader, FastMATPOWERReader, PSSEReader, PickleReader, \
+    NPZReader, NPZWriter, FastPSSEReader, SnapshotReader, SnapshotWriter, \
+    case_delta, apply_delta, CSVResultWriter, BinaryResultWriter, \
+    BinaryResultReader
+from pylon.io.psat import PSATReader, FastPSATReader
+from pylon.io.matpower import parse_matrix
 
 #------------------------------------------------------------------------------
 #  Constants:
@@ -41,6 +53,7 @@ MP_V1_DATA_FILE    = os.path.join(DATA_DIR, "case6ww-3.2.m")
 PWL_MP_DATA_FILE   = os.path.join(DATA_DIR, "case30pwl.m")
 UKGDS_DATA_FILE    = os.path.join(DATA_DIR, "ehv3.raw")
 PSSE_DATA_FILE     = os.path.join(DATA_DIR, "sample30.raw")
+PSSE33_DATA_FILE   = os.path.join(DATA_DIR, "small33.raw")
 PSAT_DATA_FILE     = os.path.join(DATA_DIR, "d_006_mdl.m")
 
 #------------------------------------------------------------------------------
@@ -215,6 +228,170 @@ class MatpowerReaderTest(ReaderTest):
         self.assertEqual(generators[4].p_cost[2], (36.0, 1296.0))
         self.assertEqual(generators[5].p_cost[3], (60.0, 2832.0))
 
+#------------------------------------------------------------------------------
+#  "FastMatpowerReaderTest" class:
+#------------------------------------------------------------------------------
+
+class FastMatpowerReaderTest(MatpowerReaderTest):
+    """ Defines a test case for the fast MATPOWER reader.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.reader = FastMATPOWERReader()
+
+
+    def test_read_arrays(self):
+        """ Test parsing case6ww.m into arrays.
+        """
+        data = self.reader.read_arrays(MATPOWER_DATA_FILE)
+
+        self.assertEqual(data["name"], "case6ww")
+        self.assertEqual(data["baseMVA"], 100.0)
+        self.assertEqual(data["bus"].shape, (6, 13))
+        self.assertEqual(data["gen"].shape[0], 3)
+        self.assertEqual(data["branch"].shape[0], 11)
+        self.assertEqual(data["gencost"][1, 5], 10.333)
+
+
+    def test_parse_ragged(self):
+        """ Test parsing rows of differing length whose total length is a
+        multiple of the length of the first row.
+        """
+        matrix = parse_matrix("""
+            2 0 0 2 1 0;
+            2 0 0 3 0.1 1 5;
+            1 0 0 0 2;
+        """)
+
+        self.assertEqual(matrix.shape, (3, 7))
+        self.assertEqual(matrix[0].tolist(), [2, 0, 0, 2, 1, 0, 0])
+        self.assertEqual(matrix[1].tolist(), [2, 0, 0, 3, 0.1, 1, 5])
+        self.assertEqual(matrix[2].tolist(), [1, 0, 0, 0, 2, 0, 0])
+
+#------------------------------------------------------------------------------
+#  "NPZReaderTest" class:
+#------------------------------------------------------------------------------
+
+class NPZReaderTest(ReaderTest):
+    """ Defines a test case for the compact binary case format.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "case30pwl.npz")
+
+        self.original = MATPOWERReader().read(PWL_MP_DATA_FILE)
+        NPZWriter(self.original).write(self.path)
+
+
+    def tearDown(self):
+        """ The test runner will execute this method after each test.
+        """
+        shutil.rmtree(self.dir)
+
+
+    def test_case30pwl(self):
+        """ Test reading a case written in the binary format.
+        """
+        self.case = c = NPZReader().read(self.path)
+
+        self._validate_base(base_mva=100.0)
+        self._validate_object_numbers(n_buses=30, n_branches=41, n_gen=6)
+        self._validate_slack_bus(slack_idx=0)
+        self._validate_generator_connections(gbus_idxs=[0, 1, 21, 26, 22, 12])
+
+        for g, original in zip(c.generators, self.original.generators):
+            self.assertEqual(g.pcost_model, "pwl")
+            self.assertEqual(g.p_cost, original.p_cost)
+            self.assertEqual(g.p_max, original.p_max)
+
+        for l, original in zip(c.branches, self.original.branches):
+            self.assertEqual(l.online, original.online)
+            self.assertEqual(l.x, original.x)
+
+
+    def test_pipe(self):
+        """ Test writing a case to a pipe, which cannot seek.
+        """
+        r, w = os.pipe()
+        data = []
+        reader = Thread(target=lambda: data.append(os.fdopen(r, "rb").read()))
+        reader.start()
+
+        fd = os.fdopen(w, "wb")
+        try:
+            NPZWriter(self.original).write(fd)
+        finally:
+            fd.close()
+        reader.join()
+
+        self.case = NPZReader().read(StringIO(data[0]))
+        self._validate_object_numbers(n_buses=30, n_branches=41, n_gen=6)
+
+
+    def test_mmap(self):
+        """ Test memory-mapping the columns of a case.
+        """
+        data = NPZReader(mmap_mode="r").read_arrays(self.path)
+
+        self.assertEqual(data["bus.v_max"].shape, (30,))
+        self.assertEqual(list(data["bus.p_demand"]),
+                         [b.p_demand for b in self.original.buses])
+
+        self.case = NPZReader(mmap_mode="r").read(self.path)
+        self._validate_object_numbers(n_buses=30, n_branches=41, n_gen=6)
+
+
+    def test_delta(self):
+        """ Test the delta between cases.
+        """
+        case = NPZReader().read(self.path)
+        case.buses[3].p_demand = 25.0
+        case.branches[7].online = False
+
+        delta = case_delta(self.original, case)
+        self.assertEqual(sorted(delta), ["branch.online", "bus.p_demand"])
+        self.assertEqual(list(delta["bus.p_demand"][0]), [3])
+
+        self.case = c = apply_delta(self.original, delta)
+        self._validate_object_numbers(n_buses=30, n_branches=41, n_gen=6)
+        self.assertEqual(c.buses[3].p_demand, 25.0)
+        self.assertFalse(c.branches[7].online)
+        self.assertEqual(case_delta(c, case), {})
+
+        del case.branches[0]
+        self.assertRaises(ValueError, case_delta, self.original, case)
+
+
+    def test_snapshots(self):
+        """ Test writing and reading an archive of snapshots.
+        """
+        path = os.path.join(self.dir, "snapshots.npz")
+        p_demand = [b.p_demand for b in self.original.buses]
+
+        writer = SnapshotWriter(path)
+        for k in range(3):
+            for b, p in zip(self.original.buses, p_demand):
+                b.p_demand = p * (1.0 + 0.1 * k)
+            writer.write(self.original, timestamp=300.0 * k)
+        SnapshotWriter(path, "a").write(self.original, timestamp=900.0)
+
+        reader = SnapshotReader(path)
+        self.assertEqual(len(reader), 4)
+        self.assertEqual(reader.times, [0.0, 300.0, 600.0, 900.0])
+
+        for k, case in enumerate(reader):
+            f = 1.0 + 0.1 * min(k, 2)
+            for b, p in zip(case.buses, p_demand):
+                self.assertAlmostEqual(b.p_demand, p * f, 9)
+
+        self.case = reader.read(1)
+        self._validate_object_numbers(n_buses=30, n_branches=41, n_gen=6)
+
 #------------------------------------------------------------------------------
 #  "PSSEReaderTest" class:
 #------------------------------------------------------------------------------
@@ -317,6 +494,88 @@ class PSSEReaderTest(TestCase):
 #        self._validate_branch_connections(from_idxs=[0, 0, 1],
 #                                          to_idxs=[1, 2, 2])
 
+#------------------------------------------------------------------------------
+#  "FastPSSEReaderTest" class:
+#------------------------------------------------------------------------------
+
+class FastPSSEReaderTest(PSSEReaderTest):
+    """ Defines a test case for the streaming PSS/E data file reader.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.reader = FastPSSEReader()
+
+
+    def test_version33(self):
+        """ Test parsing a PSS/E version 33 file.
+        """
+        case = self.reader.read(PSSE33_DATA_FILE)
+
+        self.assertEqual(len(case.buses), 4)
+        self.assertEqual(len(case.generators), 2)
+        self.assertEqual(len(case.branches), 5)
+
+        pl = 5
+        # Out of service loads are excluded.
+        self.assertAlmostEqual(case.buses[1].p_demand, 50.0, pl)
+        self.assertAlmostEqual(case.buses[1].q_demand, 20.0, pl)
+
+        # Fixed and switched shunts.
+        self.assertAlmostEqual(case.buses[1].g_shunt, 1.0, pl)
+        self.assertAlmostEqual(case.buses[1].b_shunt, 10.0, pl)
+        self.assertAlmostEqual(case.buses[2].b_shunt, 25.0, pl)
+        self.assertEqual(case.buses[2].zone, 2)
+
+        self.assertFalse(case.generators[1].online)
+        self.assertAlmostEqual(case.generators[1].p_min, 10.0, pl)
+
+        # Impedance on the winding base and winding voltages in kV.
+        trx = case.branches[1]
+        self.assertAlmostEqual(trx.r, 0.02, pl)
+        self.assertAlmostEqual(trx.x, 0.2, pl)
+        self.assertAlmostEqual(trx.ratio, 1.05, pl)
+        self.assertAlmostEqual(trx.rate_a, 60.0, pl)
+
+
+    def test_three_winding(self):
+        """ Test that a three-winding transformer is modelled as a star bus
+        and a branch for each winding.
+        """
+        case = self.reader.read(PSSE33_DATA_FILE)
+
+        pl = 5
+        star = case.buses[3]
+        self.assertEqual(star.name, "nTX3W")
+        self.assertEqual(star._i, 4)
+        self.assertAlmostEqual(star.v_magnitude, 1.01, pl)
+        self.assertAlmostEqual(star.v_angle, -3.0, pl)
+
+        windings = case.branches[2:]
+        self.assertEqual([l.from_bus for l in windings], case.buses[:3])
+        self.assertEqual([l.to_bus for l in windings], [star] * 3)
+
+        # Star equivalent of the winding to winding impedances.
+        for l, r, x, ratio in zip(windings, [0.01, 0.02, 0.03],
+                                  [0.1, 0.2, 0.3], [1.02, 1.0, 0.98]):
+            self.assertAlmostEqual(l.r, r, pl)
+            self.assertAlmostEqual(l.x, x, pl)
+            self.assertAlmostEqual(l.ratio, ratio, pl)
+        self.assertAlmostEqual(windings[0].b, 0.001, pl)
+        self.assertAlmostEqual(windings[1].phase_shift, 5.0, pl)
+        self.assertAlmostEqual(windings[2].rate_a, 50.0, pl)
+
+        # STAT of 3 takes only winding 3 out of service.
+        self.assertEqual([l.online for l in windings], [True, True, False])
+
+        data = open(PSSE33_DATA_FILE, "rb").read()
+        for stat, online in [("0", [False] * 3), ("2", [True, False, True]),
+                             ("4", [False, True, True])]:
+            case = self.reader.read(StringIO(data.replace("'TX3W        ',3",
+                "'TX3W        '," + stat)))
+            self.assertEqual([l.online for l in case.branches[2:]], online)
+
 #------------------------------------------------------------------------------
 #  "PSATReaderTest" class:
 #------------------------------------------------------------------------------
@@ -331,6 +590,94 @@ class PSSEReaderTest(TestCase):
 #        reader = PSATReader()
 #        self.case = reader(PSAT_DATA_FILE)
 
+#------------------------------------------------------------------------------
+#  "FastPSATReaderTest" class:
+#------------------------------------------------------------------------------
+
+class FastPSATReaderTest(TestCase):
+    """ Defines a test case for the fast PSAT data file reader.
+    """
+
+    def test_psat(self):
+        """ Test the fast reader against the PSAT grammar.
+        """
+        case = FastPSATReader().read(PSAT_DATA_FILE)
+        expected = PSATReader().read(PSAT_DATA_FILE)
+
+        self.assertEqual(case.name, expected.name)
+        self.assertEqual(len(case.buses), 6)
+        self.assertEqual(len(case.branches), 11)
+        self.assertEqual(len(case.generators), 3)
+
+        for b, e in zip(case.buses, expected.buses):
+            for attr in ["name", "type", "v_magnitude", "v_angle",
+                         "p_demand", "q_demand"]:
+                self.assertEqual(getattr(b, attr), getattr(e, attr))
+
+        for l, e in zip(case.branches, expected.branches):
+            self.assertEqual(l.from_bus.name, e.from_bus.name)
+            self.assertEqual(l.to_bus.name, e.to_bus.name)
+            for attr in ["r", "x", "b", "rate_a", "rate_b", "rate_c",
+                         "ratio", "phase_shift"]:
+                self.assertEqual(getattr(l, attr), getattr(e, attr))
+
+        for g, e in zip(case.generators, expected.generators):
+            self.assertEqual(g.bus.name, e.bus.name)
+            for attr in ["p", "q_max", "q_min", "pcost_model",
+                         "poly_coeffs"]:
+                self.assertEqual(getattr(g, attr), getattr(e, attr))
+
+#------------------------------------------------------------------------------
+#  "ResultWriterTest" class:
+#------------------------------------------------------------------------------
+
+class ResultWriterTest(TestCase):
+    """ Defines a test case for the writers of case results.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = MATPOWERReader().read(MATPOWER_DATA_FILE)
+        self.dir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        """ The test runner will execute this method after each test.
+        """
+        shutil.rmtree(self.dir)
+
+
+    def testResultWriters(self):
+        """ Test appending the results of each scenario to CSV and binary
+        result files.
+        """
+        csv_dir = os.path.join(self.dir, "csv")
+        bin_dir = os.path.join(self.dir, "bin")
+        v_angle = []
+        for k, load in enumerate([0.5, 1.0]):
+            for b in self.case.buses:
+                b.p_demand *= load
+            NewtonPF(self.case).solve()
+            v_angle.extend([b.v_angle for b in self.case.buses])
+
+            CSVResultWriter(self.case).write(csv_dir, k, append=k > 0)
+            BinaryResultWriter(self.case).write(bin_dir, k, append=k > 0)
+
+        nb = len(self.case.buses)
+
+        bus = loadtxt(os.path.join(csv_dir, "bus.csv"), delimiter=",",
+                      skiprows=1)
+        self.assertEqual(bus.shape, (2 * nb, 8))
+        self.assertEqual(list(bus[:, 0]), [0] * nb + [1] * nb)
+        self.assertTrue(abs(bus[:, 3] - v_angle).max() < 1e-6)
+
+        results = BinaryResultReader().read(bin_dir)
+        self.assertEqual(list(results["bus"]["index"]), range(nb) * 2)
+        self.assertEqual(list(results["bus"]["v_angle"]), v_angle)
+        self.assertEqual(len(results["generator"]["p"]),
+                         2 * len(self.case.generators))
+
 #------------------------------------------------------------------------------
 #  "PickleReaderTest" class:
 #------------------------------------------------------------------------------
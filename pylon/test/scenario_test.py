@@ -0,0 +1,146 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for scenario stores and runners.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+
+from os.path import join, dirname
+
+from numpy import array
+
+from pylon import Case, NewtonPF, OPF, ScenarioStore, ScenarioRunner
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_DIR = join(dirname(__file__), "data")
+
+PROFILE = [0.52, 0.54, 0.52, 0.50, 0.52, 0.57, 0.60, 0.71, 0.89, 0.85]
+
+#------------------------------------------------------------------------------
+#  "ScenarioTest" class:
+#------------------------------------------------------------------------------
+
+class ScenarioTest(unittest.TestCase):
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        self.dir = tempfile.mkdtemp()
+        self.scenario = ScenarioStore.fromProfile(join(self.dir, "scenario"),
+                                                  self.case, PROFILE)
+
+
+    def tearDown(self):
+        """ The test runner will execute this method after each test.
+        """
+        shutil.rmtree(self.dir)
+
+
+    def testStore(self):
+        """ Test reading a scenario a chunk at a time.
+        """
+        Pd = array([b.p_demand for b in self.case.buses])
+
+        scenario = ScenarioStore(join(self.dir, "scenario"))
+        self.assertEqual(scenario.periods, len(PROFILE))
+
+        starts = []
+        for start, values in scenario.chunks(4):
+            starts.append(start)
+            for k, p in enumerate(values["p_demand"]):
+                self.assertTrue(abs(p - PROFILE[start + k] * Pd).max() < 1e-9)
+            self.assertTrue((values["availability"] == 1.0).all())
+
+        self.assertEqual(starts, [0, 4, 8])
+
+
+    def testRunNewtonPF(self):
+        """ Test running a scenario using Newton's method.
+        """
+        Pd = [b.p_demand for b in self.case.buses]
+        Qd = [b.q_demand for b in self.case.buses]
+
+        results = ScenarioRunner(self.case, self.scenario, "acpf",
+                                 chunk=3).run(join(self.dir, "results"))
+
+        self.assertTrue(results.channel("converged").all())
+
+        # Compare the final period with a power flow of the original case.
+        case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+        for b, p, q in zip(case.buses, Pd, Qd):
+            b.p_demand = PROFILE[-1] * p
+            b.q_demand = PROFILE[-1] * q
+        NewtonPF(case).solve()
+
+        v_angle = results.channel("v_angle")[-1]
+        for i, b in enumerate(case.buses):
+            self.assertAlmostEqual(v_angle[i], b.v_angle, 6)
+
+
+    def testRunDCOPF(self):
+        """ Test running a scenario of DC OPFs with a persistent model and
+        a generator out of service.
+        """
+        Pd = [b.p_demand for b in self.case.buses]
+        p_max = [g.p_max for g in self.case.generators]
+        self.case.generators[2].online = False
+
+        runner = ScenarioRunner(self.case, self.scenario, "dcopf", chunk=4)
+        results = runner.run(join(self.dir, "results"))
+
+        self.assertTrue(results.channel("converged").all())
+        self.assertEqual(len(runner._opf._networks), 1)
+
+        # The generator stays out of service despite being available.
+        supply = results.channel("p")[:, :2].sum(axis=1)
+        self.assertTrue(abs(supply - array(PROFILE) * sum(Pd)).max() < 1e-6)
+
+        # Compare each period with a new OPF of the original case.
+        for k, load in enumerate(PROFILE):
+            case = Case.load(join(DATA_DIR, "case6ww", "case6ww.pkl"))
+            case.generators[2].online = False
+            for b, p in zip(case.buses, Pd):
+                b.p_demand = load * p
+            solution = OPF(case, True).solve()
+
+            self.assertAlmostEqual(results.channel("f")[k, 0] / solution["f"],
+                                   1.0, 8)
+            p = results.channel("p")[k]
+            for i, g in enumerate(case.generators):
+                self.assertAlmostEqual(p[i], g.p, 5)
+
+        # The demand and generators of the case are restored.
+        self.assertEqual([b.p_demand for b in self.case.buses], Pd)
+        self.assertEqual([g.online for g in self.case.generators],
+                         [True, True, False])
+        self.assertEqual([g.p_max for g in self.case.generators], p_max)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -40,11 +40,18 @@ from opf_test import \
     DCOPFSolverTest, DCOPFSolverCase24RTSTest, DCOPFSolverCaseIEEE30Test
 from opf_test import \
     PIPSSolverTest, PIPSSolverCase24RTSTest, PIPSSolvercaseIEEE30Test
+from opf_test import PersistentDCOPFTest, BatchDCOPFTest
 from opf_model_test import \
     OPFModelTest
 
-from reader_test import MatpowerReaderTest, PSSEReaderTest#, PSATReaderTest
+from reader_test import MatpowerReaderTest, FastMatpowerReaderTest, \
+    NPZReaderTest, PSSEReaderTest, FastPSSEReaderTest, FastPSATReaderTest, \
+    ResultWriterTest
 from se_test import StateEstimatorTest
+from scenario_test import ScenarioTest
+from batch_test import BatchTest
+from dyn_test import DynamicSolverTest, AugYbusSolverTest, \
+    TrapezoidalRuleTest, RungeKuttaFehlbergTest, CCTSearchTest
 
 #------------------------------------------------------------------------------
 #  "suite" function:
@@ -78,6 +85,8 @@ def suite():
     suite.addTest(unittest.makeSuite(DCOPFSolverTest))
     suite.addTest(unittest.makeSuite(DCOPFSolverCase24RTSTest))
     suite.addTest(unittest.makeSuite(DCOPFSolverCaseIEEE30Test))
+    suite.addTest(unittest.makeSuite(PersistentDCOPFTest))
+    suite.addTest(unittest.makeSuite(BatchDCOPFTest))
     suite.addTest(unittest.makeSuite(PIPSSolverTest))
     suite.addTest(unittest.makeSuite(PIPSSolverCase24RTSTest))
     suite.addTest(unittest.makeSuite(PIPSSolvercaseIEEE30Test))
@@ -85,11 +94,25 @@ def suite():
 
     # Read/write test cases.
     suite.addTest(unittest.makeSuite(MatpowerReaderTest))
+    suite.addTest(unittest.makeSuite(FastMatpowerReaderTest))
+    suite.addTest(unittest.makeSuite(NPZReaderTest))
     suite.addTest(unittest.makeSuite(PSSEReaderTest))
+    suite.addTest(unittest.makeSuite(FastPSSEReaderTest))
+    suite.addTest(unittest.makeSuite(FastPSATReaderTest))
+    suite.addTest(unittest.makeSuite(ResultWriterTest))
 #    suite.addTest(unittest.makeSuite(PSATReaderTest))
 
     # State estimator test.
     suite.addTest(unittest.makeSuite(StateEstimatorTest))
+    suite.addTest(unittest.makeSuite(ScenarioTest))
+    suite.addTest(unittest.makeSuite(BatchTest))
+
+    # Dynamic simulation test cases.
+    suite.addTest(unittest.makeSuite(DynamicSolverTest))
+    suite.addTest(unittest.makeSuite(AugYbusSolverTest))
+    suite.addTest(unittest.makeSuite(TrapezoidalRuleTest))
+    suite.addTest(unittest.makeSuite(RungeKuttaFehlbergTest))
+    suite.addTest(unittest.makeSuite(CCTSearchTest))
 
     return suite
 
@@ -41,12 +41,16 @@ known_extensions = {
     'm': 'matpower',
     'pkl': 'pickle',
     'pickle': 'pickle',
+    'npz': 'npz',
     'raw': 'psse',
     'rst': 'rest',
     'csv': 'csv',
     'xls': 'excel',
     'dot': 'dot'}
 
+#: Formats read without universal newline translation.
+binary_formats = ['npz']
+
 #------------------------------------------------------------------------------
 #  "_Named" class:
 #------------------------------------------------------------------------------
@@ -134,7 +138,8 @@ class _Serializable(object):
         if format is None:
             # try to derive protocol from file extension
             format = format_from_extension(filename)
-        with file(filename, 'rbU') as fp:
+        mode = 'rb' if format in binary_formats else 'rbU'
+        with file(filename, mode) as fp:
             obj = cls.load_from_file_object(fp, format)
             obj.filename = filename
             return obj
@@ -15,7 +15,7 @@
 #------------------------------------------------------------------------------
 
 from smart_market import \
-    SmartMarket, Offer, Bid, DISCRIMINATIVE, FIRST_PRICE
+    SmartMarket, MarketCache, Offer, Bid, DISCRIMINATIVE, FIRST_PRICE
 
 from rlopf import CaseEnvironment, MinimiseCostTask
 
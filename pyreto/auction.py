@@ -24,6 +24,9 @@ adjusted for network losses and binding constraints
 
 import logging
 
+from numpy import \
+    array, zeros, cumsum, lexsort, flatnonzero, minimum, maximum, inf, r_
+
 #------------------------------------------------------------------------------
 #  Logging:
 #------------------------------------------------------------------------------
@@ -44,6 +47,123 @@ FIRST_PRICE = "first price"
 #SPLIT = "split"
 #DUAL_LAOB = "dual laob"
 
+#------------------------------------------------------------------------------
+#  "OrderBook" class:
+#------------------------------------------------------------------------------
+
+class OrderBook(object):
+    """ Defines an array-backed book of offers or bids, with one element in
+    each column per offer/bid.
+    """
+
+    def __init__(self, offbids, generators):
+        """ Initialises a new OrderBook instance.
+
+        @param offbids: Offers or bids in the book.
+        @param generators: Generators (dispatchable loads) to which the
+            offers (bids) may apply.
+        """
+        index = dict([(id(g), i) for i, g in enumerate(generators)])
+
+        #: Offers/bids in the book.
+        self.offbids = offbids
+
+        #: Number of generators (dispatchable loads) in the book.
+        self.ng = len(generators)
+
+        #: Index of the generator to which each offer/bid applies or -1 if
+        #: the generator is not in the book's list of generators.
+        self.generator = array([index.get(id(ob.generator), -1)
+                                for ob in offbids], dtype=int)
+
+        #: Offered/bid quantity [MW].
+        self.quantity = array([ob.quantity for ob in offbids], dtype=float)
+
+        #: Offered/bid price [$/MWh].
+        self.price = array([ob.price for ob in offbids], dtype=float)
+
+        #: Is the offer/bid withheld?
+        self.withheld = array([ob.withheld for ob in offbids], dtype=bool)
+
+        #: Nodal marginal price.
+        self.lmbda = array([ob.lmbda for ob in offbids], dtype=float)
+
+        #: Output at which the generator was dispatched.
+        self.totalQuantity = array([ob.totalQuantity for ob in offbids],
+                                   dtype=float)
+
+        #: Has the offer/bid been partially or fully accepted?
+        self.accepted = array([ob.accepted for ob in offbids], dtype=bool)
+
+        #: Quantity cleared by the market.
+        self.clearedQuantity = array([ob.clearedQuantity for ob in offbids],
+                                     dtype=float)
+
+        #: Price at which the offer/bid was cleared.
+        self.clearedPrice = array([ob.clearedPrice for ob in offbids],
+                                  dtype=float)
+
+
+    def clearQuantities(self, descending=False):
+        """ Computes the cleared quantities from the total dispatched quantity
+        of each generator, accepting offers in ascending order of price (bids
+        in descending order).
+        """
+        valid = flatnonzero((self.generator >= 0) & ~self.withheld)
+        if len(valid) == 0:
+            return
+
+        # Group by generator and sort by price within each group. The sort
+        # is stable, so blocks with equal prices are accepted in order.
+        price = -self.price[valid] if descending else self.price[valid]
+        valid = valid[lexsort((price, self.generator[valid]))]
+
+        gen = self.generator[valid]
+        quantity = self.quantity[valid]
+
+        # Quantity of the preceding blocks for the same generator.
+        before = cumsum(quantity) - quantity
+        first = r_[True, gen[1:] != gen[:-1]]
+        before -= before[flatnonzero(first)][cumsum(first) - 1]
+
+        # Compute the fraction of each block accepted, clipped to the range
+        # 0-1. Blocks of zero quantity are not accepted.
+        accepted = zeros(len(valid))
+        nonzero = quantity > 0.0
+        accepted[nonzero] = (self.totalQuantity[valid][nonzero] -
+                             before[nonzero]) / quantity[nonzero]
+        accepted[accepted > 1.0] = 1.0
+        accepted[accepted < 1.0e-05] = 0.0
+
+        self.clearedQuantity[valid] = accepted * quantity
+        self.accepted[valid] = accepted > 0.0
+
+
+    def uniformPrices(self, ufunc):
+        """ Sets the cleared price of all offers/bids for each generator to
+        the result of reducing their cleared prices with the given ufunc
+        (e.g. maximum).
+        """
+        inbook = flatnonzero(self.generator >= 0)
+        if len(inbook) == 0:
+            return
+
+        gen = self.generator[inbook]
+        init = -inf if ufunc is maximum else inf
+        uniform = zeros(self.ng) + init
+        ufunc.at(uniform, gen, self.clearedPrice[inbook])
+
+        self.clearedPrice[inbook] = uniform[gen]
+
+
+    def update(self):
+        """ Writes the cleared values back to the offers/bids.
+        """
+        for i, ob in enumerate(self.offbids):
+            ob.accepted = bool(self.accepted[i])
+            ob.clearedQuantity = float(self.clearedQuantity[i])
+            ob.clearedPrice = float(self.clearedPrice[i])
+
 #------------------------------------------------------------------------------
 #  "Auction" class:
 #------------------------------------------------------------------------------
@@ -52,6 +172,9 @@ class Auction(object):
     """ Defines a power auction for clearing offers/bids, where pricing is
     adjusted for network losses and binding constraints.
 
+    Offers and bids are cleared in array-backed order books, using grouped
+    sorts and cumulative sums rather than per-generator filtering.
+
     Based on auction.m from MATPOWER by Ray Zimmerman, developed at PSERC
     Cornell. See U{http://www.pserc.cornell.edu/matpower/} for more info.
     """
@@ -81,10 +204,22 @@ class Auction(object):
         #: Offer/bid price limits.
         self.limits = limits if limits is not None else {}
 
+        #: Order book of offers.
+        self._offerBook = None
+
+        #: Order book of bids.
+        self._bidBook = None
+
 
     def run(self):
         """ Clears a set of bids and offers.
         """
+        generators = [g for g in self.case.generators if not g.is_load]
+        vLoads = [g for g in self.case.generators if g.is_load]
+
+        self._offerBook = OrderBook(self.offers, generators)
+        self._bidBook = OrderBook(self.bids, vLoads)
+
         # Compute cleared offer/bid quantities from total dispatched quantity.
         self._clearQuantities()
 
@@ -98,6 +233,9 @@ class Auction(object):
         # Clip cleared prices according to guarantees and limits.
         self._clipPrices()
 
+        self._offerBook.update()
+        self._bidBook.update()
+
         self._logClearances()
 
         return self.offers, self.bids
@@ -107,55 +245,8 @@ class Auction(object):
         """ Computes the cleared quantities for each offer/bid according
         to the dispatched output from the OPF solution.
         """
-        generators = [g for g in self.case.generators if not g.is_load]
-        vLoads = [g for g in self.case.generators if g.is_load]
-
-        for g in generators:
-            self._clearQuantity(self.offers, g)
-
-        for vl in vLoads:
-            self._clearQuantity(self.bids, vl)
-
-
-    def _clearQuantity(self, offbids, gen):
-        """ Computes the cleared bid quantity from total dispatched quantity.
-        """
-        # Filter out offers/bids not applicable to the generator in question.
-        gOffbids = [offer for offer in offbids if offer.generator == gen]
-
-        # Offers/bids within valid price limits (not withheld).
-        valid = [ob for ob in gOffbids if not ob.withheld]
-
-        # Sort offers by price in ascending order and bids in decending order.
-        valid.sort(key=lambda ob: ob.price, reverse=[False, True][gen.is_load])
-
-        acceptedQty = 0.0
-        for ob in valid:
-            # Compute the fraction of the block accepted.
-            accepted = (ob.totalQuantity - acceptedQty) / ob.quantity
-
-            # Clip to the range 0-1.
-            if accepted > 1.0:
-                accepted = 1.0
-            elif accepted < 1.0e-05:
-                accepted = 0.0
-
-            ob.clearedQuantity = accepted * ob.quantity
-
-            ob.accepted = (accepted > 0.0)
-
-            # Log the event.
-#            if ob.accepted:
-#                logger.info("%s [%s, %.3f, %.3f] accepted at %.2f MW." %
-#                    (ob.__class__.__name__, ob.generator.name, ob.quantity,
-#                     ob.price, ob.clearedQuantity))
-#            else:
-#                logger.info("%s [%s, %.3f, %.3f] rejected." %
-#                    (ob.__class__.__name__, ob.generator.name, ob.quantity,
-#                     ob.price))
-
-            # Increment the accepted quantity.
-            acceptedQty += ob.quantity
+        self._offerBook.clearQuantities()
+        self._bidBook.clearQuantities(descending=True)
 
 
 #    def _first_rejected_last_accepted(self):
@@ -219,11 +310,11 @@ class Auction(object):
     def _clearPrices(self):
         """ Clears prices according to auction type.
         """
-        for offbid in self.offers + self.bids:
+        for book in [self._offerBook, self._bidBook]:
             if self.auctionType == DISCRIMINATIVE:
-                offbid.clearedPrice = offbid.price
+                book.clearedPrice = book.price.copy()
             elif self.auctionType == FIRST_PRICE:
-                offbid.clearedPrice = offbid.lmbda
+                book.clearedPrice = book.lmbda.copy()
             else:
                 raise ValueError
 
@@ -265,50 +356,35 @@ class Auction(object):
     def _clipPrices(self):
         """ Clip cleared prices according to guarantees and limits.
         """
+        offers = self._offerBook
+        bids = self._bidBook
+
         # Guarantee that cleared offer prices are >= offers.
         if self.guaranteeOfferPrice:
-            for offer in self.offers:
-                if offer.accepted and offer.clearedPrice < offer.price:
-                    offer.clearedPrice = offer.price
+            clip = offers.accepted & (offers.clearedPrice < offers.price)
+            offers.clearedPrice[clip] = offers.price[clip]
 
         # Guarantee that cleared bid prices are <= bids.
         if self.guaranteeBidPrice:
-            for bid in self.bids:
-                if bid.accepted and bid.clearedPrice > bid.price:
-                    bid.clearedPrice = bid.price
+            clip = bids.accepted & (bids.clearedPrice > bids.price)
+            bids.clearedPrice[clip] = bids.price[clip]
 
         # Clip cleared offer prices.
         if self.limits.has_key("maxClearedOffer"):
-            maxClearedOffer = self.limits["maxClearedOffer"]
-
-            for offer in self.offers:
-                if offer.clearedPrice > maxClearedOffer:
-                    offer.clearedPrice = maxClearedOffer
+            offers.clearedPrice = minimum(offers.clearedPrice,
+                                          self.limits["maxClearedOffer"])
 
         # Clip cleared bid prices.
         if self.limits.has_key("minClearedBid"):
-            minClearedBid = self.limits["minClearedBid"]
-
-            for bid in self.bids:
-                if bid.clearedPrice < minClearedBid:
-                    bid.clearedPrice = minClearedBid
+            bids.clearedPrice = maximum(bids.clearedPrice,
+                                        self.limits["minClearedBid"])
 
         # Make prices uniform across all offers/bids for each generator after
         # clipping (except for discrim auction) since clipping may only affect
         # a single block of a multi-block generator.
         if self.auctionType != DISCRIMINATIVE:
-            for g in self.case.generators:
-                gOffers = [of for of in self.offers if of.generator == g]
-                if gOffers:
-                    uniformPrice = max([of.clearedPrice for of in gOffers])
-                    for of in gOffers:
-                        of.clearedPrice = uniformPrice
-
-                gBids = [bid for bid in self.bids if bid.vLoad == g]
-                if gBids:
-                    uniformPrice = min([bid.cleared_price for bid in gBids])
-                    for bid in gBids:
-                        bid.clearedPrice = uniformPrice
+            offers.uniformPrices(maximum)
+            bids.uniformPrices(minimum)
 
 
     def _logClearances(self):
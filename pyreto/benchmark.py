@@ -0,0 +1,314 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines benchmarks of market clearing and learning throughput.
+
+Run "python -m pyreto.benchmark -o results.json" to time each stage of a
+market experiment for the standard scenarios and write the results as JSON
+for comparison between revisions.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import logging
+
+import numpy
+import scipy
+
+from numpy import array, random
+
+from pybrain.rl.agents import LearningAgent
+from pybrain.rl.learners.valuebased import ActionValueTable
+
+import pylon
+
+from pylon import Case
+from pylon.benchmark import statistics, environment, option_parser, \
+    write_results
+
+from pyreto.smart_market import SmartMarket
+from pyreto.roth_erev import RothErev
+from pyreto.discrete import MarketEnvironment, ProfitTask
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+PYLON_DATA_DIR = os.path.join(os.path.dirname(pylon.__file__), "test", "data")
+PYRETO_DATA_DIR = os.path.join(os.path.dirname(__file__), "test", "data")
+
+#: Discrete percentage markups available to each agent.
+MARKUPS = (0.0, 10.0, 20.0, 30.0)
+
+#------------------------------------------------------------------------------
+#  Scenarios:
+#------------------------------------------------------------------------------
+
+def get_t_auction_case():
+    """ Returns the 30 bus case used by the auction tests.
+    """
+    return Case.load(os.path.join(PYRETO_DATA_DIR, "t_auction_case.pkl"))
+
+
+def get_case6ww():
+    """ Returns the 6 bus case from Wood & Wollenberg PG&C, with the costs
+    and limits used in the thesis experiments.
+    """
+    case = Case.load(os.path.join(PYLON_DATA_DIR, "case6ww", "case6ww.pkl"))
+
+    for g, c1, p_max in zip(case.generators, [4.0, 3.0, 6.0],
+                            [110.0, 110.0, 220.0]):
+        g.p_cost = (0.0, c1, 200.0)
+        g.p_min = 0.0
+        g.p_max = p_max
+
+    return case
+
+
+def get_case24_ieee_rts():
+    """ Returns the 24 bus IEEE Reliability Test System.
+    """
+    return Case.load(os.path.join(PYLON_DATA_DIR, "case24_ieee_rts",
+                                  "case24_ieee_rts.pkl"))
+
+
+#: Functions returning the case of each standard scenario.
+SCENARIOS = {"t_auction_case": get_t_auction_case,
+             "case6ww": get_case6ww,
+             "case24_ieee_rts": get_case24_ieee_rts}
+
+#------------------------------------------------------------------------------
+#  "MarketBenchmark" class:
+#------------------------------------------------------------------------------
+
+class MarketBenchmark(object):
+    """ Times the stages of a discrete market experiment separately: market
+    clearing (OPF and auction), the auction alone, environment stepping and
+    learner updates.
+
+    Each generator is endowed to a Roth-Erev agent that chooses a markup on
+    its marginal cost. Actions are drawn at random from a seeded generator,
+    so that every revision is timed on the same sequence of offers.
+    """
+
+    def __init__(self, name, repeats=100, seed=0):
+        """ Initialises a new MarketBenchmark instance.
+
+        @param name: Name of a scenario in SCENARIOS.
+        @param repeats: Number of times each stage is timed.
+        """
+        #: Name of the scenario.
+        self.name = name
+
+        #: Number of times each stage is timed.
+        self.repeats = repeats
+
+        #: Seed of the random actions.
+        self.seed = seed
+
+
+    def run(self):
+        """ Times each stage of the scenario.
+
+        @rtype: dict
+        @return: Timing statistics of each stage, or the error raised.
+        """
+        results = {}
+        for stage in ["smart_market", "auction", "environment", "learner"]:
+            random.seed(self.seed)
+            try:
+                results[stage] = getattr(self, "time_" + stage)()
+            except Exception, e:
+                logger.error("Benchmark [%s: %s] failed: %s" %
+                             (self.name, stage, e))
+                results[stage] = {"error": "%s: %s" % (type(e).__name__, e)}
+
+        return results
+
+
+    def setup(self):
+        """ Returns a new market and a task and agent for each generator.
+        """
+        case = SCENARIOS[self.name]()
+        market = SmartMarket(case, priceCap=1000.0)
+
+        tasks, agents = [], []
+        for g in case.generators:
+            if g.is_load:
+                continue
+            env = MarketEnvironment([g], market, markups=MARKUPS)
+            tasks.append(ProfitTask(env, maxSteps=self.repeats))
+
+            module = ActionValueTable(env.numStates, len(env._allActions))
+            module.initialize(1.0)
+            agents.append(LearningAgent(module, RothErev()))
+
+        return market, tasks, agents
+
+
+    def time_smart_market(self):
+        """ Times clearing the market, including the OPF.
+        """
+        market, tasks, _ = self.setup()
+
+        durations = []
+        for _ in range(self.repeats):
+            self._offer(market, tasks)
+
+            t0 = time.time()
+            market.run()
+            durations.append(time.time() - t0)
+
+        return statistics(durations)
+
+
+    def time_auction(self):
+        """ Times clearing offers/bids given the OPF solution, excluding the
+        OPF.
+        """
+        market, tasks, _ = self.setup()
+
+        durations = []
+        for _ in range(self.repeats):
+            self._offer(market, tasks)
+            market.prepare()
+            solution = market.solveOPF()
+
+            t0 = time.time()
+            market.finish(solution)
+            durations.append(time.time() - t0)
+
+        return statistics(durations)
+
+
+    def time_environment(self):
+        """ Times observing, acting and rewarding each agent, excluding
+        market clearing.
+        """
+        market, tasks, _ = self.setup()
+
+        durations = []
+        for _ in range(self.repeats):
+            actions = self._actions(tasks)
+
+            t0 = time.time()
+            market.reset()
+            for task, action in zip(tasks, actions):
+                task.getObservation()
+                task.performAction(action)
+            for task in tasks:
+                task.getReward()
+            durations.append(time.time() - t0)
+
+        return statistics(durations)
+
+
+    def time_learner(self):
+        """ Times a learning step of each agent on a history of random
+        actions and rewards.
+        """
+        _, tasks, agents = self.setup()
+
+        durations = []
+        for _ in range(self.repeats):
+            for task, agent in zip(tasks, agents):
+                agent.history.clear()
+                actions = random.randint(len(task.env._allActions),
+                                         size=self.repeats)
+                for action in actions:
+                    agent.history.addSample([0], [action], [random.rand()])
+
+            t0 = time.time()
+            for agent in agents:
+                agent.learn()
+            durations.append(time.time() - t0)
+
+        return statistics(durations)
+
+
+    def _actions(self, tasks):
+        return [array([random.randint(len(t.env._allActions))]) for t in tasks]
+
+
+    def _offer(self, market, tasks):
+        """ Submits random offers for each agent.
+        """
+        market.reset()
+        for task, action in zip(tasks, self._actions(tasks)):
+            task.performAction(action)
+
+#------------------------------------------------------------------------------
+#  Benchmark results:
+#------------------------------------------------------------------------------
+
+def run_benchmarks(scenarios=None, repeats=100, seed=0):
+    """ Runs the benchmarks of the given scenarios, or of all scenarios if
+    None, and returns a dict of the results and of the environment.
+    """
+    scenarios = sorted(SCENARIOS.keys()) if scenarios is None else scenarios
+
+    results = {}
+    for name in scenarios:
+        logger.info("Benchmarking scenario [%s]." % name)
+        results[name] = MarketBenchmark(name, repeats, seed).run()
+
+    return environment(numpy=numpy.__version__, scipy=scipy.__version__,
+                       repeats=repeats, seed=seed, results=results)
+
+#------------------------------------------------------------------------------
+#  Standalone call:
+#------------------------------------------------------------------------------
+
+def main():
+    """ Parses the command line and writes the benchmark results as JSON.
+    """
+    parser = option_parser(repeats=100)
+
+    parser.add_option("-s", "--scenario", dest="scenarios", action="append",
+        metavar="NAME", help="Benchmark the named scenario (%s). May be "
+        "given more than once. All scenarios are run by default." %
+        ", ".join(sorted(SCENARIOS.keys())))
+
+    parser.add_option("--seed", dest="seed", type="int", default=0,
+        help="Seed of the random actions.")
+
+    (options, args) = parser.parse_args()
+
+    for name in options.scenarios or []:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario: %s" % name)
+
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+
+    write_results(run_benchmarks(options.scenarios, options.repeats,
+                                 options.seed), options.output)
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF -------------------------------------------------------------------------
@@ -28,11 +28,11 @@ from itertools import cycle
 
 from scipy import array
 
+from numpy import random, flatnonzero
+
 #from pybrain.rl.experiments import Experiment, EpisodicExperiment
 #from pybrain.rl.agents.optimization import OptimizationAgent
 
-from pyreto.util import weighted_choice
-
 #------------------------------------------------------------------------------
 #  Logging:
 #------------------------------------------------------------------------------
@@ -52,7 +52,8 @@ class MarketExperiment(object):
     #  "object" interface:
     #--------------------------------------------------------------------------
 
-    def __init__(self, tasks, agents, market, profile=None,branchOutages=None):
+    def __init__(self, tasks, agents, market, profile=None,branchOutages=None,
+                 recorder=None):
         """ Initialises the market experiment.
         """
         super(MarketExperiment, self).__init__()
@@ -67,6 +68,10 @@ class MarketExperiment(object):
         #: Market to which agents submit offers/bids.
         self.market = market
 
+        #: Optional recorder of the outcome of each period (See
+        #: pyreto.recorder.MarketRecorder).
+        self.recorder = recorder
+
         #: Load profile.  Either a 1D array used for all episodes or a 2D array
         #  where the number of rows equals the number of episodes.
 #        self._profile = None
@@ -76,6 +81,12 @@ class MarketExperiment(object):
         #: List of branch outage probabilities.
         self.branchOutages = branchOutages
 
+        #: Branch online status for each of the sampled periods.
+        self._outages = None
+
+        #: Index of the next period of the sampled outages.
+        self._outageIdx = 0
+
         self.stepid = 0
 
 #        self.do_optimisation = {}
@@ -130,17 +141,36 @@ class MarketExperiment(object):
 #    profile = property(getProfile, setProfile)
 
 
+    def sampleOutages(self, periods):
+        """ Draws the branch online status for the given number of periods,
+            returning a boolean array with a row for each period and a column
+            for each branch.
+        """
+        assert len(self.branchOutages) == len(self.market.case.branches)
+
+        rates = array(self.branchOutages, dtype=float)
+
+        return random.random_sample((periods, len(rates))) >= rates
+
+
     def doOutages(self):
         """ Applies branch outtages.
         """
-        assert len(self.branchOutages) == len(self.market.case.branches)
+        if self._outages is None or self._outageIdx >= len(self._outages):
+            periods = max([getattr(t, "maxSteps", 1) for t in self.tasks])
+            self._outages = self.sampleOutages(periods)
+            self._outageIdx = 0
+
+        online = self._outages[self._outageIdx]
+        self._outageIdx += 1
 
-        weights = [[(False, r), (True, 1 - (r))] for r in self.branchOutages]
+        branches = self.market.case.branches
+        for ln, status in zip(branches, online):
+            ln.online = bool(status)
 
-        for i, ln in enumerate(self.market.case.branches):
-            ln.online = weighted_choice(weights[i])
-            if ln.online == False:
-                print "Branch outage [%s] in period %d." %(ln.name,self.stepid)
+        for i in flatnonzero(~online):
+            logger.info("Branch outage [%s] in period %d." %
+                        (branches[i].name, self.stepid))
 
 
     def reset_case(self):
@@ -171,6 +201,12 @@ class MarketExperiment(object):
         """ Do the given numer of episodes, and return the rewards of each
             step as a list.
         """
+        # Draw the outages of all periods up front.
+        if self.branchOutages is not None:
+            periods = max([getattr(t, "maxSteps", 1) for t in self.tasks])
+            self._outages = self.sampleOutages(number * periods)
+            self._outageIdx = 0
+
         for episode in range(number):
             print "Starting episode %d." % episode
 
@@ -196,6 +232,9 @@ class MarketExperiment(object):
                     raise ValueError
                 self._oneInteraction()
 
+        if self.recorder is not None:
+            self.recorder.close()
+
         self.reset_case()
 
     #--------------------------------------------------------------------------
@@ -217,6 +256,7 @@ class MarketExperiment(object):
         self.market.reset()
 
         # Get an action from each agent and perform it.
+        observations, actions = [], []
         for task, agent in zip(self.tasks, self.agents):
 #            if self.do_optimisation[agent]:
 #                raise Exception("When using a black-box learning algorithm, "
@@ -229,14 +269,23 @@ class MarketExperiment(object):
             action = agent.getAction()
             task.performAction(action)
 
+            observations.append(observation)
+            actions.append(action)
+
         # Clear the market.
         self.market.run()
 
         # Reward each agent appropriately.
+        rewards = []
         for task, agent in zip(self.tasks, self.agents):
 #            if not task.isFinished():
             reward = task.getReward()
             agent.giveReward(reward)
+            rewards.append(reward)
+
+        if self.recorder is not None:
+            self.recorder.record(self.market, rewards, observations,
+                                 actions)
 
         # Scale loads.
         c = self._pcycle.next()
@@ -251,6 +300,9 @@ class MarketExperiment(object):
         """
         self.stepid = 0
 
+        if self.recorder is not None:
+            self.recorder.open()
+
         for task, agent in zip(self.tasks, self.agents):
             task.reset()
 
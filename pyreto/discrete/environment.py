@@ -23,12 +23,14 @@
 
 import logging
 
-from scipy import array, linspace, mean, polyval, polyder
+from itertools import product
+
+from scipy import \
+    array, zeros, linspace, mean, polyval, polyder, cumprod, cumsum
 
 from pylon import POLYNOMIAL, PW_LINEAR
 
 from pyreto.smart_market import Offer, Bid
-from pyreto.util import xselections
 
 #------------------------------------------------------------------------------
 #  Logging:
@@ -94,8 +96,12 @@ class MarketEnvironment(object):
         #: The number of discrete states for the environment.
         self.numStates = numStates
 
-        #: List of all markup combinations for all generators.
-        self._allActions = []
+        #: All markup and withhold combinations for all generators.
+        self._allActions = ActionSpace((), (), 0)
+
+        #: Quantity, cumulative quantity and marginal cost of each offer/bid
+        #: of each generator for every combination of its withholds.
+        self._costTable = None
 
         #: List of offers/bids from the previous action used by ProfitTask.
         self._lastAction = []
@@ -135,15 +141,8 @@ class MarketEnvironment(object):
         """
         self._lastAction = []
 
-        # Markups chosen for each generator.
-        actions = self._allActions[action]
-
-        n = self.numOffbids * len(self.generators)
-        markups = actions[:n]
-        withholds = actions[n:]
-
-#        print "ALL ACTIONS:", self._allActions
-#        print "ACTIONS:", markups, withholds
+        # Indexes of the markups and withholds chosen for each offer/bid.
+        markups, withholds = self._allActions.digits(int(action))
 
         self._offbid(markups, withholds)
 
@@ -159,89 +158,117 @@ class MarketEnvironment(object):
     #--------------------------------------------------------------------------
 
     def _offbid(self, markups, withholds):
-        """ Converts arrays of percentage price markups and capacity withholds
-        into offers/bids and submits them to the marketplace.
+        """ Converts the indexes of the percentage price markups and capacity
+        withholds chosen for each offer/bid into offers/bids and submits them
+        to the marketplace.
         """
+        if self._costTable is None:
+            self._costTable = self._getCostTable()
+
+        n = self.numOffbids
+        nw = len(self.withholds)
+
         for i, g in enumerate(self.generators):
-            ratedPMin = self._g0[g]["p_min"]
-            ratedPMax = self._g0[g]["p_max"]
-            margPCost = self._g0[g]["p_cost"]
-            margPCostModel = self._g0[g]["pcost_model"]
+            qty, _, cmarg, costNoLoad = self._costTable[i]
 
-            # Index of the first markup in 'markups' for generator 'i'.
-            k = i * (len(markups) / len(self.generators))
-            # Index of the first withhold in 'withholds' for generator 'i'.
-            kk = i * (len(withholds) / len(self.generators))
+            # Index of the generator's withhold combination.
+            w = 0
+            for wi in withholds[i * n:(i + 1) * n]:
+                w = w * nw + wi
 
-            # Determine the cost at zero output.
-            if margPCostModel == POLYNOMIAL:
-                costNoLoad = margPCost[-1]
-            else:
-                costNoLoad = 0.0
+            # The markups are cumulative to ensure cost function convexity.
+            mks = cumsum([self.markups[mi]
+                          for mi in markups[i * n:(i + 1) * n]])
 
-            # Divide available capacity equally among the offers/bids.
-            if g.is_load:
-                qty = ratedPMin / self.numOffbids
-            else:
-                qty = ratedPMax / self.numOffbids
-
-            # Track the total quantity offered/bid for by the generator.
-            totQty = 0.0
-
-#            p0 = 0.0
-#            c0 = costNoLoad
-            for j in range(self.numOffbids):
-                wh = withholds[kk+j]
-                qty = qty * ((100.0 - wh) / 100.0)
-
-                totQty += qty
-
-                # The markups are cumulative to ensure cost function convexity.
-                mk = sum(markups[k:k + j + 1])
-
-                # Marginal cost (cost function gradient).
-                if margPCostModel == POLYNOMIAL:
-                    cmarg = polyval(polyder(margPCost), totQty)
-                elif margPCostModel == PW_LINEAR:
-                    n_segments = len(margPCost) - 1
-                    for i in range(n_segments):
-                        x1, y1 = margPCost[i]
-                        x2, y2 = margPCost[i + 1]
-                        if x1 <= totQty <= x2:
-                            cmarg = (y2 - y1) / (x2 - x1)
-                    else:
-                        raise ValueError, "Invalid bid quantity [%f]." % totQty
-                else:
-                    raise ValueError
+            for j in range(n):
+                wh = self.withholds[withholds[i * n + j]]
+                mk = mks[j]
 
                 # Markup the marginal cost of the generator.
-                if not g.is_load:
-                    prc = cmarg * ((100.0 + mk) / 100.0)
-                else:
-                    prc = cmarg * ((100.0 + mk) / 100.0)
+                prc = cmarg[w, j] * ((100.0 + mk) / 100.0)
 
                 if not g.is_load:
-                    offer = Offer(g, qty, prc, costNoLoad)
+                    offer = Offer(g, qty[w, j], prc, costNoLoad)
                     self.market.offers.append(offer)
 
                     self._lastAction.append(offer)
 
                     logger.info(
                         "%.2fMW offered at %.2f$/MWh for %s (%.1f%%, %.1f%%)."
-                        % (qty, prc, g.name, mk, wh))
+                        % (qty[w, j], prc, g.name, mk, wh))
                 else:
-                    bid = Bid(g, -qty, prc, costNoLoad)
+                    bid = Bid(g, -qty[w, j], prc, costNoLoad)
                     self.market.bids.append(bid)
 
                     self._lastAction.append(bid)
 
                     logger.info(
                         "%.2f$/MWh bid for %.2fMW for %s (%.1f%%, %.1f%%)."
-                        % (prc, -qty, g.name, mk, wh))
+                        % (prc, -qty[w, j], g.name, mk, wh))
 
         return self._lastAction
 
 
+    def _getCostTable(self):
+        """ Returns, for each generator, the quantity, the total quantity so
+        far and the marginal cost at that quantity of each offer/bid for every
+        combination of withholds, along with the cost at zero output.
+        """
+        n = self.numOffbids
+
+        table = []
+        for g in self.generators:
+            ratedPMin = self._g0[g]["p_min"]
+            ratedPMax = self._g0[g]["p_max"]
+            margPCost = self._g0[g]["p_cost"]
+            margPCostModel = self._g0[g]["pcost_model"]
+
+            # Determine the cost at zero output.
+            if margPCostModel == POLYNOMIAL:
+                costNoLoad = margPCost[-1]
+            else:
+                costNoLoad = 0.0
+
+            # Divide available capacity equally among the offers/bids.
+            if g.is_load:
+                qty0 = ratedPMin / n
+            else:
+                qty0 = ratedPMax / n
+
+            # Withheld fractions compound over the offers/bids.
+            wh = array(list(product(self.withholds, repeat=n)), dtype=float)
+            wh = wh.reshape(len(self.withholds) ** n, n)
+            qty = qty0 * cumprod((100.0 - wh) / 100.0, axis=1)
+            totQty = cumsum(qty, axis=1)
+
+            # Marginal cost (cost function gradient).
+            if margPCostModel == POLYNOMIAL:
+                cmarg = polyval(polyder(margPCost), totQty)
+            elif margPCostModel == PW_LINEAR:
+                cmarg = zeros(totQty.shape)
+                for idx, q in enumerate(totQty.flat):
+                    cmarg.flat[idx] = self._pwlMarginalCost(margPCost, q)
+            else:
+                raise ValueError
+
+            table.append((qty, totQty, cmarg, costNoLoad))
+
+        return table
+
+
+    def _pwlMarginalCost(self, pcost, qty):
+        """ Returns the slope of the piecewise-linear cost function segment
+        containing the given quantity.
+        """
+        for i in range(len(pcost) - 1):
+            x1, y1 = pcost[i]
+            x2, y2 = pcost[i + 1]
+            if x1 <= qty <= x2:
+                return (y2 - y1) / (x2 - x1)
+        else:
+            raise ValueError, "Invalid bid quantity [%f]." % qty
+
+
 #                p1 = totQty
 #                costMarginal = g.total_cost(totQty, pCost, pCostModel)
 #
@@ -343,6 +370,7 @@ class MarketEnvironment(object):
     def _setMarkups(self, markups):
         self._markups = markups
         self._allActions = self._getAllActions(markups, self.withholds)
+        self._costTable = None
 
     markups = property(_getMarkups, _setMarkups)
 
@@ -360,6 +388,7 @@ class MarketEnvironment(object):
     def _setWithholds(self, withholds):
         self._withholds = withholds
         self._allActions = self._getAllActions(self.markups, withholds)
+        self._costTable = None
 
     withholds = property(_getWithholds, _setWithholds)
 
@@ -376,6 +405,7 @@ class MarketEnvironment(object):
     def _setNumOffbids(self, numOffbids):
         self._numOffbids = numOffbids
         self._allActions = self._getAllActions(self.markups, self.withholds)
+        self._costTable = None
 
     numOffbids = property(_getNumOffbids, _setNumOffbids)
 
@@ -411,6 +441,7 @@ class MarketEnvironment(object):
             g0[g]["shutdown"] = g.c_shutdown
         self._g0 = g0
         self._generators = generators
+        self._costTable = None
 
     generators = property(_getGenerators, _setGenerators)
 
@@ -420,12 +451,74 @@ class MarketEnvironment(object):
 
     def _getAllActions(self, markups, withholds):
         n = self.numOffbids * len(self.generators)
-        a = []
-        for w in xselections(withholds, n):
-            for m in xselections(markups, n):
-                m.extend(w)
-                a.append(m)
 
-        return a
+        return ActionSpace(markups, withholds, n)
+
+#------------------------------------------------------------------------------
+#  "ActionSpace" class:
+#------------------------------------------------------------------------------
+
+class ActionSpace(object):
+    """ Defines the sequence of all combinations of markups and withholds for
+    a number of offers/bids. Each action is a list of n markups followed by n
+    withholds. Actions are decoded from their index as mixed-radix numbers,
+    so the space is never enumerated.
+
+    The order is that of enumerating the withhold combinations in the outer
+    loop and the markup combinations in the inner loop, with the first
+    offer/bid as the most significant digit.
+    """
+
+    def __init__(self, markups, withholds, n):
+        """ Initialises a new ActionSpace instance.
+        """
+        #: Percentage markups allowed on each offer/bid price.
+        self.markups = markups
+
+        #: Percentage withholds of capacity allowed with each offer/bid.
+        self.withholds = withholds
+
+        #: Number of offers/bids.
+        self.n = n
+
+
+    def __len__(self):
+        return (len(self.markups) ** self.n) * (len(self.withholds) ** self.n)
+
+
+    def __getitem__(self, index):
+        markups, withholds = self.digits(index)
+
+        return [self.markups[i] for i in markups] + \
+            [self.withholds[i] for i in withholds]
+
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+
+    def digits(self, index):
+        """ Returns the indexes of the markup and withhold of each offer/bid
+        for the action with the given index.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError, "Action index out of range [%d]." % index
+
+        markups = self._digits(index % (len(self.markups) ** self.n),
+                               len(self.markups))
+        withholds = self._digits(index // (len(self.markups) ** self.n),
+                                 len(self.withholds))
+
+        return markups, withholds
+
+
+    def _digits(self, index, radix):
+        digits = [0] * self.n
+        for i in range(self.n - 1, -1, -1):
+            index, digits[i] = divmod(index, radix)
+        return digits
 
 # EOF -------------------------------------------------------------------------
@@ -43,7 +43,7 @@ class MarketExperiment(object):
     #  "object" interface:
     #--------------------------------------------------------------------------
 
-    def __init__(self, tasks, agents, market):
+    def __init__(self, tasks, agents, market, recorder=None):
         """ Initialises the market experiment.
         """
 #        super(MarketExperiment, self).__init__(None, None)
@@ -59,6 +59,10 @@ class MarketExperiment(object):
         #: Market to which agents submit offers/bids.
         self.market = market
 
+        #: Optional recorder of the outcome of each period (See
+        #: pyreto.recorder.MarketRecorder).
+        self.recorder = recorder
+
         #----------------------------------------------------------------------
         #  "Experiment" interface:
         #----------------------------------------------------------------------
@@ -77,6 +81,9 @@ class MarketExperiment(object):
         for _ in range(number):
             self._oneInteraction()
 
+        if self.recorder is not None:
+            self.recorder.close()
+
         elapsed = time.time() - t0
         logger.info("%d interactions executed in %.3fs." % (number, elapsed))
 
@@ -94,6 +101,7 @@ class MarketExperiment(object):
         self.market.reset()
 
         # Get an action from each agent and perform it.
+        observations, actions = [], []
         for task, agent in zip(self.tasks, self.agents):
             observation = task.getObservation()
             agent.integrateObservation(observation)
@@ -101,13 +109,22 @@ class MarketExperiment(object):
             action = agent.getAction()
             task.performAction(action)
 
+            observations.append(observation)
+            actions.append(action)
+
         # Clear the market.
         self.market.run()
 
         # Reward each agent appropriately.
+        rewards = []
         for task, agent in zip(self.tasks, self.agents):
             reward = task.getReward()
             agent.giveReward(reward)
+            rewards.append(reward)
+
+        if self.recorder is not None:
+            self.recorder.record(self.market, rewards, observations,
+                                 actions)
 
         # Instruct each agent to learn from it's actions.
 #        for agent in self.agents:
@@ -121,6 +138,9 @@ class MarketExperiment(object):
         """
         self.stepid = 0
 
+        if self.recorder is not None:
+            self.recorder.open()
+
         for task, agent in zip(self.tasks, self.agents):
             task.env.reset()
 
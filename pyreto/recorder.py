@@ -0,0 +1,248 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a columnar recorder of market experiment data and a reader for
+the recorded data.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import logging
+
+from numpy import array, empty, nan, nanmean, nanstd, nanmin, nanmax
+
+from pylon.io.store import ChannelStore
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "MarketRecorder" class:
+#------------------------------------------------------------------------------
+
+class MarketRecorder(object):
+    """ Records market experiment data for each period to a L{ChannelStore},
+    with a row for each period.
+
+    Rows are buffered and appended to the store a chunk at a time. The
+    channels recorded from a market are the reward of each agent, the cleared
+    price and quantity of each offer/bid and the nodal price at each bus,
+    along with the observation and action of each agent, "state.<i>" and
+    "action.<i>", if given.
+
+    The number of offers/bids may change from period to period. Rows are
+    padded with NaN to the widest row so far and the channel is widened
+    whenever a wider row is recorded.
+    """
+
+    def __init__(self, path, chunk=1024, renderer=None,
+                 participantRenderers=None, renderInterval=100):
+        """ Initialises a new MarketRecorder instance.
+
+        @param renderer: Optional experiment renderer whose 'updateData'
+            method is passed a list of the recorded observations, actions and
+            rewards of each agent every 'renderInterval' periods (See
+            pyreto.renderer.ExperimentRenderer).
+        @param participantRenderers: Optional list of a renderer for each
+            agent whose 'updateData' method is passed the last observation,
+            action and reward of the agent every 'renderInterval' periods (See
+            pyreto.renderer.ParticipantRenderer).
+        """
+        #: Directory to which the channels are written.
+        self.path = path
+
+        #: Number of rows buffered before being written to file.
+        self.chunk = chunk
+
+        #: Optional live renderer of the recorded data.
+        self.renderer = renderer
+
+        #: Optional live renderers of each agent's data.
+        self.participantRenderers = participantRenderers
+
+        #: Number of periods between updates of the renderers.
+        self.renderInterval = renderInterval
+
+        #: Number of recorded periods.
+        self.count = 0
+
+        #: Buffered rows of each channel.
+        self._buffer = {}
+
+        #: Store of the written rows.
+        self._store = None
+
+
+    def open(self):
+        """ Discards any recorded data.
+        """
+        self.count = 0
+        self._buffer = {}
+        self._store = None
+
+
+    def record(self, market, rewards, observations=None, actions=None):
+        """ Records the outcome of a market period and the agents' rewards,
+        observations and actions.
+        """
+        offbids = market.offers + market.bids
+
+        values = {"reward": rewards,
+                  "price": [ob.clearedPrice for ob in offbids],
+                  "quantity": [ob.clearedQuantity for ob in offbids],
+                  "lmbda": [b.p_lmbda for b in market.case.buses]}
+
+        for i, obs in enumerate(observations or []):
+            values["state.%d" % i] = obs
+        for i, action in enumerate(actions or []):
+            values["action.%d" % i] = action
+
+        self.append(values)
+
+
+    def append(self, values):
+        """ Appends a row to each channel, given a dict of the values.
+
+        @raise ValueError: If a channel is not recorded in every period.
+        """
+        values = dict([(name, array(value, dtype=float).flatten())
+                       for name, value in values.iteritems()])
+
+        if self._store is None:
+            self._init_channels(values)
+        elif set(values.keys()) != set(self._buffer.keys()):
+            raise ValueError("Channels must be recorded in every period.")
+
+        for name, value in values.iteritems():
+            width = self._store._header[name][1][0]
+            if len(value) > width:
+                self._widen(name, len(value))
+            elif len(value) < width:
+                row = empty(width)
+                row.fill(nan)
+                row[:len(value)] = value
+                value = row
+            self._buffer[name].append(value)
+        self.count += 1
+
+        if len(self._buffer.values()[0]) >= self.chunk:
+            self.flush()
+
+        if self.count % self.renderInterval == 0:
+            self.render(values)
+
+
+    def render(self, values):
+        """ Updates the renderers, given the values of the last period.
+        """
+        if self.renderer is not None:
+            data = self.data
+            agents = range(data["reward"].shape[1])
+            self.renderer.updateData([(data.get("state.%d" % i),
+                                       data.get("action.%d" % i),
+                                       data["reward"][:, i]) for i in agents])
+
+        for i, renderer in enumerate(self.participantRenderers or []):
+            renderer.updateData(values.get("state.%d" % i),
+                                values.get("action.%d" % i),
+                                values["reward"][i])
+
+
+    @property
+    def data(self):
+        """ A dict of the recorded rows of each channel.
+        """
+        if self._store is None:
+            return {}
+        self.flush()
+        return dict([(name, self._store.channel(name))
+                     for name in self._store.channels])
+
+
+    def flush(self):
+        """ Writes the buffered rows to file.
+        """
+        if self._store is None or not self._buffer.values()[0]:
+            return
+
+        self._store.append(self._buffer)
+        self._buffer = dict([(name, []) for name in self._buffer])
+
+
+    def close(self):
+        """ Writes any buffered rows to file.
+        """
+        self.flush()
+
+
+    def _init_channels(self, values):
+        """ Creates a store of the channels, replacing the output of any
+        previous experiment.
+        """
+        header = {}
+        for name, value in values.iteritems():
+            header[name] = (float, value.shape)
+            self._buffer[name] = []
+
+        self._store = ChannelStore.create(self.path, header)
+
+
+    def _widen(self, name, width):
+        """ Widens the rows of the named channel, padding them with NaN.
+        """
+        buffered = self._buffer[name]
+        for i, row in enumerate(buffered):
+            buffered[i] = empty(width)
+            buffered[i].fill(nan)
+            buffered[i][:len(row)] = row
+
+        self._store.resize(name, (width,), nan)
+
+#------------------------------------------------------------------------------
+#  "MarketRecord" class:
+#------------------------------------------------------------------------------
+
+class MarketRecord(ChannelStore):
+    """ Reads market experiment data written by L{MarketRecorder}. Columns
+    of offers/bids that were not submitted in a period are NaN.
+
+    Channels are memory-mapped, so only the requested periods are read from
+    disk.
+    """
+
+    def __init__(self, path):
+        """ Initialises a new MarketRecord instance.
+        """
+        super(MarketRecord, self).__init__(path, "r")
+
+
+    def summary(self, name, start=None, stop=None):
+        """ Returns a dict of the mean, standard deviation, minimum and
+        maximum of each column of the named channel over the given periods.
+        """
+        values = self.channel(name)[start:stop]
+
+        # Padding of periods with fewer offers/bids is ignored.
+        return {"mean": nanmean(values, axis=0),
+                "std": nanstd(values, axis=0),
+                "min": nanmin(values, axis=0), "max": nanmax(values, axis=0)}
+
+# EOF -------------------------------------------------------------------------
@@ -49,6 +49,10 @@ University of Liverpool.  For further details see:
 import random
 import scipy
 
+from numpy import \
+    array, zeros, ones, arange, unique, flatnonzero, cumsum, cumprod, \
+    searchsorted, newaxis, r_
+
 from pybrain.rl.learners.valuebased.valuebased import ValueBasedLearner
 #from pybrain.rl.learners.valuebased import ActionValueTable
 from pybrain.rl.explorers.discrete.discrete import DiscreteExplorer
@@ -121,13 +125,14 @@ class RothErev(ValueBasedLearner):
         keep the dataset consistent with the agent's history.
         """
         if self.batchMode:
-            samples = self.dataset
+            states = self.dataset.getField("state").flatten().astype(int)
+            actions = self.dataset.getField("action").flatten().astype(int)
+            rewards = self.dataset.getField("reward").flatten()
+            self._batchUpdatePropensities(states, actions, rewards)
         else:
-            samples = [[self.dataset.getSample()]]
-
-        for seq in samples:
-            for lastState, lastAction, reward in seq:
-                self._updatePropensities(int(lastState), int(lastAction), reward)
+            lastState, lastAction, reward = self.dataset.getSample()
+            self._updatePropensities(int(lastState), int(lastAction),
+                                     float(reward))
 
     #--------------------------------------------------------------------------
     #  RothErev interface:
@@ -145,23 +150,56 @@ class RothErev(ValueBasedLearner):
 
                 q_i = (1-phi) * q_i + E(i, r_j)
         """
-        phi = self.recency
+        propensities = self._propensities()[lastState]
+
+        decay, experience = \
+            self._experiences(array([lastAction]), array([reward]))
+
+        propensities[:] = decay[0] * propensities + experience[0]
+
+
+    def _batchUpdatePropensities(self, states, actions, rewards):
+        """ Updates the propensities for a sequence of (state, action, reward)
+        samples, with the same result as updating for each sample in turn
+        using L{_updatePropensities}.
+
+        Each update is of the form q_t = a_t * q_{t-1} + b_t, so after the
+        last sample for a state the propensities are::
+
+            q_T = prod(a_1..a_T) * q_0 + sum_t prod(a_t+1..a_T) * b_t
+        """
+        table = self._propensities()
+
+        for state in unique(states):
+            idx = flatnonzero(states == state)
+
+            a, b = self._experiences(actions[idx], rewards[idx])
+
+            # Product of the decay factors of all later samples.
+            later = r_[cumprod(a[:0:-1], axis=0)[::-1], ones((1, a.shape[1]))]
 
-        for action in range(self.module.numActions):
-            carryOver = (1 - phi) * self.module.getValue(lastState, action)
-            experience = self._experience(lastState, action, lastAction,reward)
+            table[state] = later[0] * a[0] * table[state] + \
+                (later * b).sum(axis=0)
 
-            self.module.updateValue(lastState, action, carryOver + experience)
 
+    def _propensities(self):
+        """ Returns a view of the module parameters as a table of propensities
+        with a row for each state.
+        """
+        module = self.module
+        return module.params.reshape(module.numRows, module.numColumns)
+
+
+    def _experiences(self, actions, rewards):
+        """ Returns the decay factor applied to the propensity of each action
+        and the experience added to it, for each of the given samples.
 
-    def _experience(self, lastState, action, previousAction, reward):
-        """ This is the standard experience function for the Roth-Erev
-        algorithm. Here propensities for all actions are updated and similarity
-        does not come into play. That is, all action choices are assumed to be
-        equally similar. If the actionIndex points to the action the reward is
-        associated with (usually the last action taken) then simply adjust the
-        weight by the experimentation. Otherwise, adjust the weight by a
-        smaller portion of the reward.
+        This is the standard experience function for the Roth-Erev algorithm.
+        Propensities for all actions are updated and similarity does not come
+        into play. That is, all action choices are assumed to be equally
+        similar. The action the reward is associated with is adjusted by the
+        experimentation. Other actions are adjusted by a smaller portion of
+        the reward.
 
         If j is the index of the last action chosen, r_j is the reward received
         for performing j, i is the current action being updated, n is the size
@@ -172,14 +210,17 @@ class RothErev(ValueBasedLearner):
             E(i, r_j) = |
                         |_ r_j * (e /(n-1))    if i != j
         """
+        n = self.module.numActions
         e = self.experimentation
 
-        if action == previousAction:
-            experience = reward * (1 - e)
-        else:
-            experience = reward * (e / (self.module.numActions - 1))
+        rows = arange(len(actions))
+
+        decay = ones((len(actions), n)) * (1 - self.recency)
+
+        experience = (rewards * (e / (n - 1)))[:, newaxis] * ones(n)
+        experience[rows, actions] = rewards * (1 - e)
 
-        return experience
+        return decay, experience
 
 #------------------------------------------------------------------------------
 #  "VariantRothErev" class:
@@ -199,14 +240,14 @@ class VariantRothErev(RothErev):
     @see L{RothErev} for details on the original Roth-Erev algorithm.
     """
 
-    def _experience(self, previousState, action, previousAction, reward):
-        """ This is an altered version of the experience function for used in
-        the standard Roth-Erev algorithm.  Like in RELearner, propensities for
-        all actions are updated and similarity does not come into play. If the
-        actionIndex points to the action the reward is associated with (usually
-        the last action taken) then simply adjust the weight by the
-        experimentation. Otherwise increase the weight of the action by a small
-        portion of its current propensity.
+    def _experiences(self, actions, rewards):
+        """ Returns the decay factor and experience for each action and sample.
+
+        This is an altered version of the experience function used in the
+        standard Roth-Erev algorithm. The action the reward is associated with
+        is adjusted by the experimentation. Other actions are increased by a
+        small portion of their current propensity, so this experience is
+        returned as part of the decay factor.
 
         If j is the index of the last action chosen, r_j is the reward received
         for performing j, i is the current action being updated, q_i is the
@@ -218,15 +259,18 @@ class VariantRothErev(RothErev):
             E(i, r_j) = |
                         |_ q_i * (e /(n-1))    if i != j
         """
+        n = self.module.numActions
         e = self.experimentation
 
-        if action == previousAction:
-            experience = reward * (1 - e)
-        else:
-            propensity = self.module.getValue(previousState, action)
-            experience = propensity * (e / (self.module.numActions - 1))
+        rows = arange(len(actions))
+
+        decay = ones((len(actions), n)) * (1 - self.recency + e / (n - 1))
+        decay[rows, actions] = 1 - self.recency
 
-        return experience
+        experience = zeros((len(actions), n))
+        experience[rows, actions] = rewards * (1 - e)
+
+        return decay, experience
 
 #------------------------------------------------------------------------------
 #  "PropensityTable" class:
@@ -258,8 +302,7 @@ class ProportionalExplorer(DiscreteExplorer):
 
         propensities = self.module.getActionValues(0)
 
-        summedProps = sum(propensities)
-        probabilities = propensities / summedProps
+        probabilities = propensities / propensities.sum()
 
         action = eventGenerator(probabilities)
 #        action = drawIndex(probabilities)
@@ -271,13 +314,12 @@ class ProportionalExplorer(DiscreteExplorer):
 #------------------------------------------------------------------------------
 
 def eventGenerator(distrib):
-    eventIndex = 0
+    """ Returns the index of an event drawn from the given discrete
+    probability distribution.
+    """
     randValue = random.random()
+    eventIndex = searchsorted(cumsum(distrib), randValue)
 
-    while (randValue > 0.0) and (eventIndex < len(distrib)):
-        randValue -= distrib[eventIndex]
-        eventIndex += 1
-
-    return eventIndex - 1
+    return min(eventIndex, len(distrib) - 1)
 
 # EOF -------------------------------------------------------------------------
@@ -0,0 +1,242 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a runner for executing independent market experiments, such as
+parameter sweeps over learners, markups and seeds, across a pool of
+processes.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import copy
+import time
+import bisect
+import random
+import logging
+
+from multiprocessing import Pool
+
+from numpy import array, r_
+from numpy import random as nprandom
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "ExperimentRunner" class:
+#------------------------------------------------------------------------------
+
+class ExperimentRunner(object):
+    """ Runs independent market experiments across a pool of processes.
+
+    Each run creates its own experiment, and hence its own case and market,
+    either by calling a factory or by deep-copying a template experiment, so
+    runs share no mutable state. The random number generators are seeded
+    deterministically for each run, so results do not depend on the number
+    of processes or on the order in which runs complete.
+    """
+
+    def __init__(self, factory, configs=None, seeds=1, roleouts=1,
+                 episodes=1, seed=0, processes=None):
+        """ Initialises a new ExperimentRunner instance.
+
+        @param factory: Callable returning a new experiment, given the
+            keyword arguments of a configuration, or an experiment to be
+            deep-copied for each run.
+        @param configs: List of keyword argument dictionaries, one for each
+            point of the sweep. A single empty configuration is used if None.
+        @param seeds: Number of runs of each configuration, each with a
+            different seed.
+        """
+        #: Experiment factory or template experiment.
+        self.factory = factory
+
+        #: Keyword arguments passed to the factory for each configuration.
+        self.configs = [{}] if configs is None else configs
+
+        #: Number of differently seeded runs of each configuration.
+        self.seeds = seeds
+
+        #: Number of learning steps of each run. Agents learn from their
+        #: history and are reset after each roleout.
+        self.roleouts = roleouts
+
+        #: Number of episodes (interactions for discrete experiments) per
+        #: roleout.
+        self.episodes = episodes
+
+        #: Base seed from which the seed of each run is derived.
+        self.seed = seed
+
+        #: Number of worker processes. Defaults to the number of CPUs. If 1,
+        #: the runs are executed in this process.
+        self.processes = processes
+
+
+    def run(self):
+        """ Executes all runs and gathers the results.
+
+        @rtype: ExperimentResults
+        @return: Actions and rewards of every run.
+        """
+        t0 = time.time()
+
+        runs = [(c, s) for c in range(len(self.configs))
+                for s in range(self.seeds)]
+
+        if self.processes == 1:
+            results = [self.execute(c, s) for c, s in runs]
+        else:
+            pool = Pool(self.processes, _init_runner, (self,))
+            try:
+                results = pool.map(_run_experiment, runs)
+            finally:
+                pool.close()
+                pool.join()
+
+        store = ExperimentResults(self.configs)
+        for result in results:
+            store.add(result)
+
+        logger.info("%d experiment runs completed in %.3fs." %
+                    (len(runs), time.time() - t0))
+
+        return store
+
+
+    def runSeed(self, config, index):
+        """ Returns the seed of the given run of a configuration.
+        """
+        return self.seed + config * self.seeds + index
+
+
+    def execute(self, config, index):
+        """ Executes a single run of a configuration.
+
+        @rtype: dict
+        @return: The configuration and seed indexes, the seed, and the
+            actions and rewards of each agent for every interaction.
+        """
+        seed = self.runSeed(config, index)
+        random.seed(seed)
+        nprandom.seed(seed)
+
+        if callable(self.factory):
+            experiment = self.factory(**self.configs[config])
+        else:
+            experiment = copy.deepcopy(self.factory)
+
+        na = len(experiment.agents)
+        actions = [[] for _ in range(na)]
+        rewards = [[] for _ in range(na)]
+
+        for _ in range(self.roleouts):
+            if hasattr(experiment, "doEpisodes"):
+                experiment.doEpisodes(self.episodes)
+            else:
+                experiment.doInteractions(self.episodes)
+
+            for i, agent in enumerate(experiment.agents):
+                actions[i].append(array(agent.history["action"]))
+                rewards[i].append(array(agent.history["reward"]).flatten())
+
+                agent.learn()
+                agent.reset()
+
+        return {"config": config, "index": index, "seed": seed,
+                "action": array([r_[tuple(a)] for a in actions]),
+                "reward": array([r_[tuple(r)] for r in rewards])}
+
+#------------------------------------------------------------------------------
+#  Experiment runner worker:
+#------------------------------------------------------------------------------
+
+#: Experiment runner of a worker process.
+_runner = None
+
+def _init_runner(runner):
+    """ Initialises a worker process with the runner whose runs it executes.
+    """
+    global _runner
+    _runner = runner
+
+
+def _run_experiment(run):
+    """ Executes the given run, a tuple of configuration and seed indexes,
+    of the current runner.
+    """
+    config, index = run
+    return _runner.execute(config, index)
+
+#------------------------------------------------------------------------------
+#  "ExperimentResults" class:
+#------------------------------------------------------------------------------
+
+class ExperimentResults(object):
+    """ Stores the actions and rewards of the runs of an experiment sweep.
+    """
+
+    def __init__(self, configs):
+        """ Initialises a new ExperimentResults instance.
+        """
+        #: Keyword arguments of each configuration.
+        self.configs = configs
+
+        #: Results of each run, in order of configuration and seed.
+        self.runs = []
+
+        #: Configuration and seed indexes of each run.
+        self._keys = []
+
+
+    def add(self, result):
+        """ Adds the result of a run to the store, in order of configuration
+        and seed.
+        """
+        key = (result["config"], result["index"])
+        i = bisect.bisect(self._keys, key)
+        self._keys.insert(i, key)
+        self.runs.insert(i, result)
+
+
+    def getRuns(self, config=None):
+        """ Returns the results of all runs of the given configuration, or of
+        all configurations if None.
+        """
+        if config is None:
+            return list(self.runs)
+        return [r for r in self.runs if r["config"] == config]
+
+
+    def getActions(self, config=None):
+        """ Returns an array of the actions of each run, agent and
+        interaction.
+        """
+        return array([r["action"] for r in self.getRuns(config)])
+
+
+    def getRewards(self, config=None):
+        """ Returns an array of the rewards of each run, agent and
+        interaction.
+        """
+        return array([r["reward"] for r in self.getRuns(config)])
+
+# EOF -------------------------------------------------------------------------
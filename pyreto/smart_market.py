@@ -24,7 +24,11 @@
 import time
 import logging
 
-from pylon import UDOPF, OPF #@UnusedImport
+from collections import OrderedDict
+
+from numpy import array, dot
+
+from pylon import UDOPF, OPF, PersistentDCOPF #@UnusedImport
 
 from auction import Auction, FIRST_PRICE, DISCRIMINATIVE
 
@@ -48,7 +52,8 @@ class SmartMarket(object):
 
     def __init__(self, case, offers=None, bids=None, limits=None,
                  locationalAdjustment="dc", auctionType=FIRST_PRICE,
-                 priceCap=100.0, period=1.0, decommit=False):
+                 priceCap=100.0, period=1.0, decommit=False, persistent=True,
+                 cache=None):
         """ Initialises a new SmartMarket instance.
         """
         #: Power system case.
@@ -106,9 +111,25 @@ class SmartMarket(object):
         #: Should the unit decommitment algorithm be used?
         self.decommit = decommit
 
+        #: Should the DC OPF model be reused between periods, rebuilding only
+        #: the parts that depend on the offers/bids and demand?
+        self.persistent = persistent
+
+        #: DC OPF reused between periods.
+        self._opf = None
+
+        #: Optional cache of market outcomes (See MarketCache). The cache
+        #: assumes that the auction type, price cap and limits are not
+        #: changed between periods.
+        self.cache = cache
+
         #: Solver solution dictionary.
         self._solution = {"f": 0.0}
 
+        #: Reactive power flag and cache key of the period being cleared.
+        self._haveQ = False
+        self._key = None
+
 
     def reset(self):
         """ Resets the market.
@@ -134,6 +155,65 @@ class SmartMarket(object):
         # Start the clock.
         t0 = time.time()
 
+        # Reuse the outcome of a previous period, if possible.
+        if self.prepare():
+            logger.info("SmartMarket outcome restored from cache in "
+                        "%.3fs" % (time.time() - t0))
+            return self.offers, self.bids
+
+        # Compute dispatch points and LMPs using OPF.
+        solution = self.solveOPF()
+
+        self.finish(solution)
+
+        if solution["converged"]:
+            logger.info("SmartMarket cleared in %.3fs" % (time.time() - t0))
+
+        return self.offers, self.bids
+
+
+    def prepare(self):
+        """ Withholds offers/bids and converts them to the cost functions of
+            the case. If the outcome for the case and offers/bids is cached,
+            it is restored and the market is cleared.
+
+        @rtype: bool
+        @return: True if the market was cleared from the cache. Otherwise,
+            the OPF of the case must be solved and passed to L{finish}.
+        """
+        # Withhold offers/bids and convert them to pwl functions.
+        self._haveQ = self._setup()
+
+        self._key = None
+        if self.cache is not None:
+            self._key = self._cacheKey()
+            return self._restoreOutcome(self._key, self._haveQ)
+
+        return False
+
+
+    def solveOPF(self):
+        """ Computes dispatch points and LMPs of the prepared case using OPF.
+
+        @rtype: dict
+        @return: Solver solution dictionary.
+        """
+        self._runOPF()
+        return self._solution
+
+
+    def finish(self, solution):
+        """ Clears the offers/bids of the prepared case given the solution of
+            its OPF and caches the outcome.
+        """
+        self._solution = solution
+        self._clear(solution["converged"], self._haveQ, self._key)
+
+
+    def _setup(self):
+        """ Prepares the case for the OPF. Returns a flag indicating the
+            existance of offers/bids for reactive power.
+        """
         # Manage reactive power offers/bids.
         haveQ = self._isReactiveMarket()
 
@@ -143,16 +223,18 @@ class SmartMarket(object):
         # Convert offers/bids to pwl functions and update limits.
         self._offbidToCase()
 
-        # Compute dispatch points and LMPs using OPF.
-        success = self._runOPF()
+        return haveQ
 
+
+    def _clear(self, success, haveQ, key=None):
+        """ Clears the offers/bids given the OPF results and stores the
+            outcome in the cache under the given key.
+        """
         if success:
             # Get nodal marginal prices from OPF.
             gteeOfferPrice, gteeBidPrice = self._nodalPrices(haveQ)
             # Determine quantity and price for each offer/bid.
             self._runAuction(gteeOfferPrice, gteeBidPrice, haveQ)
-
-            logger.info("SmartMarket cleared in %.3fs" % (time.time() - t0))
         else:
             for offbid in self.offers + self.bids:
                 offbid.clearedQuantity = 0.0
@@ -163,7 +245,8 @@ class SmartMarket(object):
 
             logger.error("Non-convergent market OPF. Blackout!")
 
-        return self.offers, self.bids
+        if key is not None:
+            self.cache.store(key, self._outcome())
 
 
     def _isReactiveMarket(self):
@@ -268,6 +351,10 @@ class SmartMarket(object):
         """
         if self.decommit:
             solver = UDOPF(self.case, dc=(self.locationalAdjustment == "dc"))
+        elif self.locationalAdjustment == "dc" and self.persistent:
+            if self._opf is None or self._opf.case is not self.case:
+                self._opf = PersistentDCOPF(self.case)
+            solver = self._opf
         elif self.locationalAdjustment == "dc":
             solver = OPF(self.case, dc=True)
         else:
@@ -349,6 +436,225 @@ class SmartMarket(object):
                                 gteeOfferPrice, gteeBidPrice, self.limits)
             qAuction.run()
 
+
+    def _cacheKey(self):
+        """ Returns a key for the market outcome, composed of the demand
+            vector, the offers/bids and the topology.
+        """
+        case = self.case
+        gIdx = dict([(id(g), i) for i, g in enumerate(case.generators)])
+
+        demand = tuple([b.p_demand for b in case.buses] +
+                       [b.q_demand for b in case.buses])
+
+        offbids = tuple([tuple([(gIdx[id(ob.generator)], ob.quantity,
+                                 ob.price, ob.noLoadCost, ob.reactive,
+                                 ob.withheld) for ob in offbids])
+                         for offbids in (self.offers, self.bids)])
+
+        topology = (tuple([l.online for l in case.branches]),
+                    tuple([g.online for g in case.generators]))
+
+        return demand, offbids, topology
+
+
+    def _outcome(self):
+        """ Returns a snapshot of the OPF results and the cleared offers/bids.
+        """
+        case = self.case
+        return {"generators": array([[getattr(g, a) for a in GENERATOR_ATTRS]
+                                     for g in case.generators]),
+                "buses": array([[getattr(b, a) for a in BUS_ATTRS]
+                                for b in case.buses]),
+                "branches": array([[getattr(l, a) for a in BRANCH_ATTRS]
+                                   for l in case.branches]),
+                "online": [g.online for g in case.generators],
+                "offbids": [[getattr(ob, a) for a in OFFBID_ATTRS]
+                            for ob in self.offers + self.bids],
+                "solution": dict(self._solution)}
+
+
+    def _restoreOutcome(self, key, haveQ):
+        """ Restores the outcome for the given key from the cache. An
+            approximate outcome has interpolated OPF results and the offers/bids
+            are cleared against them.
+
+        @rtype: bool
+        @return: True if an outcome was found.
+        """
+        found = self.cache.get(key)
+        if found is None:
+            return False
+        outcome, exact = found
+
+        case = self.case
+        for attrs, objs, values in [
+                (GENERATOR_ATTRS, case.generators, outcome["generators"]),
+                (BUS_ATTRS, case.buses, outcome["buses"]),
+                (BRANCH_ATTRS, case.branches, outcome["branches"])]:
+            for obj, row in zip(objs, values):
+                for a, v in zip(attrs, row):
+                    setattr(obj, a, float(v))
+
+        for g, online in zip(case.generators, outcome["online"]):
+            g.online = online
+
+        self._solution = dict(outcome["solution"])
+
+        if exact:
+            for ob, row in zip(self.offers + self.bids, outcome["offbids"]):
+                for a, v in zip(OFFBID_ATTRS, row):
+                    setattr(ob, a, v)
+        else:
+            gteeOfferPrice, gteeBidPrice = self._nodalPrices(haveQ)
+            self._runAuction(gteeOfferPrice, gteeBidPrice, haveQ)
+
+        return True
+
+#------------------------------------------------------------------------------
+#  "MarketCache" class:
+#------------------------------------------------------------------------------
+
+#: Numeric OPF results stored for each generator, bus and branch.
+GENERATOR_ATTRS = ["p", "q", "mu_pmin", "mu_pmax"]
+BUS_ATTRS = ["p_lmbda", "q_lmbda", "v_magnitude", "v_angle", "mu_vmin",
+             "mu_vmax"]
+BRANCH_ATTRS = ["p_from", "p_to", "q_from", "q_to", "mu_s_from", "mu_s_to",
+                "mu_angmin", "mu_angmax"]
+
+#: Clearing results stored for each offer/bid.
+OFFBID_ATTRS = ["totalQuantity", "lmbda", "withheld", "accepted", "cleared",
+                "clearedQuantity", "clearedPrice"]
+
+class MarketCache(object):
+    """ Memoises smart market outcomes keyed on the demand vector, the
+    offers/bids and the topology, with least recently used eviction.
+
+    In approximate mode, a state with no exact match is interpolated from
+    the cached states with the same offers/bids and topology and a demand
+    vector within the tolerance, weighting each by the inverse of its
+    distance.
+    """
+
+    def __init__(self, maxsize=128, tolerance=0.0):
+        """ Initialises a new MarketCache instance.
+
+        @param maxsize: Maximum number of outcomes stored.
+        @param tolerance: Maximum difference in the demand at any bus [MW]
+            (or [MVAr]) of the neighbouring states from which an outcome may
+            be interpolated. Approximate mode is disabled if zero.
+        """
+        #: Maximum number of outcomes stored.
+        self.maxsize = maxsize
+
+        #: Demand tolerance for approximate outcomes.
+        self.tolerance = tolerance
+
+        #: Outcomes in order of use, least recent first.
+        self._outcomes = OrderedDict()
+
+        #: Number of exact and approximate hits and misses.
+        self.hits = 0
+        self.approximateHits = 0
+        self.misses = 0
+
+        #: Number of outcomes evicted.
+        self.evictions = 0
+
+
+    def __len__(self):
+        return len(self._outcomes)
+
+
+    @property
+    def hitRate(self):
+        """ The fraction of lookups for which an outcome, exact or
+            approximate, was found.
+        """
+        lookups = self.hits + self.approximateHits + self.misses
+        if lookups == 0:
+            return 0.0
+        return (self.hits + self.approximateHits) / float(lookups)
+
+
+    def clear(self):
+        """ Removes all outcomes and resets the statistics.
+        """
+        self._outcomes.clear()
+        self.hits = self.approximateHits = self.misses = self.evictions = 0
+
+
+    def get(self, key):
+        """ Returns the outcome for the given key.
+
+        @rtype: tuple
+        @return: The outcome and a flag indicating an exact match, or None.
+        """
+        if key in self._outcomes:
+            # Mark as most recently used.
+            outcome = self._outcomes.pop(key)
+            self._outcomes[key] = outcome
+            self.hits += 1
+            return outcome, True
+
+        if self.tolerance > 0.0:
+            outcome = self._interpolate(key)
+            if outcome is not None:
+                self.approximateHits += 1
+                return outcome, False
+
+        self.misses += 1
+        return None
+
+
+    def store(self, key, outcome):
+        """ Stores the outcome for the given key, evicting the least
+            recently used outcome if the cache is full.
+        """
+        self._outcomes.pop(key, None)
+        self._outcomes[key] = outcome
+
+        while len(self._outcomes) > self.maxsize:
+            self._outcomes.popitem(last=False)
+            self.evictions += 1
+
+
+    def _interpolate(self, key):
+        """ Returns an outcome interpolated from the converged neighbouring
+            states of the given key, or None if there are none.
+        """
+        demand = array(key[0])
+
+        neighbours = []
+        for k, outcome in self._outcomes.iteritems():
+            if k[1:] != key[1:] or not outcome["solution"].get("converged"):
+                continue
+            distance = abs(array(k[0]) - demand).max()
+            if distance <= self.tolerance:
+                neighbours.append((distance, outcome))
+
+        if not neighbours:
+            return None
+
+        neighbours.sort(key=lambda n: n[0])
+        nearest = neighbours[0][1]
+
+        weights = array([1.0 / d for d, _ in neighbours])
+        weights /= weights.sum()
+
+        interpolated = dict(nearest)
+        for name in ["generators", "buses", "branches"]:
+            values = array([o[name] for _, o in neighbours])
+            interpolated[name] = dot(weights, values.reshape(len(values), -1)
+                                     ).reshape(values.shape[1:])
+
+        solution = dict(nearest["solution"])
+        solution["f"] = dot(weights, [o["solution"]["f"]
+                                      for _, o in neighbours])
+        interpolated["solution"] = solution
+
+        return interpolated
+
 #------------------------------------------------------------------------------
 #  "_OfferBid" class:
 #------------------------------------------------------------------------------
@@ -0,0 +1,108 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the discrete market environment.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from pyreto.util import xselections
+from pyreto.discrete.environment import MarketEnvironment, ActionSpace
+
+#------------------------------------------------------------------------------
+#  "ActionSpaceTest" class:
+#------------------------------------------------------------------------------
+
+class ActionSpaceTest(unittest.TestCase):
+    """ Defines a test case for the space of discrete market actions.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.markups = [0.0, 10.0, 20.0]
+        self.withholds = [0.0, 50.0]
+        self.space = ActionSpace(self.markups, self.withholds, 3)
+
+
+    def testOrder(self):
+        """ Test that actions are in the order of enumerating the selections
+        of withholds and markups.
+        """
+        actions = []
+        for w in xselections(self.withholds, 3):
+            for m in xselections(self.markups, 3):
+                m.extend(w)
+                actions.append(m)
+
+        self.assertEqual(len(self.space), 216)
+        self.assertEqual(list(self.space), actions)
+        self.assertEqual(self.space[-1], actions[-1])
+
+
+    def testDigits(self):
+        """ Test decoding the markup and withhold indexes of an action.
+        """
+        self.assertEqual(self.space.digits(0), ([0, 0, 0], [0, 0, 0]))
+        self.assertEqual(self.space.digits(27 * 5 + 9 * 2 + 3 * 0 + 1),
+                         ([2, 0, 1], [1, 0, 1]))
+        self.assertRaises(IndexError, self.space.digits, 216)
+        self.assertRaises(IndexError, self.space.digits, -217)
+
+#------------------------------------------------------------------------------
+#  "PWLMarginalCostTest" class:
+#------------------------------------------------------------------------------
+
+class PWLMarginalCostTest(unittest.TestCase):
+    """ Defines a test case for the marginal cost of piecewise-linear cost
+    functions.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.env = MarketEnvironment.__new__(MarketEnvironment)
+        self.pcost = [(0.0, 0.0), (40.0, 400.0), (80.0, 1200.0),
+                      (100.0, 1800.0)]
+
+
+    def testMarginalCost(self):
+        """ Test the slope of the segment containing each quantity.
+        """
+        for qty, cost in [(0.0, 10.0), (20.0, 10.0), (40.0, 10.0),
+                          (60.0, 20.0), (80.0, 20.0), (90.0, 30.0),
+                          (100.0, 30.0)]:
+            self.assertAlmostEqual(self.env._pwlMarginalCost(self.pcost, qty),
+                                   cost, 12)
+
+
+    def testInvalidQuantity(self):
+        """ Test quantities outside of the cost function.
+        """
+        self.assertRaises(ValueError, self.env._pwlMarginalCost, self.pcost,
+                          100.5)
+        self.assertRaises(ValueError, self.env._pwlMarginalCost, self.pcost,
+                          -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -27,8 +27,12 @@ import unittest
 
 from os.path import dirname, join
 
+from numpy import array, zeros
+
 from pylon import Case, Bus, Branch, Generator, REFERENCE, PV, OPF
-from pyreto import SmartMarket, Bid, Offer, FIRST_PRICE
+from pyreto import \
+    SmartMarket, MarketCache, Bid, Offer, FIRST_PRICE, DISCRIMINATIVE
+from pyreto.auction import Auction
 
 #------------------------------------------------------------------------------
 #  Constants:
@@ -533,6 +537,215 @@ class DCMarketTestCase(unittest.TestCase):
 #        ]
 
 
+#------------------------------------------------------------------------------
+#  "AuctionTestCase" class:
+#------------------------------------------------------------------------------
+
+class AuctionTestCase(unittest.TestCase):
+    """ Defines a test case for clearing offers/bids given nodal prices and
+    dispatch points.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        bus1 = Bus(type=REFERENCE)
+        g1 = Generator(bus1, p=35.0)
+        g2 = Generator(bus1, p=12.0)
+        vl = Generator(bus1, p=-15.0, p_max=0.0, p_min=-30.0)
+        self.case = Case(buses=[bus1], generators=[g1, g2, vl])
+
+        self.offers = [Offer(g1, 24.0, 50.0),
+                       Offer(g1, 12.0, 20.0),
+                       Offer(g1, 24.0, 60.0),
+                       Offer(g2, 12.0, 20.0),
+                       Offer(g2, 24.0, 70.0)]
+
+        self.bids = [Bid(vl, 10.0, 60.0),
+                     Bid(vl, 10.0, 100.0),
+                     Bid(vl, 10.0, 70.0)]
+
+        for offbid in self.offers + self.bids:
+            g = offbid.generator
+            offbid.lmbda = 55.0
+            offbid.totalQuantity = -g.p if g.is_load else g.p
+
+
+    def testClearQuantities(self):
+        """ Test clearing multi-block offers/bids in price order.
+        """
+        Auction(self.case, self.offers, self.bids, FIRST_PRICE).run()
+
+        places = 4
+        cleared = [23.0, 12.0, 0.0, 12.0, 0.0]
+        for offer, quantity in zip(self.offers, cleared):
+            self.assertAlmostEqual(offer.clearedQuantity, quantity, places)
+            self.assertEqual(offer.accepted, quantity > 0.0)
+
+        cleared = [0.0, 10.0, 5.0]
+        for bid, quantity in zip(self.bids, cleared):
+            self.assertAlmostEqual(bid.clearedQuantity, quantity, places)
+            self.assertEqual(bid.accepted, quantity > 0.0)
+
+
+    def testFirstPrice(self):
+        """ Test guarantees and uniform pricing of a first price auction.
+        """
+        Auction(self.case, self.offers, self.bids, FIRST_PRICE).run()
+
+        places = 4
+        for offbid in self.offers + self.bids:
+            self.assertAlmostEqual(offbid.clearedPrice, 55.0, places)
+
+        # Cleared price below the accepted 50$/MWh offer, made uniform for
+        # all blocks of the generator.
+        for offer in self.offers[:3]:
+            offer.lmbda = 45.0
+        Auction(self.case, self.offers, self.bids, FIRST_PRICE,
+                limits={"maxClearedOffer": 65.0}).run()
+
+        for offer in self.offers[:3]:
+            self.assertAlmostEqual(offer.clearedPrice, 50.0, places)
+        for offer in self.offers[3:]:
+            self.assertAlmostEqual(offer.clearedPrice, 55.0, places)
+
+
+    def testDiscriminative(self):
+        """ Test pricing offers/bids at the offered/bid price.
+        """
+        Auction(self.case, self.offers, self.bids, DISCRIMINATIVE).run()
+
+        for offbid in self.offers + self.bids:
+            self.assertAlmostEqual(offbid.clearedPrice, offbid.price, 4)
+
+
+    def testZeroQuantity(self):
+        """ Test that blocks of zero quantity are not accepted.
+        """
+        g1 = self.case.generators[0]
+        offer = Offer(g1, 0.0, 10.0)
+        offer.lmbda = 55.0
+        offer.totalQuantity = g1.p
+        offers = [offer] + self.offers
+
+        Auction(self.case, offers, self.bids, FIRST_PRICE).run()
+
+        self.assertEqual(offer.clearedQuantity, 0.0)
+        self.assertFalse(offer.accepted)
+        self.assertAlmostEqual(offer.clearedPrice, 55.0, 4)
+        self.assertAlmostEqual(self.offers[0].clearedQuantity, 23.0, 4)
+
+#------------------------------------------------------------------------------
+#  "MarketCacheTestCase" class:
+#------------------------------------------------------------------------------
+
+class MarketCacheTestCase(unittest.TestCase):
+    """ Defines a test case for memoising market outcomes.
+    """
+
+    def outcome(self, demand):
+        """ Returns an outcome with prices and dispatch linear in demand.
+        """
+        return {"generators": array([[demand / 2.0, 0.0, 0.0, 0.0]]),
+                "buses": array([[demand / 10.0, 0.0, 1.0, 0.0, 0.0, 0.0]]),
+                "branches": zeros((0, 8)), "online": [True], "offbids": [],
+                "solution": {"f": demand, "converged": True}}
+
+
+    def testLRU(self):
+        """ Test exact matches, eviction and hit rate.
+        """
+        cache = MarketCache(maxsize=2)
+        for demand in [10.0, 20.0]:
+            cache.store(((demand,), (), ()), self.outcome(demand))
+
+        outcome, exact = cache.get(((10.0,), (), ()))
+        self.assertTrue(exact)
+        self.assertEqual(outcome["solution"]["f"], 10.0)
+
+        # The least recently used outcome is evicted.
+        cache.store(((30.0,), (), ()), self.outcome(30.0))
+        self.assertEqual(cache.get(((20.0,), (), ())), None)
+        self.assertNotEqual(cache.get(((10.0,), (), ())), None)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertAlmostEqual(cache.hitRate, 2.0 / 3.0, 4)
+
+
+    def testApproximate(self):
+        """ Test interpolating from neighbouring states.
+        """
+        cache = MarketCache(tolerance=5.0)
+        for demand in [10.0, 14.0, 20.0]:
+            cache.store(((demand,), (), ()), self.outcome(demand))
+
+        outcome, exact = cache.get(((11.0,), (), ()))
+        self.assertFalse(exact)
+        # Inverse distance weights of 3/4 and 1/4.
+        self.assertAlmostEqual(outcome["buses"][0, 0], 1.1, 4)
+        self.assertAlmostEqual(outcome["generators"][0, 0], 5.5, 4)
+        self.assertAlmostEqual(outcome["solution"]["f"], 11.0, 4)
+
+        # Neighbours must share the offers/bids and topology.
+        self.assertEqual(cache.get(((11.0,), (), (False,))), None)
+        self.assertEqual(cache.get(((30.0,), (), ())), None)
+        self.assertEqual(cache.approximateHits, 1)
+
+
+    def market(self, case, cache):
+        """ Returns a market of new offers/bids for the auction case.
+        """
+        generators = case.generators
+
+        offers = []
+        for i, g in enumerate(generators[:6]):
+            offers.append(Offer(g, 12.0, 20.0))
+            offers.append(Offer(g, 48.0, 40.0 + 2.0 * i))
+
+        bids = []
+        for vl in generators[6:]:
+            bids.append(Bid(vl, 10.0, 100.0))
+            bids.append(Bid(vl, 20.0, 50.0))
+
+        return SmartMarket(case, offers, bids, locationalAdjustment="dc",
+            auctionType=FIRST_PRICE, priceCap=100.0, cache=cache)
+
+
+    def testSmartMarket(self):
+        """ Test restoring the outcome of a period in a smart market.
+        """
+        case = Case.load(DATA_FILE)
+        cache = MarketCache()
+
+        first = self.market(case, cache)
+        first.run()
+        self.assertTrue(first._solution["converged"])
+
+        # The same offers, demand and topology.
+        second = self.market(case, cache)
+        second.run()
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertTrue([offer for offer in second.offers if offer.accepted])
+        for a, b in zip(first.offers + first.bids,
+                        second.offers + second.bids):
+            self.assertEqual(a.clearedQuantity, b.clearedQuantity)
+            self.assertEqual(a.clearedPrice, b.clearedPrice)
+
+        # A change of demand.
+        case.buses[2].p_demand += 5.0
+        self.market(case, cache).run()
+        self.assertEqual(cache.misses, 2)
+
+        # A change of topology.
+        case.branches[0].online = False
+        self.market(case, cache).run()
+        self.assertEqual(cache.misses, 3)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(len(cache), 3)
+
+
 if __name__ == "__main__":
 #    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG,
 #        format="%(levelname)s: %(message)s")
@@ -0,0 +1,116 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for branch outages in continuous market experiments.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import dirname, join
+
+from numpy import random
+
+from pylon import Case
+
+from pyreto.smart_market import SmartMarket
+from pyreto.continuous.experiment import MarketExperiment
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_FILE = join(dirname(__file__), "data", "t_auction_case.pkl")
+
+#------------------------------------------------------------------------------
+#  "PeriodTask" class:
+#------------------------------------------------------------------------------
+
+class PeriodTask(object):
+    """ Defines a task of a number of periods.
+    """
+
+    def __init__(self, maxSteps):
+        self.maxSteps = maxSteps
+
+#------------------------------------------------------------------------------
+#  "OutageTest" class:
+#------------------------------------------------------------------------------
+
+class OutageTest(unittest.TestCase):
+    """ Defines a test case for branch outages in market experiments.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        case = Case.load(DATA_FILE)
+        self.branches = case.branches
+
+        self.rates = [0.0, 1.0, 0.5, 0.1, 0.02]
+        self.rates += [0.0] * (len(self.branches) - len(self.rates))
+
+        self.experiment = MarketExperiment([PeriodTask(4)], [None],
+            SmartMarket(case), branchOutages=self.rates)
+
+        random.seed(5)
+
+
+    def testSampleOutages(self):
+        """ Test that branches are out of service at their outage rates.
+        """
+        online = self.experiment.sampleOutages(20000)
+        self.assertEqual(online.shape, (20000, len(self.branches)))
+
+        self.assertTrue(online[:, 0].all())
+        self.assertFalse(online[:, 1].any())
+
+        rates = 1.0 - online.mean(axis=0)
+        for rate, expected in zip(rates[2:5], self.rates[2:5]):
+            # Within four standard deviations of the expected rate.
+            self.assertTrue(abs(rate - expected) <
+                            4 * (expected * (1 - expected) / 20000) ** 0.5)
+
+
+    def testDoOutages(self):
+        """ Test that outages are sampled for each episode and applied to
+        the branches in turn.
+        """
+        random.seed(5)
+        expected = self.experiment.sampleOutages(4)
+
+        random.seed(5)
+        for k in range(4):
+            self.experiment.doOutages()
+            self.assertEqual([b.online for b in self.branches],
+                             list(expected[k]))
+
+        # Outages are sampled again once the periods are used up.
+        self.experiment.doOutages()
+        self.assertEqual(self.experiment._outageIdx, 1)
+        self.assertEqual([b.online for b in self.branches],
+                         list(self.experiment._outages[0]))
+        self.assertEqual(self.experiment._outages.shape,
+                         (4, len(self.branches)))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
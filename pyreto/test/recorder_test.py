@@ -0,0 +1,197 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for recording market experiment data.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+
+from os.path import dirname, join
+
+from numpy import isnan
+
+from pylon import Case
+
+from pyreto.smart_market import SmartMarket
+from pyreto.discrete import MarketExperiment, MarketEnvironment, ProfitTask
+from pyreto.roth_erev import RothErev
+from pyreto.recorder import MarketRecorder, MarketRecord
+
+from pybrain.rl.agents import LearningAgent
+from pybrain.rl.learners.valuebased import ActionValueTable
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_FILE = join(dirname(__file__), "data", "t_auction_case.pkl")
+
+#------------------------------------------------------------------------------
+#  "Stub" class:
+#------------------------------------------------------------------------------
+
+class Stub(object):
+    """ Defines an object with the given attributes.
+    """
+
+    def __init__(self, **traits):
+        self.__dict__.update(traits)
+
+#------------------------------------------------------------------------------
+#  "Renderer" class:
+#------------------------------------------------------------------------------
+
+class Renderer(object):
+    """ Defines a renderer that keeps the data of each update.
+    """
+
+    def __init__(self):
+        self.updates = []
+
+
+    def updateData(self, *data):
+        self.updates.append(data)
+
+#------------------------------------------------------------------------------
+#  "MarketRecorderTest" class:
+#------------------------------------------------------------------------------
+
+class MarketRecorderTest(unittest.TestCase):
+    """ Defines a test case for recording market experiment data.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.path = tempfile.mkdtemp()
+
+        # Periods with different numbers of offers.
+        self.prices = [[10.0, 20.0], [11.0, 21.0], [12.0, 22.0, 32.0],
+                       [13.0]]
+
+
+    def tearDown(self):
+        """ The test runner will execute this method after each test.
+        """
+        shutil.rmtree(self.path)
+
+
+    def market(self, t):
+        """ Returns a market in the given period.
+        """
+        offers = [Stub(clearedPrice=p, clearedQuantity=10.0 * t)
+                  for p in self.prices[t]]
+        buses = [Stub(p_lmbda=p) for p in [30.0 + t, 40.0 + t]]
+
+        return Stub(offers=offers, bids=[], case=Stub(buses=buses))
+
+
+    def testRoundTrip(self):
+        """ Test that recorded periods are read back, with columns of offers
+        that were not submitted in a period padded with NaN. The price
+        channel is widened after the first chunk is written.
+        """
+        recorder = MarketRecorder(self.path, chunk=2)
+        for t in range(len(self.prices)):
+            recorder.record(self.market(t), [t, -t], [[t, 2.0 * t]], [[t]])
+        recorder.close()
+
+        record = MarketRecord(self.path)
+        self.assertEqual(record.count, 4)
+        self.assertEqual(record.channels, ["action.0", "lmbda", "price",
+                                           "quantity", "reward", "state.0"])
+
+        price = record.channel("price")
+        self.assertEqual(price.shape, (4, 3))
+        for row, prices in zip(price, self.prices):
+            self.assertEqual(list(row[:len(prices)]), prices)
+            self.assertTrue(isnan(row[len(prices):]).all())
+
+        self.assertEqual(record.channel("reward").tolist(),
+                         [[t, -t] for t in range(4)])
+        self.assertEqual(record.channel("state.0")[:, 1].tolist(),
+                         [0.0, 2.0, 4.0, 6.0])
+        self.assertEqual(record.channel("lmbda")[3].tolist(), [33.0, 43.0])
+
+        summary = record.summary("price")
+        self.assertEqual(summary["mean"].tolist(), [11.5, 21.0, 32.0])
+        self.assertEqual(summary["max"].tolist(), [13.0, 22.0, 32.0])
+
+
+    def testRenderers(self):
+        """ Test that the renderers are passed the data of each agent.
+        """
+        renderer, participants = Renderer(), [Renderer(), Renderer()]
+        recorder = MarketRecorder(self.path, renderer=renderer,
+            participantRenderers=participants, renderInterval=2)
+        for t in range(len(self.prices)):
+            recorder.record(self.market(t), [t, -t], [[t], [-t]],
+                            [[1.0], [2.0]])
+
+        self.assertEqual(len(renderer.updates), 2)
+        data, = renderer.updates[-1]
+        self.assertEqual(len(data), 2)
+        state, action, reward = data[1]
+        self.assertEqual(state.tolist(), [[0.0], [-1.0], [-2.0], [-3.0]])
+        self.assertEqual(action.tolist(), [[2.0]] * 4)
+        self.assertEqual(reward.tolist(), [0.0, -1.0, -2.0, -3.0])
+
+        for i, participant in enumerate(participants):
+            self.assertEqual(len(participant.updates), 2)
+            state, action, reward = participant.updates[-1]
+            self.assertEqual(state.tolist(), [3.0 * (1 - 2 * i)])
+            self.assertEqual(action.tolist(), [i + 1.0])
+            self.assertEqual(reward, 3.0 * (1 - 2 * i))
+
+
+    def testExperiment(self):
+        """ Test that the periods of an experiment are written to file.
+        """
+        case = Case.load(DATA_FILE)
+        market = SmartMarket(case, priceCap=100.0)
+        recorder = MarketRecorder(self.path)
+
+        tasks, agents = [], []
+        for g in case.generators:
+            env = MarketEnvironment([g], market, markups=(0.0, 10.0))
+            tasks.append(ProfitTask(env))
+            module = ActionValueTable(env.numStates, len(env._allActions))
+            module.initialize(1.0)
+            agents.append(LearningAgent(module, RothErev()))
+
+        experiment = MarketExperiment(tasks, agents, market, recorder)
+        experiment.doInteractions(3)
+
+        record = MarketRecord(self.path)
+        self.assertEqual(record.count, 3)
+        self.assertEqual(record.channel("reward").shape, (3, len(agents)))
+        self.assertEqual(record.channel("action.0").shape, (3, 1))
+
+        experiment.reset()
+        experiment.doInteractions(2)
+        self.assertEqual(MarketRecord(self.path).count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
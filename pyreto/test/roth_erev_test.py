@@ -0,0 +1,164 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for the Roth-Erev learning methods.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from numpy import random as nprandom
+
+from pybrain.rl.learners.valuebased import ActionValueTable
+
+from pyreto.roth_erev import RothErev, VariantRothErev
+
+#------------------------------------------------------------------------------
+#  Reference experience functions:
+#------------------------------------------------------------------------------
+
+def experience(learner, state, action, lastAction, reward):
+    """ Scalar form of the standard Roth-Erev experience function.
+    """
+    e = learner.experimentation
+
+    if action == lastAction:
+        return reward * (1 - e)
+    else:
+        return reward * (e / (learner.module.numActions - 1))
+
+
+def variantExperience(learner, state, action, lastAction, reward):
+    """ Scalar form of the variant Roth-Erev experience function.
+    """
+    e = learner.experimentation
+
+    if action == lastAction:
+        return reward * (1 - e)
+    else:
+        propensity = learner.module.getValue(state, action)
+        return propensity * (e / (learner.module.numActions - 1))
+
+#------------------------------------------------------------------------------
+#  "RothErevTest" class:
+#------------------------------------------------------------------------------
+
+class RothErevTest(unittest.TestCase):
+    """ Defines a test case comparing per-sample updates of the propensities
+    with a scalar reference and with batch updates.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        nprandom.seed(42)
+
+        #: History of (state, action, reward) samples.
+        n = 50
+        self.states = nprandom.randint(0, 3, n)
+        self.actions = nprandom.randint(0, 4, n)
+        self.rewards = nprandom.uniform(-10.0, 100.0, n)
+
+        #: Initial propensities.
+        self.params = nprandom.uniform(0.0, 10.0, 12)
+
+
+    def learner(self, klass):
+        """ Returns a learner of the given class with the initial propensities
+        of a table of three states and four actions.
+        """
+        table = ActionValueTable(3, 4)
+        table.params[:] = self.params
+
+        learner = klass(experimentation=0.3, recency=0.2)
+        learner.module = table
+        return learner
+
+
+    def compare(self, klass):
+        """ Asserts that batch updates give the propensities of per-sample
+        updates.
+        """
+        batch = self.learner(klass)
+        batch._batchUpdatePropensities(self.states, self.actions,
+                                       self.rewards)
+
+        sample = self.learner(klass)
+        for s, a, r in zip(self.states, self.actions, self.rewards):
+            sample._updatePropensities(int(s), int(a), float(r))
+
+        self.assertTrue((batch.module.params != self.params).all())
+        diff = abs(batch.module.params - sample.module.params)
+        self.assertTrue(diff.max() < 1e-9 * abs(sample.module.params).max())
+
+
+    def reference(self, klass, experienceFunction):
+        """ Asserts that per-sample updates give the propensities of updating
+        each action in turn with the given scalar experience function.
+        """
+        sample = self.learner(klass)
+        scalar = self.learner(klass)
+        phi = scalar.recency
+
+        for s, a, r in zip(self.states, self.actions, self.rewards):
+            s, a, r = int(s), int(a), float(r)
+
+            sample._updatePropensities(s, a, r)
+
+            values = []
+            for action in range(scalar.module.numActions):
+                carryOver = (1 - phi) * scalar.module.getValue(s, action)
+                values.append(carryOver +
+                              experienceFunction(scalar, s, action, a, r))
+
+            for action, value in enumerate(values):
+                scalar.module.updateValue(s, action, value)
+
+        diff = abs(sample.module.params - scalar.module.params)
+        self.assertTrue(diff.max() < 1e-9 * abs(scalar.module.params).max())
+
+
+    def testRothErevReference(self):
+        """ Test the per-sample update of the standard Roth-Erev method.
+        """
+        self.reference(RothErev, experience)
+
+
+    def testVariantRothErevReference(self):
+        """ Test the per-sample update of the variant Roth-Erev method.
+        """
+        self.reference(VariantRothErev, variantExperience)
+
+
+    def testRothErev(self):
+        """ Test the batch update of the standard Roth-Erev method.
+        """
+        self.compare(RothErev)
+
+
+    def testVariantRothErev(self):
+        """ Test the batch update of the variant Roth-Erev method.
+        """
+        self.compare(VariantRothErev)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -0,0 +1,143 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for running market experiments across processes.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import random
+import unittest
+
+from numpy import random as nprandom
+
+from pyreto.runner import ExperimentRunner, ExperimentResults
+
+#------------------------------------------------------------------------------
+#  "RandomAgent" class:
+#------------------------------------------------------------------------------
+
+class RandomAgent(object):
+    """ Defines an agent whose actions are drawn from the seeded generators.
+    """
+
+    def __init__(self, markup):
+        self.markup = markup
+        self.reset()
+
+
+    def reset(self):
+        self.history = {"action": [], "reward": []}
+
+
+    def learn(self):
+        pass
+
+#------------------------------------------------------------------------------
+#  "RandomExperiment" class:
+#------------------------------------------------------------------------------
+
+class RandomExperiment(object):
+    """ Defines an experiment of agents acting randomly.
+    """
+
+    def __init__(self, markup=0.0, agents=2):
+        self.agents = [RandomAgent(markup) for _ in range(agents)]
+
+
+    def doInteractions(self, number):
+        for _ in range(number):
+            for agent in self.agents:
+                agent.history["action"].append([nprandom.random()])
+                agent.history["reward"].append([random.random() +
+                                                agent.markup])
+
+#------------------------------------------------------------------------------
+#  "ExperimentRunnerTest" class:
+#------------------------------------------------------------------------------
+
+class ExperimentRunnerTest(unittest.TestCase):
+    """ Defines a test case for running market experiments.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        self.configs = [{"markup": 0.0}, {"markup": 10.0}, {"markup": 20.0}]
+
+
+    def runner(self, processes):
+        return ExperimentRunner(RandomExperiment, self.configs, seeds=3,
+                                roleouts=2, episodes=4, seed=100,
+                                processes=processes)
+
+
+    def testSeeds(self):
+        """ Test that the seed of each run is derived from its configuration
+        and index and determines its actions and rewards.
+        """
+        results = self.runner(1).run()
+        self.assertEqual(len(results.runs), 9)
+
+        for r in results.runs:
+            seed = 100 + r["config"] * 3 + r["index"]
+            self.assertEqual(r["seed"], seed)
+
+            random.seed(seed)
+            nprandom.seed(seed)
+            experiment = RandomExperiment(**self.configs[r["config"]])
+            experiment.doInteractions(4)
+
+            self.assertEqual(r["action"].shape, (2, 8, 1))
+            self.assertEqual(list(r["action"][0, :4, 0]),
+                [a[0] for a in experiment.agents[0].history["action"]])
+            self.assertEqual(list(r["reward"][1, :4]),
+                [a[0] for a in experiment.agents[1].history["reward"]])
+
+
+    def testPool(self):
+        """ Test that runs on a pool of processes give the same results in
+        the same order as runs in this process.
+        """
+        serial = self.runner(1).run()
+        pooled = self.runner(2).run()
+
+        keys = [(r["config"], r["index"]) for r in pooled.runs]
+        self.assertEqual(keys, [(c, s) for c in range(3) for s in range(3)])
+        self.assertTrue((serial.getActions() == pooled.getActions()).all())
+        self.assertTrue((serial.getRewards(2) == pooled.getRewards(2)).all())
+        self.assertTrue((pooled.getRewards(2) >= 20.0).all())
+
+
+    def testResultOrder(self):
+        """ Test that results added in any order are kept in order of
+        configuration and seed.
+        """
+        results = ExperimentResults(self.configs)
+        for config, index in [(1, 0), (0, 2), (2, 1), (0, 0), (1, 1), (0, 1)]:
+            results.add({"config": config, "index": index})
+
+        self.assertEqual([(r["config"], r["index"]) for r in results.runs],
+            [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (2, 1)])
+        self.assertEqual([r["index"] for r in results.getRuns(0)], [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
@@ -25,8 +25,15 @@ import unittest
 
 from pylon.test.suite import suite as pylon_suite
 
-from market_test import DCMarketTestCase
+from market_test import \
+    DCMarketTestCase, AuctionTestCase, MarketCacheTestCase
 from experiment_test import MarketExperimentTest
+from runner_test import ExperimentRunnerTest
+from roth_erev_test import RothErevTest
+from environment_test import ActionSpaceTest, PWLMarginalCostTest
+from vector_test import VectorMarketExperimentTest
+from outage_test import OutageTest
+from recorder_test import MarketRecorderTest
 
 #------------------------------------------------------------------------------
 #  "suite" function:
@@ -39,7 +46,16 @@ def suite():
     suite = pylon_suite()
 
     suite.addTest(unittest.makeSuite(DCMarketTestCase))
+    suite.addTest(unittest.makeSuite(AuctionTestCase))
+    suite.addTest(unittest.makeSuite(MarketCacheTestCase))
     suite.addTest(unittest.makeSuite(MarketExperimentTest))
+    suite.addTest(unittest.makeSuite(ExperimentRunnerTest))
+    suite.addTest(unittest.makeSuite(RothErevTest))
+    suite.addTest(unittest.makeSuite(ActionSpaceTest))
+    suite.addTest(unittest.makeSuite(PWLMarginalCostTest))
+    suite.addTest(unittest.makeSuite(VectorMarketExperimentTest))
+    suite.addTest(unittest.makeSuite(OutageTest))
+    suite.addTest(unittest.makeSuite(MarketRecorderTest))
 
     return suite
 
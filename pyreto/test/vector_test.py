@@ -0,0 +1,92 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines a test case for experiments with many copies of a market.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import unittest
+
+from os.path import dirname, join
+
+from pylon import Case
+
+from pyreto.smart_market import SmartMarket
+from pyreto.discrete import MarketEnvironment, ProfitTask
+from pyreto.roth_erev import RothErev
+from pyreto.vector import VectorMarketEnvironment, VectorMarketExperiment
+
+from pybrain.rl.agents import LearningAgent
+from pybrain.rl.learners.valuebased import ActionValueTable
+
+#------------------------------------------------------------------------------
+#  Constants:
+#------------------------------------------------------------------------------
+
+DATA_FILE = join(dirname(__file__), "data", "t_auction_case.pkl")
+
+#------------------------------------------------------------------------------
+#  "VectorMarketExperimentTest" class:
+#------------------------------------------------------------------------------
+
+class VectorMarketExperimentTest(unittest.TestCase):
+    """ Defines a test case for experiments with many copies of a market.
+    """
+
+    def setUp(self):
+        """ The test runner will execute this method prior to each test.
+        """
+        case = Case.load(DATA_FILE)
+        market = SmartMarket(case, locationalAdjustment="dc", priceCap=100.0)
+
+        self.k = 3
+        tasks = []
+        self.agents = []
+        for g in case.generators:
+            env = MarketEnvironment([g], market, markups=(0.0, 10.0, 20.0))
+            tasks.append(ProfitTask(env))
+            module = ActionValueTable(env.numStates, len(env._allActions))
+            module.initialize(1.0)
+            self.agents.append(LearningAgent(module, RothErev()))
+
+        self.env = VectorMarketEnvironment.fromTasks(tasks, self.k)
+        self.experiment = VectorMarketExperiment(self.env, self.agents)
+
+
+    def testInteraction(self):
+        """ Test that one step gives each agent a sample from every copy of
+        the market.
+        """
+        self.assertEqual(self.experiment.doInteractions(1), 1)
+
+        # The markets were cleared together.
+        self.assertEqual(len(self.env._opf.opfs), self.k)
+        for market in self.env.markets:
+            self.assertTrue(market._solution["converged"])
+
+        for agent in self.agents:
+            self.assertEqual(agent.history.getNumSequences(), 1)
+            self.assertEqual(agent.history.getLength(), self.k)
+            self.assertEqual(len(agent.history["reward"]), self.k)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF -------------------------------------------------------------------------
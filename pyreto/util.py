@@ -25,7 +25,6 @@ import random
 import scipy
 
 from itertools import count, izip
-from pylab import figure, xlabel, ylabel, plot, show, legend
 
 from pybrain.rl.agents.logging import LoggingAgent
 from pybrain.rl.explorers.continuous import NormalExplorer
@@ -129,6 +128,8 @@ def xselections(items, n):
 def plotGenCost(generators):
     """ Plots the costs of the given generators.
     """
+    from pylab import figure, xlabel, ylabel, plot, show, legend
+
     figure()
     plots = []
     for generator in generators:
@@ -0,0 +1,255 @@
+#------------------------------------------------------------------------------
+# Copyright (C) 2007-2010 Richard Lincoln
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#------------------------------------------------------------------------------
+
+""" Defines an environment that steps many independent copies of a market at
+once, and an experiment in which each agent learns from all of the copies.
+"""
+
+#------------------------------------------------------------------------------
+#  Imports:
+#------------------------------------------------------------------------------
+
+import copy
+import time
+import logging
+
+from numpy import array
+
+from pylon import BatchDCOPF
+
+#------------------------------------------------------------------------------
+#  Logging:
+#------------------------------------------------------------------------------
+
+logger = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+#  "VectorMarketEnvironment" class:
+#------------------------------------------------------------------------------
+
+class VectorMarketEnvironment(object):
+    """ Steps K independent copies of a market, and of the tasks of its
+    participants, at once.
+
+    Observations and actions are stacked into an array for each participant,
+    with a row for each copy, and rewards are returned as a K x n array. The
+    DC OPFs of the copies are solved together as a single block-diagonal
+    program.
+    """
+
+    def __init__(self, tasks, batch=True):
+        """ Initialises a new VectorMarketEnvironment instance.
+
+        @param tasks: List of K lists of n tasks, one list for each copy of
+            the market and one task for each participant. The environments of
+            the tasks in each list must share a market.
+        @param batch: Solve the DC OPFs of the copies together?
+        """
+        assert len(set([len(copyTasks) for copyTasks in tasks])) == 1
+
+        #: Tasks of each copy of the market.
+        self.tasks = tasks
+
+        #: Market of each copy.
+        self.markets = [copyTasks[0].env.market for copyTasks in tasks]
+
+        #: Solve the DC OPFs of the copies together?
+        self.batch = batch
+
+        #: DC OPF of the cases of the batched markets.
+        self._opf = None
+
+
+    @classmethod
+    def fromTasks(cls, tasks, k, batch=True):
+        """ Returns an environment of K deep copies of the given tasks of the
+        participants in a market.
+        """
+        return cls([copy.deepcopy(tasks) for _ in range(k)], batch)
+
+
+    @property
+    def numCopies(self):
+        """ The number of copies of the market.
+        """
+        return len(self.tasks)
+
+
+    @property
+    def numAgents(self):
+        """ The number of participants in each market.
+        """
+        return len(self.tasks[0])
+
+
+    def getObservations(self):
+        """ Returns a list of the observations of each participant, as an
+        array with a row for each copy of the market.
+        """
+        return [array([copyTasks[i].getObservation()
+                       for copyTasks in self.tasks])
+                for i in range(self.numAgents)]
+
+
+    def performActions(self, actions):
+        """ Submits the offers/bids of each participant.
+
+        @param actions: List of the actions of each participant, as an array
+            with a row for each copy of the market.
+        """
+        for market in self.markets:
+            market.reset()
+
+        for k, copyTasks in enumerate(self.tasks):
+            for i, task in enumerate(copyTasks):
+                task.performAction(actions[i][k])
+
+
+    def getRewards(self):
+        """ Returns a K x n array of the reward of each participant in each
+        copy of the market.
+        """
+        return array([[task.getReward() for task in copyTasks]
+                      for copyTasks in self.tasks])
+
+
+    def step(self, actions):
+        """ Performs the actions, clears the markets and returns the rewards.
+        """
+        self.performActions(actions)
+        self.clearMarkets()
+        return self.getRewards()
+
+
+    def clearMarkets(self):
+        """ Clears all of the markets. Markets with a DC locational adjustment
+        and no unit decommitment are cleared together.
+        """
+        t0 = time.time()
+
+        batched = [m for m in self.markets if self.batch and
+                   m.locationalAdjustment == "dc" and not m.decommit]
+
+        for market in self.markets:
+            if market not in batched:
+                market.run()
+
+        if not batched:
+            return
+
+        if self._opf is None or \
+                [id(c) for c in self._opf.cases] != \
+                [id(m.case) for m in batched]:
+            self._opf = BatchDCOPF([m.case for m in batched])
+
+        # Prepare each case, reusing cached outcomes where possible.
+        pending = [market for market in batched if not market.prepare()]
+
+        results = self._opf.solve([market.case for market in pending])
+
+        for market, solution in zip(pending, results):
+            market.finish(solution)
+
+        logger.info("%d markets cleared (%d OPFs) in %.3fs." %
+                    (len(self.markets), len(pending), time.time() - t0))
+
+
+    def reset(self):
+        """ Resets the markets and tasks of each copy.
+        """
+        for market in self.markets:
+            market.reset()
+
+        for copyTasks in self.tasks:
+            for task in copyTasks:
+                task.reset()
+
+#------------------------------------------------------------------------------
+#  "VectorMarketExperiment" class:
+#------------------------------------------------------------------------------
+
+class VectorMarketExperiment(object):
+    """ Defines an experiment in which each agent acts in, and learns from,
+    every copy of a vector market environment.
+    """
+
+    def __init__(self, environment, agents):
+        """ Initialises a new VectorMarketExperiment instance.
+        """
+        assert len(agents) == environment.numAgents
+
+        #: Copies of the market and of the tasks of each agent.
+        self.environment = environment
+
+        #: Agents capable of producing actions based on previous observations.
+        self.agents = agents
+
+        self.stepid = 0
+
+
+    def doInteractions(self, number=1):
+        """ Performs the given number of interactions with all of the copies.
+        Each agent receives a sample for every copy of the market.
+        """
+        t0 = time.time()
+
+        for _ in range(number):
+            self._oneInteraction()
+
+        logger.info("%d interactions with %d markets executed in %.3fs." %
+                    (number, self.environment.numCopies, time.time() - t0))
+
+        return self.stepid
+
+
+    def _oneInteraction(self):
+        """ Coordinates one interaction between each agent and every copy of
+        its environment.
+        """
+        self.stepid += 1
+
+        observations = self.environment.getObservations()
+
+        actions = []
+        for agent, agentObs in zip(self.agents, observations):
+            agentActions = []
+            for obs in agentObs:
+                agent.integrateObservation(obs)
+                agentActions.append(agent.getAction())
+            actions.append(array(agentActions))
+
+        rewards = self.environment.step(actions)
+
+        # Pair each reward with the observation and action of its copy.
+        for i, agent in enumerate(self.agents):
+            for k in range(self.environment.numCopies):
+                agent.integrateObservation(observations[i][k])
+                agent.lastaction = actions[i][k]
+                agent.giveReward(rewards[k, i])
+
+
+    def reset(self):
+        """ Sets initial conditions for the experiment.
+        """
+        self.stepid = 0
+
+        self.environment.reset()
+
+        for agent in self.agents:
+            agent.module.reset()
+            agent.history.reset()
+
+# EOF -------------------------------------------------------------------------
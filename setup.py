@@ -23,7 +23,8 @@ setup(author="Richard Lincoln",
       long_description = open('README').read().strip(),
       url="http://rwl.github.com/pylon",
       version="0.4.4",
-      entry_points={"console_scripts": ["pylon = pylon.main:main"]},
+      entry_points={"console_scripts": ["pylon = pylon.main:main",
+                                      "pylon-batch = pylon.batch:main"]},
 #      install_requires=["numpy", "scipy"],
       license="Apache License, Version 2.0",
       name="Pylon",